@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from apps.core.views import batch_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +14,8 @@ urlpatterns = [
     path('api/offers/', include('apps.offers.urls')),
     path('api/bookings/', include('apps.bookings.urls')),
     path('api/staff/', include('apps.staff.urls')),
+    path('api/batch/', batch_view, name='batch'),
+    path('internal/', include('apps.core.urls')),
 ]
 
 if settings.DEBUG:
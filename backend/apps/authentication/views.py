@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+import logging
 
 from .serializers import (
     CustomTokenObtainPairSerializer, 
@@ -14,6 +15,7 @@ from .serializers import (
 )
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
@@ -38,8 +40,7 @@ def register_view(request):
             }
         }, status=status.HTTP_201_CREATED)
 
-    # 🔴 Add this to see exactly what’s going wrong
-    print("REGISTER VALIDATION ERROR:", serializer.errors)
+    logger.info("Registration rejected: %s", serializer.errors)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking, TimeSlot, BookingHistory, DateTimeSlot
+from .models import Booking, TimeSlot, BookingHistory, BookingHold, DateTimeSlot, RestaurantTable, WaitlistEntry
 
 
 @admin.register(TimeSlot)
@@ -10,6 +10,14 @@ class TimeSlotAdmin(admin.ModelAdmin):
     ordering = ['restaurant', 'time']
 
 
+@admin.register(RestaurantTable)
+class RestaurantTableAdmin(admin.ModelAdmin):
+    list_display = ['restaurant', 'seats', 'quantity']
+    list_filter = ['restaurant']
+    search_fields = ['restaurant__name']
+    ordering = ['restaurant', 'seats']
+
+
 class BookingHistoryInline(admin.TabularInline):
     model = BookingHistory
     extra = 0
@@ -76,4 +84,23 @@ class BookingHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ['changed_at']
     ordering = ['-changed_at']
 
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = [
+        'customer_name', 'date_time_slot', 'party_size',
+        'status', 'offer_expires_at', 'created_at'
+    ]
+    list_filter = ['status', 'date_time_slot__date']
+    search_fields = ['customer_name', 'customer_email', 'user__email']
+    raw_id_fields = ['date_time_slot', 'user', 'booking']
+    readonly_fields = ['created_at', 'offered_at']
+
+
+@admin.register(BookingHold)
+class BookingHoldAdmin(admin.ModelAdmin):
+    list_display = ['date_time_slot', 'user', 'party_size', 'created_at', 'expires_at']
+    raw_id_fields = ['date_time_slot', 'user']
+    ordering = ['-created_at']
+
 admin.site.register(DateTimeSlot)
\ No newline at end of file
@@ -0,0 +1,69 @@
+# apps/bookings/allocation.py
+"""
+Seat parties at tables for one time slot.
+
+A party takes one whole table with at least as many seats as the party,
+and tables are not combined. The tables that fit a party of n are all the
+tables with n or more seats, so the sets that fit different parties are
+nested. Seating the largest parties first, each at the smallest table
+that fits, is therefore optimal. It also leaves the best possible set of
+free tables for later parties.
+
+Parties and tables are both handled as ``{size: count}``. The cost of a
+slot grows with the number of distinct sizes, not with the number of
+tables or bookings.
+"""
+from bisect import bisect_left
+
+
+class TablePlan:
+    """The tables of one slot that are left free once its parties are seated"""
+
+    def __init__(self, tables, parties=None):
+        sizes = sorted(seats for seats, count in tables.items() if count > 0)
+        self.seats = sizes
+        self.free = [tables[seats] for seats in sizes]
+        # Parties already holding a place that no table fits, e.g. after
+        # the floor plan shrank
+        self.unseated = 0
+        for size in sorted(parties or {}, reverse=True):
+            self.unseated += self._seat(size, parties[size])
+
+    def _seat(self, size, count):
+        """Seat ``count`` parties of ``size`` at the smallest free tables; return how many did not fit"""
+        index = bisect_left(self.seats, size)
+        while count and index < len(self.seats):
+            taken = min(count, self.free[index])
+            self.free[index] -= taken
+            count -= taken
+            index += 1
+        return count
+
+    def seat(self, party_size):
+        """Seat one more party if a table fits it; return whether one did"""
+        return self._seat(party_size, 1) == 0
+
+    def capacity_for(self, party_size=1):
+        """How many more parties of ``party_size`` can be seated"""
+        return sum(self.free[bisect_left(self.seats, party_size):])
+
+
+class PlacePlan:
+    """
+    ``TablePlan`` for restaurants without a floor plan. The slot's
+    ``max_capacity`` counts bookings, whatever their party size.
+    """
+
+    def __init__(self, max_capacity, parties=None):
+        taken = sum((parties or {}).values())
+        self.places = max(0, max_capacity - taken)
+        self.unseated = max(0, taken - max_capacity)
+
+    def seat(self, party_size):
+        if self.places < 1:
+            return False
+        self.places -= 1
+        return True
+
+    def capacity_for(self, party_size=1):
+        return self.places
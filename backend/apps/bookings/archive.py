@@ -0,0 +1,136 @@
+# apps/bookings/archive.py
+"""
+Cold storage for finished bookings.
+
+``archive_bookings`` moves completed, cancelled and no-show bookings dated
+more than ``BOOKING_ARCHIVE_AFTER_DAYS`` ago, together with their history,
+into ``ArchivedBooking`` and ``ArchivedBookingHistory``. The hot tables
+then only hold recent and upcoming bookings.
+
+Reports count through ``count_bookings``, which adds the archive only when
+the requested date range reaches back into it. Lists of finished bookings
+read it through ``CompiledArchivedBookingListSerializer``, and a booking's
+history falls back to ``archived_history``.
+"""
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from apps.core.cache import get_or_build, invalidate_tags_on_commit
+from .models import ArchivedBooking, ArchivedBookingHistory, Booking, BookingHistory
+
+ARCHIVABLE_STATUSES = ('completed', 'cancelled', 'no_show')
+
+# Booking fields copied verbatim into the archive
+_COPIED_FIELDS = [
+    'id', 'user_id', 'restaurant_id', 'time_slot_id', 'booking_date', 'party_size',
+    'special_requests', 'customer_name', 'customer_phone', 'customer_email',
+    'applied_offer_id', 'original_amount', 'discount_amount', 'final_amount',
+    'status', 'created_at', 'updated_at', 'confirmed_at', 'booking_reference', 'notes',
+]
+
+
+def start_of_day(day):
+    """The aware datetime at which ``day`` starts in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def archive_horizon():
+    """The latest ``booking_date`` in the archive, or None while it is empty"""
+    return get_or_build(
+        'bookings:archive_horizon',
+        lambda: ArchivedBooking.objects.aggregate(latest=Max('booking_date'))['latest'],
+        timeout=None,
+        tags=('booking_archive',),
+    )
+
+
+def archive_needed(since=None):
+    """
+    Whether bookings created on or after ``since`` (ever, when None) may be
+    archived. A booking is made before the date it is for, so nothing in
+    the archive was created after the latest archived booking date.
+    """
+    horizon = archive_horizon()
+    return horizon is not None and (since is None or since <= horizon)
+
+
+def count_bookings(statuses=(), since=None, until=None, extra=None, **filters):
+    """
+    Count bookings matching ``filters`` (e.g. ``restaurant=...``) that were
+    created between the dates ``since`` and ``until`` inclusive.
+
+    Returns ``{'total': n, <status>: n, ...}`` for each of ``statuses`` and
+    for each ``{name: Q(...)}`` in ``extra``, archived bookings included.
+    All counts come from one conditional aggregate per table.
+    """
+    aggregates = {'total': Count('pk')}
+    for status in statuses:
+        aggregates[status] = Count('pk', filter=Q(status=status))
+    for name, condition in (extra or {}).items():
+        aggregates[name] = Count('pk', filter=condition)
+    # Compare the raw column so that the (restaurant, created_at) and
+    # (user, created_at) indexes apply
+    if since is not None:
+        filters['created_at__gte'] = start_of_day(since)
+    if until is not None:
+        filters['created_at__lt'] = start_of_day(until + timedelta(days=1))
+
+    counts = Booking.objects.filter(**filters).aggregate(**aggregates)
+    if archive_needed(since):
+        archived = ArchivedBooking.objects.filter(**filters).aggregate(**aggregates)
+        counts = {key: value + archived[key] for key, value in counts.items()}
+    return counts
+
+
+def archived_history(booking):
+    """``booking``'s ``ArchivedBookingHistory`` rows with ``changed_by`` set, in two queries"""
+    history = list(ArchivedBookingHistory.objects.filter(booking=booking))
+    users = get_user_model().objects.in_bulk({row.changed_by_id for row in history} - {None})
+    for row in history:
+        row.changed_by = users.get(row.changed_by_id)
+    return history
+
+
+def archive_batch(before, batch_size=500):
+    """
+    Move up to ``batch_size`` finished bookings dated before ``before`` and
+    their history into the archive, in one transaction. Returns how many
+    bookings were moved.
+    """
+    with transaction.atomic():
+        bookings = list(
+            Booking.objects.filter(status__in=ARCHIVABLE_STATUSES, booking_date__lt=before)
+            .select_related('time_slot')
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('booking_date', 'pk')[:batch_size]
+        )
+        if not bookings:
+            return 0
+        ids = [booking.pk for booking in bookings]
+
+        ArchivedBooking.objects.bulk_create([
+            ArchivedBooking(
+                booking_time=booking.time_slot.time,
+                **{field: getattr(booking, field) for field in _COPIED_FIELDS}
+            )
+            for booking in bookings
+        ])
+        ArchivedBookingHistory.objects.bulk_create([
+            ArchivedBookingHistory(
+                booking_id=history.booking_id,
+                status_from=history.status_from,
+                status_to=history.status_to,
+                changed_by_id=history.changed_by_id,
+                changed_at=history.changed_at,
+                notes=history.notes,
+            )
+            for history in BookingHistory.objects.filter(booking_id__in=ids)
+        ])
+        # Cascades to the history rows copied above
+        Booking.objects.filter(pk__in=ids).delete()
+        invalidate_tags_on_commit('booking_archive')
+    return len(bookings)
@@ -0,0 +1,116 @@
+# apps/bookings/capacity.py
+"""
+Capacity accounting for ``DateTimeSlot``.
+
+A slot's places are taken by its pending and confirmed bookings, by live
+waitlist offers and by live booking holds. Offers and holds keep a place
+for a party until they lapse; lapsed ones simply stop counting. Parties
+still waiting in line hold places too, so a place freed by a cancellation
+goes to the line before any direct booking or hold can take it.
+
+A restaurant with ``RestaurantTable`` rows seats each party at a table
+that fits it (see ``allocation``). A restaurant without them counts one
+place per booking against the slot's ``max_capacity``.
+
+Every write that takes a place calls ``claim_capacity`` inside the
+transaction that makes the write. ``claim_capacity`` locks the slot row,
+so concurrent claims on one slot are handled one at a time and cannot
+oversell it.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .allocation import PlacePlan, TablePlan
+from .models import Booking, BookingHold, DateTimeSlot, RestaurantTable, WaitlistEntry
+
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed')
+
+
+class SlotFull(Exception):
+    """The slot has no place left for the claim"""
+
+
+def slot_plans(slots, now=None, exclude_entry=None, waiting=True):
+    """
+    ``{slot.pk: plan}`` with every party holding a place in the slot
+    already seated. Uses four grouped queries however many slots are
+    passed. A live offer held by ``exclude_entry`` is left out, and so are
+    waiting entries when ``waiting`` is false, e.g. to offer them places.
+    """
+    slots = list(slots)
+    if not slots:
+        return {}
+    now = now or timezone.now()
+    restaurant_ids = {slot.restaurant_id for slot in slots}
+    slot_keys = {(slot.restaurant_id, slot.date, slot.time): slot.pk for slot in slots}
+    parties = defaultdict(Counter)
+
+    booked = Booking.objects.filter(
+        restaurant_id__in=restaurant_ids,
+        booking_date__in={slot.date for slot in slots},
+        status__in=ACTIVE_BOOKING_STATUSES,
+    ).values_list('restaurant_id', 'booking_date', 'time_slot__time', 'party_size').annotate(n=Count('pk')).order_by()
+    for restaurant_id, date, time, party_size, n in booked:
+        slot_id = slot_keys.get((restaurant_id, date, time))
+        if slot_id is not None:
+            parties[slot_id][party_size] += n
+
+    in_line = Q(status='offered', offer_expires_at__gt=now)
+    if waiting:
+        in_line |= Q(status='waiting')
+    offers = WaitlistEntry.objects.filter(in_line, date_time_slot__in=[slot.pk for slot in slots])
+    if exclude_entry is not None:
+        offers = offers.exclude(pk=exclude_entry.pk)
+    holds = BookingHold.objects.filter(
+        date_time_slot__in=[slot.pk for slot in slots],
+        expires_at__gt=now,
+    )
+    for queryset in (offers, holds):
+        grouped = queryset.values_list('date_time_slot', 'party_size').annotate(n=Count('pk')).order_by()
+        for slot_id, party_size, n in grouped:
+            parties[slot_id][party_size] += n
+
+    tables = defaultdict(dict)
+    for restaurant_id, seats, quantity in RestaurantTable.objects.filter(
+        restaurant_id__in=restaurant_ids
+    ).values_list('restaurant_id', 'seats', 'quantity'):
+        tables[restaurant_id][seats] = quantity
+
+    return {
+        slot.pk: (
+            TablePlan(tables[slot.restaurant_id], parties[slot.pk])
+            if tables.get(slot.restaurant_id)
+            else PlacePlan(slot.max_capacity, parties[slot.pk])
+        )
+        for slot in slots
+    }
+
+
+def available_capacity(slots, party_size=1, now=None, exclude_entry=None):
+    """
+    ``{slot.pk: how many more parties of party_size fit}`` for ``slots``.
+    Accepting ``exclude_entry``'s offer goes ahead of the parties waiting
+    behind it.
+    """
+    plans = slot_plans(slots, now=now, exclude_entry=exclude_entry, waiting=exclude_entry is None)
+    return {slot_id: plan.capacity_for(party_size) for slot_id, plan in plans.items()}
+
+
+def lock_slot(slot_id):
+    """Read the slot with its row locked until the transaction ends"""
+    return DateTimeSlot.objects.select_for_update().get(pk=slot_id)
+
+
+def claim_capacity(slot, party_size, exclude_entry=None):
+    """
+    Lock ``slot`` and raise ``SlotFull`` unless a party of ``party_size``
+    fits. ``exclude_entry`` is a waitlist entry whose offer the claim
+    replaces. Call inside the transaction that writes the claim.
+    """
+    locked = lock_slot(slot.pk)
+    plan = slot_plans([locked], exclude_entry=exclude_entry, waiting=exclude_entry is None)[locked.pk]
+    if not plan.seat(party_size):
+        raise SlotFull(f'DateTimeSlot {locked.pk} has no place for a party of {party_size}')
+    return locked
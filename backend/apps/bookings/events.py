@@ -0,0 +1,31 @@
+# apps/bookings/events.py
+from django.db import transaction
+
+from apps.core.metrics import BOOKING_EVENTS
+from apps.core.outbox import handler
+from .capacity import ACTIVE_BOOKING_STATUSES
+from .waitlist import offer_free_places, slot_for_booking
+
+
+@handler('booking.created', 'booking.status_changed', 'booking.deleted')
+def count_booking_event(event):
+    """
+    Count the event once its delivery commits. A failing handler rolls the
+    event back for a retry and drops this callback with it, so an event
+    delivered more than once is still counted once.
+    """
+    labels = {'event': event.topic.split('.', 1)[1], 'status': event.payload['status']}
+    transaction.on_commit(lambda: BOOKING_EVENTS.inc(**labels))
+
+
+@handler('booking.status_changed', 'booking.deleted')
+def offer_freed_place(event):
+    """Pass a place freed by a cancellation on to the slot's waitlist"""
+    payload = event.payload
+    if event.topic == 'booking.status_changed' and (
+        payload['status_from'] not in ACTIVE_BOOKING_STATUSES or payload['status'] in ACTIVE_BOOKING_STATUSES
+    ):
+        return
+    slot = slot_for_booking(payload['restaurant_id'], payload['booking_date'], payload['time_slot_id'])
+    if slot is not None:
+        offer_free_places(slot.pk)
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.bookings.archive import archive_batch
+
+
+class Command(BaseCommand):
+    help = 'Move finished bookings older than a cutoff, with their history, into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'BOOKING_ARCHIVE_AFTER_DAYS', 180),
+            help='Archive bookings dated more than this many days ago (default: BOOKING_ARCHIVE_AFTER_DAYS or 180)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Bookings moved per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (default: until none are left)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to pause between batches to limit load on the primary (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.localdate() - timedelta(days=options['days'])
+        total = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = archive_batch(before, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            self.stdout.write(f'Archived {moved} bookings (total {total})')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Archived {total} bookings dated before {before.isoformat()}')
+        )
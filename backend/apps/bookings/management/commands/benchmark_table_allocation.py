@@ -0,0 +1,142 @@
+import random
+import time
+from collections import Counter
+from datetime import time as dt_time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.bookings.allocation import TablePlan
+from apps.bookings.capacity import available_capacity
+from apps.bookings.models import Booking, DateTimeSlot, RestaurantTable, TimeSlot
+from apps.restaurant.models import Restaurant
+
+# Share of a floor plan's tables by seat count
+FLOOR_MIX = {2: 30, 4: 35, 6: 15, 8: 10, 10: 5, 12: 3, 20: 2}
+
+# Share of parties by size
+PARTY_MIX = {1: 5, 2: 35, 3: 15, 4: 20, 5: 8, 6: 7, 8: 5, 10: 3, 14: 1, 20: 1}
+
+
+class Command(BaseCommand):
+    help = 'Time availability for a full day of slots on large floor plans (seeded data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tables',
+            type=int,
+            nargs='+',
+            default=[50, 500, 5000],
+            help='Floor plan sizes to benchmark, in tables (default: 50 500 5000)',
+        )
+        parser.add_argument(
+            '--slots',
+            type=int,
+            default=23,
+            help='Time slots in the day (default: 23)',
+        )
+        parser.add_argument(
+            '--fill',
+            type=float,
+            default=0.9,
+            help='Share of tables booked in each slot (default: 0.9)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed runs per case; the best is reported (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        self.stdout.write(
+            f"{'tables':>7} {'parties':>8} {'allocation':>11} {'day via DB':>11} {'queries':>8}"
+        )
+        for tables in options['tables']:
+            floor = self.floor_plan(tables)
+            day = [self.parties(rng, int(tables * options['fill'])) for _ in range(options['slots'])]
+
+            allocation = self.best_of(options['repeat'], lambda: [
+                TablePlan(floor, parties).capacity_for(4) for parties in day
+            ])
+            with transaction.atomic():
+                slots = self.seed(floor, day)
+                with CaptureQueriesContext(connection) as queries:
+                    available_capacity(slots, party_size=4)
+                through_db = self.best_of(options['repeat'], lambda: available_capacity(slots, party_size=4))
+                transaction.set_rollback(True)
+
+            booked = sum(sum(parties.values()) for parties in day)
+            self.stdout.write(
+                f'{tables:>7} {booked:>8} {allocation * 1000:>8.2f} ms '
+                f'{through_db * 1000:>8.2f} ms {len(queries):>8}'
+            )
+
+    def best_of(self, repeat, run):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def floor_plan(self, tables):
+        total = sum(FLOOR_MIX.values())
+        return {seats: max(1, tables * share // total) for seats, share in FLOOR_MIX.items()}
+
+    def parties(self, rng, count):
+        sizes = rng.choices(list(PARTY_MIX), weights=list(PARTY_MIX.values()), k=count)
+        return Counter(sizes)
+
+    def seed(self, floor, day):
+        restaurant = Restaurant.objects.create(
+            name='Benchmark Kitchen',
+            cuisine='Indian',
+            address='1 Benchmark Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=dt_time(9, 0),
+            closing_time=dt_time(23, 0),
+        )
+        RestaurantTable.objects.bulk_create([
+            RestaurantTable(restaurant=restaurant, seats=seats, quantity=quantity)
+            for seats, quantity in floor.items()
+        ])
+        date = timezone.localdate() + timedelta(days=1)
+        times = [dt_time(11 + index // 2, 30 * (index % 2)) for index in range(len(day))]
+        templates = TimeSlot.objects.bulk_create([TimeSlot(restaurant=restaurant, time=at) for at in times])
+        slots = DateTimeSlot.objects.bulk_create([
+            DateTimeSlot(restaurant=restaurant, date=date, time=at) for at in times
+        ])
+
+        # Bookings are unique per user and slot, so each party in a slot needs its own user
+        most = max(sum(parties.values()) for parties in day)
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(username=f'benchmark-{index}', email=f'benchmark-{index}@example.com', password='!')
+            for index in range(most)
+        ])
+        bookings = []
+        for template, parties in zip(templates, day):
+            sizes = [size for size, count in parties.items() for _ in range(count)]
+            bookings.extend(
+                Booking(
+                    user=user,
+                    restaurant=restaurant,
+                    time_slot=template,
+                    booking_date=date,
+                    party_size=size,
+                    customer_name='Benchmark Customer',
+                    customer_phone='9876543210',
+                    customer_email='benchmark@example.com',
+                    status='confirmed',
+                    booking_reference=f'BT{template.pk:04d}{index:06d}',
+                )
+                for index, (user, size) in enumerate(zip(users, sizes))
+            )
+        Booking.objects.bulk_create(bookings, batch_size=2000)
+        return slots
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_datetimeslot'),
+        ('restaurant', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('time_slot_id', models.BigIntegerField()),
+                ('booking_time', models.TimeField()),
+                ('booking_date', models.DateField()),
+                ('party_size', models.PositiveIntegerField()),
+                ('special_requests', models.TextField(blank=True)),
+                ('customer_name', models.CharField(max_length=100)),
+                ('customer_phone', models.CharField(max_length=20)),
+                ('customer_email', models.EmailField(max_length=254)),
+                ('applied_offer_id', models.BigIntegerField(blank=True, null=True)),
+                ('original_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('final_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed'), ('no_show', 'No Show')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('booking_reference', models.CharField(max_length=20, unique=True)),
+                ('notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('restaurant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='restaurant.restaurant')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBookingHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status_from', models.CharField(max_length=20)),
+                ('status_to', models.CharField(max_length=20)),
+                ('changed_by_id', models.BigIntegerField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='bookings.archivedbooking')),
+            ],
+            options={
+                'ordering': ['-changed_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['user', 'created_at'], name='bookings_ar_user_id_8f8e14_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['restaurant', 'created_at'], name='bookings_ar_restaur_f3eaa0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['booking_date'], name='bookings_ar_booking_d34a65_idx'),
+        ),
+    ]
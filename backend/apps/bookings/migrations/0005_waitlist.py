@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:34
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party_size', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(20)])),
+                ('special_requests', models.TextField(blank=True)),
+                ('customer_name', models.CharField(max_length=100)),
+                ('customer_phone', models.CharField(max_length=20)),
+                ('customer_email', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('booked', 'Booked'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], default='waiting', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('offered_at', models.DateTimeField(blank=True, null=True)),
+                ('offer_expires_at', models.DateTimeField(blank=True, help_text='A place is held for the party until then', null=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bookings.booking')),
+                ('date_time_slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='bookings.datetimeslot')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['date_time_slot', 'status', 'id'], name='waitlist_slot_queue_idx'), models.Index(fields=['user', 'status'], name='waitlist_user_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['waiting', 'offered'])), fields=('date_time_slot', 'user'), name='waitlist_one_active_entry_per_user')],
+            },
+        ),
+    ]
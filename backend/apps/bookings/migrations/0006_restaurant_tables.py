@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:36
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_waitlist'),
+        ('restaurant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='datetimeslot',
+            name='max_capacity',
+            field=models.PositiveIntegerField(default=10, help_text='Maximum bookings for this time slot, if the restaurant has no tables set up'),
+        ),
+        migrations.CreateModel(
+            name='RestaurantTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('quantity', models.PositiveIntegerField(default=1, help_text='Number of tables with this many seats')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tables', to='restaurant.restaurant')),
+            ],
+            options={
+                'ordering': ['seats'],
+                'unique_together': {('restaurant', 'seats')},
+            },
+        ),
+    ]
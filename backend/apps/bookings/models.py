@@ -1,11 +1,31 @@
 from django.db import models
+from django.db.models import BooleanField, Case, Count, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.conf import settings
 from apps.restaurant.models import Restaurant
 from apps.offers.models import Offer
+from apps.offers.pricing import quote_offer
+from apps.core.outbox import TransactionalSaveMixin
 import uuid
 
+# Statuses a booking can no longer be cancelled from
+FINAL_STATUSES = ('cancelled', 'completed', 'no_show')
+
+# Bookings can't be cancelled less than this long before their slot
+CANCELLATION_NOTICE = timezone.timedelta(hours=2)
+
+
+def cancellation_cutoff(now=None):
+    """
+    The local (date, time) a booking's slot must be later than to still be
+    cancellable. Comparing it with the stored date and slot time needs no
+    time zone arithmetic, in Python or in SQL.
+    """
+    cutoff = timezone.localtime((now or timezone.now()) + CANCELLATION_NOTICE)
+    return cutoff.date(), cutoff.time()
+
 
 class TimeSlot(models.Model):
     """Available time slots for restaurant bookings"""
@@ -31,7 +51,42 @@ class TimeSlot(models.Model):
         return max(0, self.max_capacity - booked_count)
 
 
-class Booking(models.Model):
+class RestaurantTable(models.Model):
+    """Tables of one size in a restaurant's floor plan"""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='tables')
+    seats = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
+    quantity = models.PositiveIntegerField(default=1, help_text="Number of tables with this many seats")
+    
+    class Meta:
+        unique_together = ('restaurant', 'seats')
+        ordering = ['seats']
+    
+    def __str__(self):
+        return f"{self.restaurant.name} - {self.quantity} x {self.seats}-seat"
+
+
+def _cancellable_q(now=None):
+    cutoff_date, cutoff_time = cancellation_cutoff(now)
+    return ~Q(status__in=FINAL_STATUSES) & (
+        Q(booking_date__gt=cutoff_date)
+        | Q(booking_date=cutoff_date, time_slot__time__gt=cutoff_time)
+    )
+
+
+class BookingQuerySet(models.QuerySet):
+    def with_can_cancel(self, now=None):
+        """
+        Annotate ``is_cancellable`` so that can_be_cancelled() is answered
+        from the row instead of loading each booking's time slot
+        """
+        return self.annotate(is_cancellable=Case(
+            When(_cancellable_q(now), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+
+
+class Booking(TransactionalSaveMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('confirmed', 'Confirmed'),
@@ -77,19 +132,48 @@ class Booking(models.Model):
     booking_reference = models.CharField(max_length=20, unique=True, blank=True)
     notes = models.TextField(blank=True, help_text="Internal notes")
     
+    objects = BookingQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         unique_together = ('user', 'restaurant', 'booking_date', 'time_slot')
+        indexes = [
+            # Slot availability counts
+            models.Index(fields=['restaurant', 'booking_date', 'time_slot', 'status'], name='booking_slot_status_idx'),
+            # A user's upcoming bookings
+            models.Index(fields=['user', 'booking_date', 'status'], name='booking_user_date_idx'),
+            # Staff dashboards: recent and per-period bookings
+            models.Index(fields=['restaurant', 'created_at'], name='booking_rest_created_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save receivers tell a status change from other edits
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_pricing = instance._pricing_key()
+        return instance
+    
+    def _pricing_key(self):
+        """The fields the quoted amounts depend on; deferred ones read as None"""
+        return (self.__dict__.get('applied_offer_id'), self.__dict__.get('party_size'))
     
-    def save(self, *args, **kwargs):
+    def save(self, *args, quote=None, **kwargs):
+        """
+        Save the booking. The amounts are priced from the applied offer only
+        when the booking is created or its offer or party size changes, so
+        later edits keep what the customer was quoted. ``quote`` is a
+        ``Quote`` already computed for this offer and party size.
+        """
         if not self.booking_reference:
             self.booking_reference = self.generate_booking_reference()
         
-        # Calculate amounts if offer is applied
-        if self.applied_offer:
-            self.calculate_pricing()
+        pricing = self._pricing_key()
+        if pricing[0] and (self._state.adding or pricing != getattr(self, '_loaded_pricing', None)):
+            self.calculate_pricing(quote)
         
         super().save(*args, **kwargs)
+        self._loaded_pricing = pricing
     
     def generate_booking_reference(self):
         """Generate unique booking reference"""
@@ -101,37 +185,26 @@ class Booking(models.Model):
             if not Booking.objects.filter(booking_reference=ref).exists():
                 return ref
     
-    def calculate_pricing(self):
-        """Calculate pricing with applied offer"""
-        # Base amount (could be based on party size, time, etc.)
-        base_amount = 50.00  # Base booking fee per person
-        self.original_amount = base_amount * self.party_size
-        
-        if self.applied_offer:
-            if self.applied_offer.offer_type == 'percentage':
-                self.discount_amount = (self.original_amount * self.applied_offer.discount_value) / 100
-            elif self.applied_offer.offer_type == 'fixed':
-                self.discount_amount = min(self.applied_offer.discount_value, self.original_amount)
-            else:
-                self.discount_amount = 0
-        else:
-            self.discount_amount = 0
-        
-        self.final_amount = max(0, self.original_amount - self.discount_amount)
+    def calculate_pricing(self, quote=None):
+        """Calculate pricing with applied offer, or from ``quote`` when given"""
+        if quote is None:
+            quote = quote_offer(self.applied_offer, self.party_size)
+        self.original_amount = quote.original_amount
+        self.discount_amount = quote.discount_amount
+        self.final_amount = quote.final_amount
     
     def can_be_cancelled(self):
         """Check if booking can be cancelled"""
-        if self.status in ['cancelled', 'completed', 'no_show']:
+        # Loaded through with_can_cancel() and not changed since
+        annotated = self.__dict__.get('is_cancellable')
+        if annotated is not None and self.status == getattr(self, '_loaded_status', None):
+            return annotated
+        
+        if self.status in FINAL_STATUSES:
             return False
         
         # Can't cancel if booking is less than 2 hours away
-        booking_datetime = timezone.datetime.combine(
-            self.booking_date, 
-            self.time_slot.time
-        )
-        booking_datetime = timezone.make_aware(booking_datetime)
-        
-        return booking_datetime > timezone.now() + timezone.timedelta(hours=2)
+        return (self.booking_date, self.time_slot.time) > cancellation_cutoff()
     
     def confirm(self):
         """Confirm the booking"""
@@ -156,7 +229,9 @@ class DateTimeSlot(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='date_time_slots')
     date = models.DateField()
     time = models.TimeField()
-    max_capacity = models.PositiveIntegerField(default=10, help_text="Maximum bookings for this time slot")
+    max_capacity = models.PositiveIntegerField(
+        default=10, help_text="Maximum bookings for this time slot, if the restaurant has no tables set up"
+    )
     is_active = models.BooleanField(default=True)
     
     class Meta:
@@ -166,16 +241,96 @@ class DateTimeSlot(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.date} {self.time.strftime('%H:%M')}"
     
-    def get_available_slots(self):
-        """Get available slots for this specific date and time"""
-        booked_count = Booking.objects.filter(
-            restaurant=self.restaurant,
-            booking_date=self.date,
-            time_slot__time=self.time,
-            status__in=['confirmed', 'pending']
-        ).count()
+    def get_available_slots(self, party_size=1):
+        """Get how many more parties of ``party_size`` this date and time can take"""
+        from .capacity import available_capacity
         
-        return max(0, self.max_capacity - booked_count)
+        return available_capacity([self], party_size=party_size)[self.pk]
+
+
+class WaitlistEntryQuerySet(models.QuerySet):
+    def with_position(self):
+        """Annotate ``position`` in the slot's queue, 1 for the next party; None unless waiting"""
+        ahead = WaitlistEntry.objects.filter(
+            date_time_slot=OuterRef('date_time_slot'), status='waiting', id__lt=OuterRef('id')
+        ).order_by().values('date_time_slot').annotate(n=Count('pk')).values('n')
+        return self.annotate(position=Case(
+            When(status='waiting', then=Coalesce(Subquery(ahead), 0) + 1),
+            default=None,
+            output_field=models.IntegerField(),
+        ))
+
+
+class WaitlistEntry(models.Model):
+    """A party waiting for a sold-out DateTimeSlot, served first come, first served"""
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('offered', 'Offered'),
+        ('booked', 'Booked'),
+        ('expired', 'Expired'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    date_time_slot = models.ForeignKey(DateTimeSlot, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='waitlist_entries')
+    
+    # Booking details, used when the offer is accepted
+    party_size = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(20)])
+    special_requests = models.TextField(blank=True)
+    customer_name = models.CharField(max_length=100)
+    customer_phone = models.CharField(max_length=20)
+    customer_email = models.EmailField()
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    created_at = models.DateTimeField(auto_now_add=True)
+    offered_at = models.DateTimeField(null=True, blank=True)
+    offer_expires_at = models.DateTimeField(null=True, blank=True, help_text="A place is held for the party until then")
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    objects = WaitlistEntryQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date_time_slot', 'user'],
+                condition=models.Q(status__in=['waiting', 'offered']),
+                name='waitlist_one_active_entry_per_user',
+            ),
+        ]
+        indexes = [
+            # Per-slot FIFO: the next waiting parties, and live offers held against capacity
+            models.Index(fields=['date_time_slot', 'status', 'id'], name='waitlist_slot_queue_idx'),
+            models.Index(fields=['user', 'status'], name='waitlist_user_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.customer_name} waiting for {self.date_time_slot} ({self.status})"
+    
+    def has_live_offer(self, now=None):
+        return self.status == 'offered' and self.offer_expires_at > (now or timezone.now())
+
+
+class BookingHold(models.Model):
+    """
+    A place reserved on a DateTimeSlot while the user fills in the booking
+    form. Lapsed holds stop counting straight away and are deleted later.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    date_time_slot = models.ForeignKey(DateTimeSlot, on_delete=models.CASCADE, related_name='holds')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='booking_holds')
+    party_size = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(20)])
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            # Live holds counted against a slot, and the sweep of lapsed ones
+            models.Index(fields=['date_time_slot', 'expires_at'], name='hold_slot_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Hold for {self.party_size} on {self.date_time_slot} until {self.expires_at}"
 
 
 class BookingHistory(models.Model):
@@ -192,3 +347,70 @@ class BookingHistory(models.Model):
     
     def __str__(self):
         return f"{self.booking.booking_reference}: {self.status_from} -> {self.status_to}"
+
+
+class ArchivedBooking(models.Model):
+    """
+    A finished booking moved out of ``Booking`` by ``archive_bookings``.
+    
+    Relations are kept as plain ids without constraints, so archived rows
+    survive later changes to restaurants, slots and offers.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    time_slot_id = models.BigIntegerField()
+    booking_time = models.TimeField()
+    
+    booking_date = models.DateField()
+    party_size = models.PositiveIntegerField()
+    special_requests = models.TextField(blank=True)
+    
+    customer_name = models.CharField(max_length=100)
+    customer_phone = models.CharField(max_length=20)
+    customer_email = models.EmailField()
+    
+    applied_offer_id = models.BigIntegerField(null=True, blank=True)
+    original_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    final_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+    
+    booking_reference = models.CharField(max_length=20, unique=True)
+    notes = models.TextField(blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['restaurant', 'created_at']),
+            models.Index(fields=['booking_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.booking_reference} (archived)"
+
+
+class ArchivedBookingHistory(models.Model):
+    """``BookingHistory`` rows of an archived booking"""
+    booking = models.ForeignKey(ArchivedBooking, on_delete=models.CASCADE, related_name='history')
+    status_from = models.CharField(max_length=20)
+    status_to = models.CharField(max_length=20)
+    changed_by_id = models.BigIntegerField(null=True, blank=True)
+    changed_at = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['-changed_at']
+    
+    def __str__(self):
+        return f"{self.booking_id}: {self.status_from} -> {self.status_to}"
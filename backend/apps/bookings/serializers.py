@@ -1,9 +1,22 @@
 from rest_framework import serializers
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from .models import Booking, TimeSlot, BookingHistory, DateTimeSlot
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, OuterRef, Subquery
+from .capacity import ACTIVE_BOOKING_STATUSES, SlotFull, available_capacity, claim_capacity, lock_slot
+from .models import (
+    ArchivedBookingHistory, Booking, TimeSlot, BookingHistory, BookingHold, DateTimeSlot, WaitlistEntry,
+    FINAL_STATUSES, cancellation_cutoff
+)
+from .tasks import promote_waitlist
 from apps.restaurant.models import Restaurant
+from apps.restaurant.serializers import RestaurantListSerializer, CompiledRestaurantListSerializer
+from apps.offers.eligibility import eligible_offers
 from apps.offers.models import Offer
+from apps.offers.pricing import quote_offer
+from apps.core.metrics import BOOKING_CREATIONS
+from apps.core.serializers import CompiledListSerializer, SparseFieldsSerializerMixin
 
 
 class TimeSlotSerializer(serializers.ModelSerializer):
@@ -28,16 +41,23 @@ class DateTimeSlotSerializer(serializers.ModelSerializer):
         fields = ['id', 'time', 'max_capacity', 'available_slots']
     
     def get_available_slots(self, obj):
+        # Views listing many slots pass available_capacity() for all of them
+        available = self.context.get('available_capacity')
+        if available is not None:
+            return available[obj.pk]
         return obj.get_available_slots()
 
 
-class BookingListSerializer(serializers.ModelSerializer):
+class BookingListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     restaurant_image = serializers.URLField(source='restaurant.image', read_only=True)
     time_slot_time = serializers.TimeField(source='time_slot.time', read_only=True)
     offer_title = serializers.CharField(source='applied_offer.title', read_only=True)
     can_cancel = serializers.SerializerMethodField()
     
+    field_dependencies = {'can_cancel': ['status', 'booking_date', 'time_slot__time']}
+    expandable_fields = {'restaurant': RestaurantListSerializer}
+    
     class Meta:
         model = Booking
         fields = [
@@ -52,12 +72,48 @@ class BookingListSerializer(serializers.ModelSerializer):
         return obj.can_be_cancelled()
 
 
-class BookingDetailSerializer(serializers.ModelSerializer):
+class CompiledBookingListSerializer(CompiledListSerializer):
+    """BookingListSerializer output built from values() rows"""
+    serializer_class = BookingListSerializer
+    expandable_fields = {'restaurant': CompiledRestaurantListSerializer}
+
+    def prepare(self, rows):
+        self.cancellation_cutoff = cancellation_cutoff()
+
+    def get_can_cancel(self, row):
+        # Same rule as Booking.can_be_cancelled, with the cutoff computed once
+        if row['status'] in FINAL_STATUSES:
+            return False
+        return (row['booking_date'], row['time_slot__time']) > self.cancellation_cutoff
+
+
+class CompiledArchivedBookingListSerializer(CompiledBookingListSerializer):
+    """BookingListSerializer output built from ArchivedBooking rows"""
+    # Booking lookups the archive answers from its own columns
+    archived_lookups = {
+        'time_slot__time': F('booking_time'),
+        'applied_offer__title': Subquery(Offer.objects.filter(pk=OuterRef('applied_offer_id')).values('title')[:1]),
+    }
+
+    def values(self, queryset):
+        lookups = self.get_lookups()
+        return queryset.values(
+            *[lookup for lookup in lookups if lookup not in self.archived_lookups],
+            **{lookup: expression for lookup, expression in self.archived_lookups.items() if lookup in lookups}
+        )
+
+    def get_can_cancel(self, row):
+        return False
+
+
+class BookingDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     restaurant = serializers.SerializerMethodField()
     time_slot = TimeSlotSerializer(read_only=True)
     applied_offer = serializers.SerializerMethodField()
     can_cancel = serializers.SerializerMethodField()
     
+    field_dependencies = {'can_cancel': ['status', 'booking_date', 'time_slot__time']}
+    
     class Meta:
         model = Booking
         fields = [
@@ -84,7 +140,11 @@ class BookingDetailSerializer(serializers.ModelSerializer):
                 'id': obj.applied_offer.id,
                 'title': obj.applied_offer.title,
                 'description': obj.applied_offer.description,
-                'discount_value': obj.applied_offer.discount_value,
+                'discount_value': (
+                    obj.applied_offer.discount_percentage
+                    if obj.applied_offer.offer_type == 'percentage'
+                    else obj.applied_offer.discount_amount
+                ),
                 'offer_type': obj.applied_offer.offer_type
             }
         return None
@@ -97,13 +157,14 @@ class BookingCreateSerializer(serializers.ModelSerializer):
     restaurant_id = serializers.UUIDField(write_only=True)
     time_slot_id = serializers.IntegerField(write_only=True)
     offer_id = serializers.IntegerField(required=False, allow_null=True, write_only=True)
+    hold_id = serializers.UUIDField(required=False, allow_null=True, write_only=True)
     
     class Meta:
         model = Booking
         fields = [
             'restaurant_id', 'time_slot_id', 'booking_date', 'party_size',
             'special_requests', 'customer_name', 'customer_phone', 
-            'customer_email', 'offer_id'
+            'customer_email', 'offer_id', 'hold_id'
         ]
     
     def validate_booking_date(self, value):
@@ -128,6 +189,18 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Party size cannot exceed 20.")
         return value
     
+    def _live_hold(self, hold_id, user, date_time_slot, party_size):
+        """The user's unexpired hold ``hold_id`` on the slot, as a queryset; empty without one"""
+        if not hold_id:
+            return BookingHold.objects.none()
+        return BookingHold.objects.filter(
+            pk=hold_id,
+            user=user,
+            date_time_slot=date_time_slot,
+            party_size__gte=party_size,
+            expires_at__gt=timezone.now()
+        )
+    
     def validate(self, data):
         # Check if restaurant exists
         try:
@@ -153,15 +226,21 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         except (DateTimeSlot.DoesNotExist, TimeSlot.DoesNotExist):
             raise serializers.ValidationError("Invalid time slot for this restaurant and date.")
         
-        # Check availability using the date-specific slot
-        available_slots = date_time_slot.get_available_slots()
-        if available_slots < 1:  # Each booking takes 1 slot regardless of party size
-            raise serializers.ValidationError(
-                f"No availability. All slots are booked for this time."
-            )
+        # Check availability using the date-specific slot, unless the user's
+        # hold keeps a place; a waitlist offer being accepted also does
+        user = self.context['request'].user
+        data['hold'] = self._live_hold(data.get('hold_id'), user, date_time_slot, data['party_size'])
+        if not data['hold'].exists():
+            available_slots = available_capacity(
+                [date_time_slot], party_size=data['party_size'], exclude_entry=self.context.get('waitlist_entry')
+            )[date_time_slot.pk]
+            if available_slots < 1:
+                BOOKING_CREATIONS.inc(outcome='sold_out')
+                raise serializers.ValidationError(
+                    f"No availability. All slots are booked for this time."
+                )
         
         # Check if user already has a booking for this restaurant, date, and time
-        user = self.context['request'].user
         existing_booking = Booking.objects.filter(
             user=user,
             restaurant=restaurant,
@@ -171,26 +250,33 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         ).exists()
         
         if existing_booking:
+            BOOKING_CREATIONS.inc(outcome='conflict')
             raise serializers.ValidationError(
                 "You already have a booking for this restaurant at this time."
             )
         
-        # Validate offer if provided
+        # Validate offer if provided: it must be usable by this user at the booked time
         if data.get('offer_id'):
-            try:
-                offer = Offer.objects.get(
-                    id=data['offer_id'],
-                    restaurant=restaurant,
-                    is_active=True,
-                    start_date__lte=timezone.now().date(),
-                    end_date__gte=data['booking_date']
-                )
-                data['offer'] = offer
-            except Offer.DoesNotExist:
+            booking_moment = timezone.make_aware(
+                timezone.datetime.combine(data['booking_date'], time_slot.time)
+            )
+            offer = eligible_offers(
+                user=user,
+                at=booking_moment,
+                restaurants=[restaurant]
+            ).filter(id=data['offer_id']).first()
+            if offer is None:
                 raise serializers.ValidationError("Invalid or expired offer.")
+            
+            quote = quote_offer(offer, data['party_size'])
+            if not quote.is_applicable:
+                raise serializers.ValidationError(quote.reason)
+            data['offer'] = offer
+            data['quote'] = quote
         
         data['restaurant'] = restaurant
         data['time_slot'] = time_slot
+        data['date_time_slot'] = date_time_slot
         return data
     
     def create(self, validated_data):
@@ -198,22 +284,150 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         restaurant = validated_data.pop('restaurant')
         time_slot = validated_data.pop('time_slot')
         offer = validated_data.pop('offer', None)
+        quote = validated_data.pop('quote', None)
+        date_time_slot = validated_data.pop('date_time_slot')
+        hold = validated_data.pop('hold')
         validated_data.pop('restaurant_id')
         validated_data.pop('time_slot_id')
         validated_data.pop('offer_id', None)
+        validated_data.pop('hold_id', None)
         
-        # Create booking
-        booking = Booking.objects.create(
+        # A live hold turns into the booking's place with one DELETE. Without
+        # one, re-check under the slot lock, held until the booking commits.
+        deleted, _ = hold.delete()
+        if not deleted:
+            try:
+                claim_capacity(
+                    date_time_slot, validated_data['party_size'], exclude_entry=self.context.get('waitlist_entry')
+                )
+            except SlotFull:
+                BOOKING_CREATIONS.inc(outcome='sold_out')
+                raise serializers.ValidationError("No availability. All slots are booked for this time.")
+        
+        # Create booking, priced from the quote checked in validate()
+        booking = Booking(
             user=self.context['request'].user,
             restaurant=restaurant,
             time_slot=time_slot,
             applied_offer=offer,
             **validated_data
         )
+        booking.save(force_insert=True, quote=quote)
         
         return booking
 
 
+def _open_slot(time_slot_id, user):
+    """The active DateTimeSlot ``time_slot_id``, if it has not started and ``user`` has not booked it"""
+    try:
+        date_time_slot = DateTimeSlot.objects.select_related('restaurant').get(
+            id=time_slot_id, is_active=True
+        )
+    except DateTimeSlot.DoesNotExist:
+        raise serializers.ValidationError("Invalid time slot.")
+    
+    starts_at = timezone.make_aware(timezone.datetime.combine(date_time_slot.date, date_time_slot.time))
+    if starts_at <= timezone.now():
+        raise serializers.ValidationError("This time slot has already started.")
+    
+    if Booking.objects.filter(
+        user=user,
+        restaurant_id=date_time_slot.restaurant_id,
+        booking_date=date_time_slot.date,
+        time_slot__time=date_time_slot.time,
+        status__in=ACTIVE_BOOKING_STATUSES
+    ).exists():
+        raise serializers.ValidationError("You already have a booking for this restaurant at this time.")
+    return date_time_slot
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    time_slot_id = serializers.IntegerField(write_only=True)
+    restaurant_name = serializers.CharField(source='date_time_slot.restaurant.name', read_only=True)
+    date = serializers.DateField(source='date_time_slot.date', read_only=True)
+    time = serializers.TimeField(source='date_time_slot.time', read_only=True)
+    position = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            'id', 'time_slot_id', 'restaurant_name', 'date', 'time', 'party_size',
+            'special_requests', 'customer_name', 'customer_phone', 'customer_email',
+            'status', 'position', 'offer_expires_at', 'booking', 'created_at'
+        ]
+        read_only_fields = ['status', 'offer_expires_at', 'booking', 'created_at']
+    
+    def get_position(self, obj):
+        return getattr(obj, 'position', None)
+    
+    def validate(self, data):
+        data['date_time_slot'] = _open_slot(data['time_slot_id'], self.context['request'].user)
+        return data
+    
+    def create(self, validated_data):
+        validated_data.pop('time_slot_id')
+        
+        # Offers are made under the same lock, so a place freed meanwhile is
+        # either bookable now or will be offered to this entry
+        date_time_slot = lock_slot(validated_data['date_time_slot'].pk)
+        if available_capacity([date_time_slot], party_size=validated_data['party_size'])[date_time_slot.pk] > 0:
+            raise serializers.ValidationError("This time slot has availability. Book it directly.")
+        
+        try:
+            with transaction.atomic():
+                entry = WaitlistEntry.objects.create(user=self.context['request'].user, **validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError("You are already on the waitlist for this time.")
+        
+        # Places held for other checkouts come back when the holds lapse
+        held_until = BookingHold.objects.filter(
+            date_time_slot=date_time_slot, expires_at__gt=timezone.now()
+        ).aggregate(latest=Max('expires_at'))['latest']
+        if held_until is not None:
+            promote_waitlist.delay_until(held_until, date_time_slot.pk)
+        
+        entry.position = WaitlistEntry.objects.filter(
+            date_time_slot=date_time_slot, status='waiting', id__lte=entry.pk
+        ).count()
+        return entry
+
+
+class BookingHoldSerializer(serializers.ModelSerializer):
+    time_slot_id = serializers.IntegerField(write_only=True)
+    restaurant_name = serializers.CharField(source='date_time_slot.restaurant.name', read_only=True)
+    date = serializers.DateField(source='date_time_slot.date', read_only=True)
+    time = serializers.TimeField(source='date_time_slot.time', read_only=True)
+    
+    class Meta:
+        model = BookingHold
+        fields = ['id', 'time_slot_id', 'restaurant_name', 'date', 'time', 'party_size', 'expires_at']
+        read_only_fields = ['expires_at']
+    
+    def validate(self, data):
+        data['date_time_slot'] = _open_slot(data['time_slot_id'], self.context['request'].user)
+        return data
+    
+    def create(self, validated_data):
+        validated_data.pop('time_slot_id')
+        user = self.context['request'].user
+        now = timezone.now()
+        
+        # A user holds one place at a time; a new hold replaces the last one
+        BookingHold.objects.filter(user=user).delete()
+        try:
+            date_time_slot = claim_capacity(validated_data['date_time_slot'], validated_data['party_size'])
+        except SlotFull:
+            raise serializers.ValidationError("No availability. All slots are booked for this time.")
+        
+        # Sweep the slot's lapsed holds while it is locked
+        BookingHold.objects.filter(date_time_slot=date_time_slot, expires_at__lte=now).delete()
+        return BookingHold.objects.create(
+            user=user,
+            expires_at=now + timezone.timedelta(minutes=getattr(settings, 'BOOKING_HOLD_MINUTES', 5)),
+            **validated_data
+        )
+
+
 class BookingHistorySerializer(serializers.ModelSerializer):
     changed_by_name = serializers.CharField(source='changed_by.get_full_name', read_only=True)
     
@@ -223,3 +437,10 @@ class BookingHistorySerializer(serializers.ModelSerializer):
             'status_from', 'status_to', 'changed_by_name', 
             'changed_at', 'notes'
         ]
+
+
+class ArchivedBookingHistorySerializer(BookingHistorySerializer):
+    """BookingHistorySerializer output for ArchivedBookingHistory rows, given their ``changed_by`` users"""
+    
+    class Meta(BookingHistorySerializer.Meta):
+        model = ArchivedBookingHistory
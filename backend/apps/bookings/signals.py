@@ -0,0 +1,68 @@
+# apps/bookings/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core.cache import invalidate_tags_on_commit
+from apps.core.outbox import emit
+from apps.core.routers import pin_to_primary_on_commit
+from .capacity import ACTIVE_BOOKING_STATUSES
+from .models import Booking, BookingHistory
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def pin_booking_owner(sender, instance, **kwargs):
+    """
+    Keep the booking's owner reading from the primary until replicas catch up
+    """
+    pin_to_primary_on_commit(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def invalidate_booking_stats(sender, instance, **kwargs):
+    """
+    Drop the owner's cached booking statistics
+    """
+    invalidate_tags_on_commit(f'bookings:user:{instance.user_id}')
+
+
+@receiver(post_save, sender=Booking)
+def record_booking_event(sender, instance, created, **kwargs):
+    """
+    Record creation and status changes in the outbox, in the saving transaction
+    """
+    previous = getattr(instance, '_loaded_status', None)
+    if created:
+        emit(
+            'booking.created', instance.pk,
+            restaurant_id=instance.restaurant_id, user_id=instance.user_id, status=instance.status
+        )
+    elif previous is not None and previous != instance.status:
+        emit(
+            'booking.status_changed', instance.pk,
+            restaurant_id=instance.restaurant_id, user_id=instance.user_id,
+            status_from=previous, status=instance.status,
+            booking_date=instance.booking_date, time_slot_id=instance.time_slot_id
+        )
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Booking)
+def record_booking_deletion(sender, instance, **kwargs):
+    """
+    Record deleted pending and confirmed bookings, i.e. cancellations that
+    free a place; archiving finished bookings is not an event
+    """
+    if instance.status in ACTIVE_BOOKING_STATUSES:
+        emit(
+            'booking.deleted', instance.pk,
+            restaurant_id=instance.restaurant_id, user_id=instance.user_id, status=instance.status,
+            booking_date=instance.booking_date, time_slot_id=instance.time_slot_id
+        )
+
+
+@receiver(post_save, sender=BookingHistory)
+def pin_booking_editor(sender, instance, created, **kwargs):
+    """
+    Do the same for whoever changed the booking, e.g. restaurant staff
+    """
+    if created:
+        pin_to_primary_on_commit(instance.changed_by_id)
@@ -0,0 +1,30 @@
+# apps/bookings/tasks.py
+from django.utils.dateparse import parse_datetime
+
+from apps.core.taskqueue import task
+from .models import Booking, BookingHistory
+from .waitlist import offer_free_places
+
+
+@task
+def record_booking_history(booking_id, status_from, status_to, changed_by_id, notes, changed_at):
+    """Write a ``BookingHistory`` row for a status change made at ``changed_at``"""
+    booking = Booking.objects.filter(pk=booking_id).first()
+    if booking is None:
+        # Deleted before the task ran; its history went with it
+        return
+    history = BookingHistory.objects.create(
+        booking=booking,
+        status_from=status_from,
+        status_to=status_to,
+        changed_by_id=changed_by_id,
+        notes=notes
+    )
+    # auto_now_add stamps the time the task ran, not when the change happened
+    BookingHistory.objects.filter(pk=history.pk).update(changed_at=parse_datetime(changed_at))
+
+
+@task
+def promote_waitlist(date_time_slot_id):
+    """Offer the slot's free places to its waitlist and expire lapsed offers"""
+    offer_free_places(date_time_slot_id)
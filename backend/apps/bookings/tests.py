@@ -1,3 +1,754 @@
-from django.test import TestCase
+import io
+import uuid
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import OutboxEvent
+from apps.offers.models import Offer
+from apps.restaurant.models import Restaurant
+from .allocation import PlacePlan, TablePlan
+from .archive import archive_horizon, count_bookings
+from .models import ArchivedBooking, ArchivedBookingHistory, Booking, BookingHistory, BookingHold, DateTimeSlot, RestaurantTable, TimeSlot, WaitlistEntry
+from .serializers import BookingListSerializer, CompiledBookingListSerializer
+from .waitlist import offer_free_places
+
+
+class CompiledBookingListSerializerTest(TestCase):
+    def test_matches_booking_list_serializer(self):
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        slot = TimeSlot.objects.create(restaurant=restaurant, time=time(19, 0))
+        user = get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+        now = timezone.now()
+        offer = Offer.objects.create(
+            restaurant=restaurant,
+            title='Ten percent off',
+            description='Test offer',
+            offer_type='percentage',
+            discount_percentage=10,
+            valid_from=now - timedelta(days=1),
+            valid_until=now + timedelta(days=10),
+        )
+        for days, status, applied_offer in [(3, 'pending', offer), (4, 'confirmed', None), (5, 'cancelled', None)]:
+            Booking.objects.create(
+                user=user,
+                restaurant=restaurant,
+                time_slot=slot,
+                booking_date=now.date() + timedelta(days=days),
+                party_size=2,
+                customer_name='Diner',
+                customer_phone='9876543210',
+                customer_email='diner@example.com',
+                applied_offer=applied_offer,
+                original_amount=Decimal('100.00'),
+                status=status,
+            )
+
+        queryset = Booking.objects.select_related('restaurant', 'time_slot', 'applied_offer')
+        expected = BookingListSerializer(queryset, many=True).data
+        with self.assertNumQueries(1):
+            compiled = CompiledBookingListSerializer(queryset).data
+        self.assertEqual(compiled, [dict(item) for item in expected])
+        self.assertNotIn('offer_title', compiled[0])
+
+
+@override_settings(ASYNC_DB_THREADS=0)
+class AsyncTimeSlotsViewTest(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        TimeSlot.objects.create(restaurant=self.restaurant, time=time(19, 0))
+        self.url = f'/api/bookings/restaurant/{self.restaurant.id}/time-slots/'
+        self.client = APIClient()
+
+    def test_served_through_the_async_path(self):
+        date = (timezone.localtime().date() + timedelta(days=1)).isoformat()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='diner', email='diner@example.com', password=None
+        ))
+        response = self.client.get(self.url, {'date': date})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url).json(), {'error': 'Date parameter is required'})
+
+
+class BookingEventTest(TestCase):
+    def test_creation_and_status_changes_are_recorded_in_the_outbox(self):
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        slot = TimeSlot.objects.create(restaurant=restaurant, time=time(19, 0))
+        user = get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+        booking = Booking.objects.create(
+            user=user,
+            restaurant=restaurant,
+            time_slot=slot,
+            booking_date=timezone.now().date() + timedelta(days=3),
+            party_size=2,
+            customer_name='Diner',
+            customer_phone='9876543210',
+            customer_email='diner@example.com',
+        )
+        booking.special_requests = 'Window seat'
+        booking.save()
+        Booking.objects.get(pk=booking.pk).confirm()
+
+        events = list(OutboxEvent.objects.values_list('topic', 'key', 'payload'))
+        self.assertEqual([(topic, key) for topic, key, payload in events], [
+            ('booking.created', str(booking.pk)),
+            ('booking.status_changed', str(booking.pk)),
+        ])
+        self.assertEqual(events[1][2]['status_from'], 'pending')
+        self.assertEqual(events[1][2]['status'], 'confirmed')
+
+    def test_redelivered_events_are_counted_once(self):
+        from apps.core import outbox
+        from apps.core.metrics import BOOKING_EVENTS
+
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        Booking.objects.create(
+            user=get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None),
+            restaurant=restaurant,
+            time_slot=TimeSlot.objects.create(restaurant=restaurant, time=time(19, 0)),
+            booking_date=timezone.localdate() + timedelta(days=1),
+            party_size=2,
+            customer_name='Diner',
+            customer_phone='9876543210',
+            customer_email='diner@example.com',
+        )
+        failures = [RuntimeError('handler down')]
+
+        def flaky(event):
+            if failures:
+                raise failures.pop()
+
+        outbox.discover()
+        handlers = {'booking.created': [*outbox.HANDLERS['booking.created'], flaky]}
+        with mock.patch.dict(outbox.HANDLERS, handlers), mock.patch.object(BOOKING_EVENTS, 'inc') as inc:
+            with self.captureOnCommitCallbacks(execute=True), self.assertLogs('apps.core.outbox', 'ERROR'):
+                outbox.dispatch_batch()
+            self.assertEqual(inc.call_count, 0)
+            OutboxEvent.objects.update(available_at=timezone.now())
+            with self.captureOnCommitCallbacks(execute=True):
+                outbox.dispatch_batch()
+
+        inc.assert_called_once_with(event='created', status='pending')
+        self.assertIsNotNone(OutboxEvent.objects.get().dispatched_at)
+
+
+class BookingArchiveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        self.slot = TimeSlot.objects.create(restaurant=self.restaurant, time=time(19, 0))
+        self.user = get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+
+    def book(self, days_ago, status):
+        booking = Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            time_slot=self.slot,
+            booking_date=timezone.localdate() - timedelta(days=days_ago),
+            party_size=2,
+            customer_name='Diner',
+            customer_phone='9876543210',
+            customer_email='diner@example.com',
+            status=status,
+        )
+        # Bookings are made a few days ahead of the date they are for
+        Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(days=days_ago + 2))
+        return booking
+
+    def test_archives_old_finished_bookings_with_their_history(self):
+        old = self.book(400, 'completed')
+        BookingHistory.objects.create(booking=old, status_from='confirmed', status_to='completed', changed_by=self.user)
+        self.book(300, 'cancelled')
+        kept_pending = self.book(301, 'pending')
+        kept_recent = self.book(10, 'completed')
+
+        call_command('archive_bookings', '--days', '180', '--batch-size', '1', stdout=io.StringIO())
+
+        self.assertEqual(
+            set(Booking.objects.values_list('pk', flat=True)), {kept_pending.pk, kept_recent.pk}
+        )
+        archived = ArchivedBooking.objects.get(pk=old.pk)
+        self.assertEqual((archived.booking_reference, archived.booking_time), (old.booking_reference, time(19, 0)))
+        self.assertEqual(ArchivedBookingHistory.objects.get().booking_id, old.pk)
+        self.assertFalse(BookingHistory.objects.exists())
+
+    def test_counts_read_the_archive_only_for_ranges_that_reach_it(self):
+        self.book(400, 'completed')
+        self.book(10, 'completed')
+        self.book(5, 'pending')
+        call_command('archive_bookings', '--days', '180', stdout=io.StringIO())
+
+        self.assertEqual(
+            count_bookings(('completed', 'pending'), user=self.user),
+            {'total': 3, 'completed': 2, 'pending': 1}
+        )
+        recent = timezone.localdate() - timedelta(days=30)
+        with self.assertNumQueries(1):
+            self.assertEqual(count_bookings(since=recent, user=self.user), {'total': 2})
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/bookings/statistics/')
+        self.assertEqual(response.data['total_bookings'], 3)
+        self.assertEqual(response.data['completed_bookings'], 2)
+        self.assertEqual(response.data['recent_bookings'], 2)
+
+    def test_archived_bookings_stay_readable(self):
+        from apps.staff.models import RestaurantAdmin
+
+        old = self.book(400, 'completed')
+        BookingHistory.objects.create(booking=old, status_from='confirmed', status_to='completed', changed_by=self.user)
+        recent = self.book(10, 'completed')
+        cancelled = self.book(300, 'cancelled')
+        call_command('archive_bookings', '--days', '180', stdout=io.StringIO())
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/bookings/?archived=true')
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([item['id'] for item in results], [str(cancelled.pk), str(old.pk)])
+        self.assertEqual(results[1]['time_slot_time'], '19:00:00')
+        self.assertEqual(results[1]['restaurant_name'], 'Test Kitchen')
+        self.assertFalse(results[1]['can_cancel'])
+        response = client.get('/api/bookings/')
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([item['id'] for item in results], [str(recent.pk)])
+
+        response = client.get(f'/api/bookings/{old.pk}/history/')
+        self.assertEqual(response.data['booking_reference'], old.booking_reference)
+        self.assertEqual(response.data['history'][0]['status_to'], 'completed')
+
+        admin = get_user_model().objects.create_user(username='owner', email='owner@example.com', password=None, role='admin')
+        RestaurantAdmin.objects.create(user=admin, restaurant=self.restaurant)
+        client.force_authenticate(admin)
+        response = client.get('/api/staff/dashboard/bookings/?status=completed')
+        self.assertEqual([item['id'] for item in response.json()], [str(recent.pk), str(old.pk)])
+        response = client.get('/api/staff/dashboard/bookings/?status=cancelled')
+        self.assertEqual([item['id'] for item in response.json()], [str(cancelled.pk)])
+
+
+class AccountBookingsTest(TestCase):
+    def setUp(self):
+        from apps.offers.middleware import OfferExpirationMiddleware
+
+        cache.clear()
+        # Keep the expiry sweep from queueing during the counted requests
+        patcher = mock.patch.object(OfferExpirationMiddleware, '_last_check', timezone.now())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        self.user = get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+        slots = [TimeSlot.objects.create(restaurant=restaurant, time=time(hour, 0)) for hour in (12, 19)]
+        for days, slot, status in [(2, slots[0], 'pending'), (2, slots[1], 'confirmed'), (3, slots[0], 'pending'), (-3, slots[0], 'completed')]:
+            Booking.objects.create(
+                user=self.user,
+                restaurant=restaurant,
+                time_slot=slot,
+                booking_date=timezone.localdate() + timedelta(days=days),
+                party_size=2,
+                customer_name='Diner',
+                customer_phone='9876543210',
+                customer_email='diner@example.com',
+                status=status,
+            )
+        archive_horizon()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_account_page_loads_in_two_queries(self):
+        with self.assertNumQueries(2):
+            statistics = self.client.get('/api/bookings/statistics/')
+            upcoming = self.client.get('/api/bookings/upcoming/')
+
+        self.assertEqual(statistics.data, {
+            'total_bookings': 4, 'confirmed_bookings': 1, 'pending_bookings': 2,
+            'cancelled_bookings': 0, 'completed_bookings': 1, 'recent_bookings': 4,
+        })
+        self.assertEqual(upcoming.data['count'], 3)
+        self.assertEqual(
+            [booking['time_slot_time'] for booking in upcoming.data['bookings']], ['12:00:00', '19:00:00', '12:00:00']
+        )
+
+    def test_statistics_are_cached_until_the_user_books(self):
+        self.client.get('/api/bookings/statistics/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/bookings/statistics/')
+
+        booking = Booking.objects.filter(user=self.user, status='pending').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.confirm()
+        response = self.client.get('/api/bookings/statistics/')
+        self.assertEqual((response.data['pending_bookings'], response.data['confirmed_bookings']), (1, 2))
+
+
+class CancellationRuleTest(TestCase):
+    def setUp(self):
+        from apps.offers.middleware import OfferExpirationMiddleware
+
+        patcher = mock.patch.object(OfferExpirationMiddleware, '_last_check', timezone.now())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        self.user = get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+        slots = [TimeSlot.objects.create(restaurant=restaurant, time=time(hour, 0)) for hour in (12, 17, 19)]
+        today = timezone.localdate()
+        # Two hours' notice from 15:00 puts the cutoff at exactly 17:00 today
+        self.now = timezone.make_aware(timezone.datetime.combine(today, time(15, 0)))
+        for days in (-1, 0, 1):
+            for slot in slots:
+                Booking.objects.create(
+                    user=self.user,
+                    restaurant=restaurant,
+                    time_slot=slot,
+                    booking_date=today + timedelta(days=days),
+                    party_size=2,
+                    customer_name='Diner',
+                    customer_phone='9876543210',
+                    customer_email='diner@example.com',
+                    status='cancelled' if days == 1 and slot.time.hour == 12 else 'confirmed',
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_annotation_matches_model_rule(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            annotated = {booking.pk: booking.is_cancellable for booking in Booking.objects.with_can_cancel()}
+            expected = {booking.pk: booking.can_be_cancelled() for booking in Booking.objects.all()}
+
+        self.assertEqual(annotated, expected)
+        # Tomorrow's 17:00 and 19:00 and today's 19:00; 17:00 today is exactly at the cutoff
+        self.assertEqual(sum(annotated.values()), 3)
+
+    def test_detail_needs_no_per_booking_queries(self):
+        booking = Booking.objects.filter(status='confirmed').order_by('-booking_date', '-time_slot__time').first()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/bookings/{booking.pk}/')
+
+        self.assertTrue(response.data['can_cancel'])
+        self.assertEqual(response.data['time_slot']['time'], '19:00:00')
+
+    def test_annotation_is_ignored_after_a_status_change(self):
+        booking = Booking.objects.with_can_cancel().filter(status='confirmed').order_by('-booking_date').first()
+        self.assertTrue(booking.can_be_cancelled())
+
+        booking.status = 'completed'
+        self.assertFalse(booking.can_be_cancelled())
+
+
+@override_settings(TASK_QUEUE_BACKEND='memory')
+class WaitlistTest(TestCase):
+    def setUp(self):
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        TimeSlot.objects.create(restaurant=restaurant, time=time(19, 0), max_capacity=1)
+        self.slot = DateTimeSlot.objects.create(
+            restaurant=restaurant, date=timezone.localdate() + timedelta(days=1), time=time(19, 0), max_capacity=1
+        )
+        self.clients = {}
+        for name in ('ann', 'ben', 'cat', 'dan'):
+            user = get_user_model().objects.create_user(username=name, email=f'{name}@example.com', password=None)
+            self.clients[name] = APIClient()
+            self.clients[name].force_authenticate(user)
+        self.details = {
+            'party_size': 2, 'customer_name': 'Diner', 'customer_phone': '9876543210', 'customer_email': 'diner@example.com',
+        }
+
+    def book(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.clients[name].post('/api/bookings/', {
+                'restaurant_id': str(self.slot.restaurant_id), 'time_slot_id': self.slot.pk,
+                'booking_date': self.slot.date.isoformat(), **self.details,
+            }, format='json')
+
+    def join(self, name):
+        return self.clients[name].post('/api/bookings/waitlist/', {'time_slot_id': self.slot.pk, **self.details}, format='json')
+
+    def entry(self, name):
+        return WaitlistEntry.objects.get(user__username=name)
+
+    def test_cancellation_is_offered_to_the_waitlist_in_order(self):
+        self.assertIn('Book it directly', str(self.join('ben').data))
+        self.assertEqual(self.book('ann').status_code, 201)
+        self.assertEqual(self.book('ben').status_code, 400)
+        self.assertIn('already have a booking', str(self.join('ann').data))
+
+        self.assertEqual(self.join('ben').data['position'], 1)
+        self.assertEqual(self.join('cat').data['position'], 2)
+        self.assertEqual(self.join('cat').status_code, 400)
+
+        ann_booking = Booking.objects.get(user__username='ann')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clients['ann'].post(f'/api/bookings/{ann_booking.pk}/cancel/')
+
+        self.assertEqual(self.entry('ben').status, 'offered')
+        response = self.clients['cat'].get('/api/bookings/waitlist/')
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(results[0]['position'], 1)
+        # The offer holds the freed place
+        self.assertEqual(self.slot.get_available_slots(), 0)
+        self.assertEqual(self.book('cat').status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            accepted = self.clients['ben'].post(f'/api/bookings/waitlist/{self.entry("ben").pk}/accept/')
+        self.assertEqual(accepted.status_code, 201)
+        self.assertEqual(self.entry('ben').booking_id, Booking.objects.get(user__username='ben').pk)
+        self.assertEqual(self.entry('ben').status, 'booked')
+        self.assertEqual(self.entry('cat').status, 'waiting')
+
+    def test_lapsed_or_declined_offers_pass_to_the_next_party(self):
+        self.book('ann')
+        self.join('ben')
+        self.join('cat')
+        Booking.objects.filter(user__username='ann').update(status='cancelled')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            offered = offer_free_places(self.slot.pk)
+        self.assertEqual([entry.user.username for entry in offered], ['ben'])
+
+        later = timezone.now() + timedelta(minutes=16)
+        with self.captureOnCommitCallbacks(execute=True):
+            offered = offer_free_places(self.slot.pk, now=later)
+        self.assertEqual([entry.user.username for entry in offered], ['cat'])
+        self.assertEqual(self.entry('ben').status, 'expired')
+        self.assertEqual(
+            self.clients['ben'].post(f'/api/bookings/waitlist/{self.entry("ben").pk}/accept/').status_code, 400
+        )
+
+        WaitlistEntry.objects.filter(user__username='cat').update(offer_expires_at=later + timedelta(minutes=15))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clients['cat'].post(f'/api/bookings/waitlist/{self.entry("cat").pk}/cancel/')
+        self.assertEqual(self.entry('cat').status, 'cancelled')
+        self.assertEqual(self.slot.get_available_slots(), 1)
+
+
+    def test_freed_place_is_kept_for_the_line_until_it_is_offered(self):
+        self.book('ann')
+        self.join('ben')
+        # The cancellation commits, but its event has not been handled yet
+        Booking.objects.filter(user__username='ann').update(status='cancelled')
+
+        self.assertEqual(self.slot.get_available_slots(), 0)
+        self.assertEqual(self.book('dan').status_code, 400)
+        hold = self.clients['dan'].post('/api/bookings/holds/', {'time_slot_id': self.slot.pk, 'party_size': 2}, format='json')
+        self.assertEqual(hold.status_code, 400)
+        self.assertEqual(self.join('cat').data['position'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            offered = offer_free_places(self.slot.pk)
+        self.assertEqual([entry.user.username for entry in offered], ['ben'])
+        with self.captureOnCommitCallbacks(execute=True):
+            accepted = self.clients['ben'].post(f'/api/bookings/waitlist/{self.entry("ben").pk}/accept/')
+        self.assertEqual(accepted.status_code, 201)
+
+
+class TablePlanTest(SimpleTestCase):
+    def test_largest_parties_take_the_smallest_tables_that_fit(self):
+        plan = TablePlan({2: 2, 4: 1, 8: 1}, {2: 2, 6: 1})
+        self.assertEqual(plan.capacity_for(1), 1)
+        self.assertEqual(plan.capacity_for(4), 1)
+        self.assertEqual(plan.capacity_for(5), 0)
+
+        # Seating the 2s first would put one at the 4-top and strand the 3
+        plan = TablePlan({2: 1, 4: 2}, {2: 2, 3: 1})
+        self.assertEqual(plan.unseated, 0)
+        self.assertFalse(plan.seat(1))
+
+    def test_parties_no_table_fits_are_counted(self):
+        plan = TablePlan({8: 1}, {10: 1, 2: 1})
+        self.assertEqual(plan.unseated, 1)
+        self.assertEqual(plan.capacity_for(1), 0)
+
+    def test_place_plan_counts_bookings(self):
+        plan = PlacePlan(3, {2: 1, 12: 1})
+        self.assertEqual(plan.capacity_for(20), 1)
+        self.assertTrue(plan.seat(20))
+        self.assertFalse(plan.seat(1))
+
+
+@override_settings(ASYNC_DB_THREADS=0)
+class TableAllocationTest(TestCase):
+    def setUp(self):
+        from apps.offers.middleware import OfferExpirationMiddleware
+
+        patcher = mock.patch.object(OfferExpirationMiddleware, '_last_check', timezone.now())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        RestaurantTable.objects.create(restaurant=self.restaurant, seats=2, quantity=1)
+        RestaurantTable.objects.create(restaurant=self.restaurant, seats=6, quantity=1)
+        # 23 half-hourly slots from 11:00 to 22:00
+        for index in range(23):
+            TimeSlot.objects.create(restaurant=self.restaurant, time=time(11 + index // 2, 30 * (index % 2)))
+        self.date = timezone.localdate() + timedelta(days=1)
+        self.url = f'/api/bookings/restaurant/{self.restaurant.id}/time-slots/'
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='diner', email='diner@example.com', password=None
+        ))
+        self.client.get(self.url, {'date': self.date.isoformat()})
+        self.slot = DateTimeSlot.objects.get(restaurant=self.restaurant, date=self.date, time=time(19, 0))
+
+    def book(self, party_size):
+        return self.client.post('/api/bookings/', {
+            'restaurant_id': str(self.restaurant.pk), 'time_slot_id': self.slot.pk,
+            'booking_date': self.date.isoformat(), 'party_size': party_size,
+            'customer_name': 'Diner', 'customer_phone': '9876543210', 'customer_email': 'diner@example.com',
+        }, format='json')
+
+    def test_parties_are_seated_by_size(self):
+        self.assertEqual(self.slot.get_available_slots(party_size=7), 0)
+        self.assertEqual(self.book(5).status_code, 201)
+        # The 6-top is taken, and a party of 3 does not fit the 2-top
+        self.assertEqual(self.slot.get_available_slots(party_size=3), 0)
+        self.assertEqual(self.slot.get_available_slots(party_size=2), 1)
+
+        Booking.objects.update(user=get_user_model().objects.create_user(username='other', password=None))
+        self.assertEqual(self.book(3).status_code, 400)
+        self.assertEqual(self.book(2).status_code, 201)
+
+    def test_day_of_slots_is_evaluated_in_one_pass(self):
+        Booking.objects.create(
+            user=get_user_model().objects.create_user(username='other', password=None),
+            restaurant=self.restaurant,
+            time_slot=TimeSlot.objects.get(restaurant=self.restaurant, time=time(19, 0)),
+            booking_date=self.date,
+            party_size=4,
+            customer_name='Other',
+            customer_phone='9876543210',
+            customer_email='other@example.com',
+        )
+
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url, {'date': self.date.isoformat(), 'party_size': 4})
+
+        available = {slot['time']: slot['available_slots'] for slot in response.json()['time_slots']}
+        self.assertEqual(len(available), 23)
+        self.assertEqual(available['19:00:00'], 0)
+        self.assertEqual(available['19:30:00'], 1)
+
+    def test_party_size_outside_the_bookable_range_is_rejected(self):
+        for party_size in (0, -3, 21):
+            response = self.client.get(self.url, {'date': self.date.isoformat(), 'party_size': party_size})
+            self.assertEqual(response.status_code, 400, party_size)
+
+
+class BookingHoldTest(TestCase):
+    def setUp(self):
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        TimeSlot.objects.create(restaurant=restaurant, time=time(19, 0), max_capacity=1)
+        self.slot = DateTimeSlot.objects.create(
+            restaurant=restaurant, date=timezone.localdate() + timedelta(days=1), time=time(19, 0), max_capacity=1
+        )
+        self.clients = {}
+        for name in ('ann', 'ben'):
+            user = get_user_model().objects.create_user(username=name, email=f'{name}@example.com', password=None)
+            self.clients[name] = APIClient()
+            self.clients[name].force_authenticate(user)
+
+    def hold(self, name):
+        return self.clients[name].post('/api/bookings/holds/', {'time_slot_id': self.slot.pk, 'party_size': 2}, format='json')
+
+    def book(self, name, hold_id=None):
+        return self.clients[name].post('/api/bookings/', {
+            'restaurant_id': str(self.slot.restaurant_id), 'time_slot_id': self.slot.pk,
+            'booking_date': self.slot.date.isoformat(), 'party_size': 2, 'hold_id': hold_id,
+            'customer_name': 'Diner', 'customer_phone': '9876543210', 'customer_email': 'diner@example.com',
+        }, format='json')
+
+    def test_hold_keeps_the_place_and_converts_with_one_statement(self):
+        hold = self.hold('ann')
+        self.assertEqual(hold.status_code, 201)
+        self.assertEqual(self.slot.get_available_slots(), 0)
+        self.assertEqual(self.hold('ben').status_code, 400)
+        self.assertEqual(self.book('ben').status_code, 400)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.book('ann', hold.data['id']).status_code, 201)
+        hold_writes = [query['sql'] for query in queries if 'bookings_bookinghold' in query['sql'] and 'DELETE' in query['sql']]
+        self.assertEqual(len(hold_writes), 1)
+        # The slot was not locked and recounted
+        self.assertFalse(any('bookings_restauranttable' in query['sql'] for query in queries))
+        self.assertFalse(BookingHold.objects.exists())
+        self.assertEqual(self.slot.get_available_slots(), 0)
+
+    def test_lapsed_holds_stop_counting_and_are_swept(self):
+        first = self.hold('ann').data['id']
+        second = self.hold('ann').data['id']
+        self.assertEqual(list(BookingHold.objects.values_list('pk', flat=True)), [uuid.UUID(second)])
+
+        BookingHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.slot.get_available_slots(), 1)
+        self.assertEqual(self.clients['ann'].get(f'/api/bookings/holds/{second}/').status_code, 404)
+
+        held = self.hold('ben')
+        self.assertEqual(held.status_code, 201)
+        self.assertEqual(list(BookingHold.objects.values_list('pk', flat=True)), [uuid.UUID(held.data['id'])])
+        # A lapsed hold no longer books anything
+        self.assertEqual(self.book('ann', first).status_code, 400)
+
+        self.assertEqual(self.clients['ben'].delete(f'/api/bookings/holds/{held.data["id"]}/').status_code, 204)
+        self.assertEqual(self.book('ann', first).status_code, 201)
+
+
+class BookingPricingTest(TestCase):
+    def setUp(self):
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        TimeSlot.objects.create(restaurant=restaurant, time=time(19, 0))
+        self.slot = DateTimeSlot.objects.create(
+            restaurant=restaurant, date=timezone.localdate() + timedelta(days=1), time=time(19, 0)
+        )
+        now = timezone.now()
+        self.offer = Offer.objects.create(
+            restaurant=restaurant,
+            title='Ten percent off',
+            description='Test offer',
+            offer_type='percentage',
+            discount_percentage=10,
+            valid_from=now - timedelta(days=1),
+            valid_until=now + timedelta(days=10),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+        )
+
+    def amounts(self, booking):
+        booking.refresh_from_db()
+        return booking.original_amount, booking.discount_amount, booking.final_amount
+
+    def test_booking_keeps_its_quote_until_offer_or_party_size_changes(self):
+        from apps.offers.pricing import quote_offer as real_quote_offer
+
+        with mock.patch('apps.bookings.serializers.quote_offer', wraps=real_quote_offer) as quote_offer, \
+                mock.patch('apps.bookings.models.quote_offer', quote_offer):
+            response = self.client.post('/api/bookings/', {
+                'restaurant_id': str(self.slot.restaurant_id), 'time_slot_id': self.slot.pk,
+                'booking_date': self.slot.date.isoformat(), 'party_size': 4, 'offer_id': self.offer.pk,
+                'customer_name': 'Diner', 'customer_phone': '9876543210', 'customer_email': 'diner@example.com',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(quote_offer.call_count, 1)
+        booking = Booking.objects.get()
+        self.assertEqual(self.amounts(booking), (Decimal('200.00'), Decimal('20.00'), Decimal('180.00')))
+
+        # Later edits keep the quoted amounts even though the offer changed
+        Offer.objects.filter(pk=self.offer.pk).update(discount_percentage=50)
+        booking.confirm()
+        booking.cancel()
+        self.assertEqual(self.amounts(booking), (Decimal('200.00'), Decimal('20.00'), Decimal('180.00')))
+
+        booking.party_size = 2
+        booking.save()
+        self.assertEqual(self.amounts(booking), (Decimal('100.00'), Decimal('50.00'), Decimal('50.00')))
 
-# Create your tests here.
@@ -1,4 +1,5 @@
 from django.urls import path
+from apps.core.aio import async_view
 from . import views
 
 app_name = 'bookings'
@@ -10,8 +11,17 @@ urlpatterns = [
     path('<uuid:booking_id>/cancel/', views.cancel_booking, name='cancel-booking'),
     path('<uuid:booking_id>/history/', views.booking_history, name='booking-history'),
     
+    # Short holds on a slot during checkout
+    path('holds/', views.BookingHoldCreateView.as_view(), name='booking-hold-create'),
+    path('holds/<uuid:pk>/', views.BookingHoldDetailView.as_view(), name='booking-hold-detail'),
+    
+    # Waitlists for sold-out slots
+    path('waitlist/', views.WaitlistListCreateView.as_view(), name='waitlist'),
+    path('waitlist/<int:entry_id>/accept/', views.accept_waitlist_offer, name='accept-waitlist-offer'),
+    path('waitlist/<int:entry_id>/cancel/', views.cancel_waitlist_entry, name='cancel-waitlist-entry'),
+    
     # Restaurant time slots
-    path('restaurant/<uuid:restaurant_id>/time-slots/', views.restaurant_time_slots, name='restaurant-time-slots'),
+    path('restaurant/<uuid:restaurant_id>/time-slots/', async_view(views.restaurant_time_slots), name='restaurant-time-slots'),
     
     # Date information
     path('date-info/', views.get_booking_date_info, name='booking-date-info'),
@@ -3,22 +3,66 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.conf import settings
 from django.db.models import Q
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
 from datetime import datetime, timedelta
-from .models import Booking, TimeSlot, BookingHistory, DateTimeSlot
+from .models import ArchivedBooking, Booking, TimeSlot, BookingHistory, BookingHold, DateTimeSlot, WaitlistEntry
+from .archive import archived_history, count_bookings, start_of_day
+from .capacity import available_capacity
+from .tasks import promote_waitlist, record_booking_history
 from .serializers import (
     BookingListSerializer, BookingDetailSerializer, 
     BookingCreateSerializer, TimeSlotSerializer, BookingHistorySerializer,
-    DateTimeSlotSerializer
+    DateTimeSlotSerializer, CompiledBookingListSerializer, WaitlistEntrySerializer,
+    BookingHoldSerializer, CompiledArchivedBookingListSerializer, ArchivedBookingHistorySerializer
 )
 from apps.restaurant.models import Restaurant
+from apps.core.aio import json_response
+from apps.core.cache import get_or_build
+from apps.core.metrics import BOOKING_CREATIONS, WAITLIST_ENTRIES
+from apps.core.serializers import CompiledListMixin, SparseFieldsMixin
 
 
-class BookingListCreateView(generics.ListCreateAPIView):
-    """List user's bookings and create new bookings"""
+def save_booking(serializer, user, waitlist_entry=None):
+    """Create the booking from a validated BookingCreateSerializer, with its history"""
+    try:
+        with transaction.atomic():
+            booking = serializer.save()
+            if waitlist_entry is not None:
+                WaitlistEntry.objects.filter(pk=waitlist_entry.pk).update(status='booked', booking=booking)
+    except IntegrityError:
+        # Lost a race with an identical booking
+        BOOKING_CREATIONS.inc(outcome='conflict')
+        raise ValidationError("You already have a booking for this restaurant at this time.")
+    BOOKING_CREATIONS.inc(outcome='success')
+    
+    # Create booking history entry
+    record_booking_history.delay(
+        booking.pk, '', 'pending', user.pk, 'Booking created', timezone.now()
+    )
+    return booking
+
+
+class BookingListCreateView(SparseFieldsMixin, CompiledListMixin, generics.ListCreateAPIView):
+    """
+    List user's bookings and create new bookings. ``?archived=true`` lists
+    the older finished bookings moved to the archive instead.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    compiled_serializer_class = CompiledBookingListSerializer
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.archived = request.method == 'GET' and request.query_params.get('archived') == 'true'
+        if self.archived:
+            self.compiled_serializer_class = CompiledArchivedBookingListSerializer
     
     def get_queryset(self):
+        if self.archived:
+            return ArchivedBooking.objects.filter(user=self.request.user)
         return Booking.objects.filter(user=self.request.user)
     
     def get_serializer_class(self):
@@ -27,25 +71,20 @@ class BookingListCreateView(generics.ListCreateAPIView):
         return BookingListSerializer
     
     def perform_create(self, serializer):
-        booking = serializer.save()
-        
-        # Create booking history entry
-        BookingHistory.objects.create(
-            booking=booking,
-            status_from='',
-            status_to='pending',
-            changed_by=self.request.user,
-            notes='Booking created'
-        )
+        save_booking(serializer, self.request.user)
 
 
-class BookingDetailView(generics.RetrieveUpdateAPIView):
+class BookingDetailView(SparseFieldsMixin, generics.RetrieveUpdateAPIView):
     """Retrieve and update booking details"""
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = BookingDetailSerializer
     
     def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user)
+        return (
+            Booking.objects.filter(user=self.request.user)
+            .select_related('restaurant', 'time_slot', 'applied_offer')
+            .with_can_cancel()
+        )
 
 
 @api_view(['POST'])
@@ -54,7 +93,7 @@ def cancel_booking(request, booking_id):
     """Cancel a booking and remove it from database"""
     try:
         booking = get_object_or_404(
-            Booking, 
+            Booking.objects.with_can_cancel(), 
             id=booking_id, 
             user=request.user
         )
@@ -129,17 +168,18 @@ def restaurant_time_slots(request, restaurant_id):
                 is_active=True
             )
             
-            # Create date-specific slots from template
-            for template_slot in template_slots:
-                DateTimeSlot.objects.get_or_create(
+            # Create date-specific slots from template; a concurrent request
+            # may create some of them first
+            DateTimeSlot.objects.bulk_create([
+                DateTimeSlot(
                     restaurant=restaurant,
                     date=date,
                     time=template_slot.time,
-                    defaults={
-                        'max_capacity': template_slot.max_capacity,
-                        'is_active': True
-                    }
+                    max_capacity=template_slot.max_capacity,
+                    is_active=True
                 )
+                for template_slot in template_slots
+            ], ignore_conflicts=True)
             
             # Re-fetch the created slots
             date_time_slots = DateTimeSlot.objects.filter(
@@ -148,9 +188,23 @@ def restaurant_time_slots(request, restaurant_id):
                 is_active=True
             )
         
+        # Availability for one party of this size; all slots are evaluated together
+        try:
+            party_size = int(request.GET.get('party_size', 1))
+        except ValueError:
+            return Response({
+                'error': 'Invalid party size'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= party_size <= 20:
+            return Response({
+                'error': 'Party size must be between 1 and 20.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        date_time_slots = list(date_time_slots)
         serializer = DateTimeSlotSerializer(
             date_time_slots, 
-            many=True
+            many=True,
+            context={'available_capacity': available_capacity(date_time_slots, party_size=party_size)}
         )
         
         return Response({
@@ -173,14 +227,14 @@ def restaurant_time_slots(request, restaurant_id):
 def booking_history(request, booking_id):
     """Get booking history"""
     try:
-        booking = get_object_or_404(
-            Booking, 
-            id=booking_id, 
-            user=request.user
-        )
-        
-        history = BookingHistory.objects.filter(booking=booking)
-        serializer = BookingHistorySerializer(history, many=True)
+        booking = Booking.objects.filter(id=booking_id, user=request.user).first()
+        if booking is not None:
+            history = BookingHistory.objects.filter(booking=booking)
+            serializer = BookingHistorySerializer(history, many=True)
+        else:
+            # Finished bookings move to the archive together with their history
+            booking = get_object_or_404(ArchivedBooking, id=booking_id, user=request.user)
+            serializer = ArchivedBookingHistorySerializer(archived_history(booking), many=True)
         
         return Response({
             'booking_reference': booking.booking_reference,
@@ -193,15 +247,14 @@ def booking_history(request, booking_id):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
-@permission_classes([permissions.AllowAny])
-def get_booking_date_info(request):
+@require_GET
+async def get_booking_date_info(request):
     """Get current date and valid booking date range - no authentication required"""
     # Use Django's timezone-aware current date in the configured timezone
     today = timezone.localtime().date() + timedelta(days=1)
     max_date = today + timedelta(days=3)
     
-    return Response({
+    return json_response({
         'today': today.isoformat(),
         'min_date': today.isoformat(),
         'max_date': max_date.isoformat(),
@@ -224,11 +277,12 @@ def upcoming_bookings(request):
             status__in=['pending', 'confirmed']
         ).order_by('booking_date', 'time_slot__time')
         
-        serializer = BookingListSerializer(upcoming, many=True)
+        # One values() query with the restaurant, slot and offer joined in
+        bookings = CompiledBookingListSerializer(upcoming).data
         
         return Response({
-            'count': upcoming.count(),
-            'bookings': serializer.data
+            'count': len(bookings),
+            'bookings': bookings
         })
         
     except Exception as e:
@@ -237,26 +291,36 @@ def upcoming_bookings(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _booking_statistics(user, today):
+    # Recent bookings (last 30 days) are counted in the same aggregate
+    counts = count_bookings(
+        ('confirmed', 'pending', 'cancelled', 'completed'),
+        extra={'recent': Q(created_at__gte=start_of_day(today - timedelta(days=30)))},
+        user=user,
+    )
+    return {
+        'total_bookings': counts['total'],
+        'confirmed_bookings': counts['confirmed'],
+        'pending_bookings': counts['pending'],
+        'cancelled_bookings': counts['cancelled'],
+        'completed_bookings': counts['completed'],
+        'recent_bookings': counts['recent'],
+    }
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def booking_statistics(request):
-    """Get user's booking statistics"""
+    """Get user's booking statistics, archived bookings included"""
     try:
-        user_bookings = Booking.objects.filter(user=request.user)
-        
-        stats = {
-            'total_bookings': user_bookings.count(),
-            'confirmed_bookings': user_bookings.filter(status='confirmed').count(),
-            'pending_bookings': user_bookings.filter(status='pending').count(),
-            'cancelled_bookings': user_bookings.filter(status='cancelled').count(),
-            'completed_bookings': user_bookings.filter(status='completed').count(),
-        }
-        
-        # Recent bookings (last 30 days)
-        recent_date = timezone.now().date() - timedelta(days=30)
-        recent_bookings = user_bookings.filter(created_at__date__gte=recent_date)
-        
-        stats['recent_bookings'] = recent_bookings.count()
+        today = timezone.localdate()
+        stats = get_or_build(
+            # The date rolls the 30-day window over; booking writes drop the tag
+            f'bookings:stats:user:{request.user.pk}:{today.isoformat()}',
+            lambda: _booking_statistics(request.user, today),
+            timeout=getattr(settings, 'BOOKING_STATS_CACHE_TIMEOUT', 3600),
+            tags=(f'bookings:user:{request.user.pk}',),
+        )
         
         return Response(stats)
         
@@ -264,3 +328,102 @@ def booking_statistics(request):
         return Response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class WaitlistListCreateView(generics.ListCreateAPIView):
+    """List the user's open waitlist entries and join the waitlist of a sold-out slot"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = WaitlistEntrySerializer
+    
+    def get_queryset(self):
+        return (
+            WaitlistEntry.objects.filter(user=self.request.user, status__in=['waiting', 'offered'])
+            .select_related('date_time_slot__restaurant')
+            .with_position()
+        )
+    
+    def perform_create(self, serializer):
+        # Holds the slot lock taken by the serializer until the entry commits
+        with transaction.atomic():
+            serializer.save()
+        WAITLIST_ENTRIES.inc(status='waiting')
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def accept_waitlist_offer(request, entry_id):
+    """Book the place a waitlist offer holds, through the normal booking path"""
+    entry = get_object_or_404(
+        WaitlistEntry.objects.select_related('date_time_slot'),
+        id=entry_id,
+        user=request.user
+    )
+    if not entry.has_live_offer():
+        return Response({
+            'error': 'This waitlist entry has no open offer.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    date_time_slot = entry.date_time_slot
+    serializer = BookingCreateSerializer(
+        data={
+            'restaurant_id': date_time_slot.restaurant_id,
+            'time_slot_id': date_time_slot.pk,
+            'booking_date': date_time_slot.date,
+            'party_size': entry.party_size,
+            'special_requests': entry.special_requests,
+            'customer_name': entry.customer_name,
+            'customer_phone': entry.customer_phone,
+            'customer_email': entry.customer_email,
+            'offer_id': request.data.get('offer_id'),
+        },
+        context={'request': request, 'waitlist_entry': entry}
+    )
+    serializer.is_valid(raise_exception=True)
+    booking = save_booking(serializer, request.user, waitlist_entry=entry)
+    WAITLIST_ENTRIES.inc(status='booked')
+    
+    return Response({
+        'message': 'Booking created from waitlist offer',
+        'booking': BookingListSerializer(booking).data
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def cancel_waitlist_entry(request, entry_id):
+    """Leave a waitlist, or decline its offer and pass the place on"""
+    entry = get_object_or_404(WaitlistEntry, id=entry_id, user=request.user)
+    if entry.status not in ('waiting', 'offered'):
+        return Response({
+            'error': 'This waitlist entry is no longer open.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    with transaction.atomic():
+        WaitlistEntry.objects.filter(pk=entry.pk, status=entry.status).update(status='cancelled')
+        if entry.status == 'offered':
+            promote_waitlist.delay(entry.date_time_slot_id)
+    WAITLIST_ENTRIES.inc(status='cancelled')
+    
+    return Response({'message': 'Left the waitlist'})
+
+
+class BookingHoldCreateView(generics.CreateAPIView):
+    """Hold a place on a time slot while the user fills in the booking form"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BookingHoldSerializer
+    
+    def perform_create(self, serializer):
+        # Holds the slot lock taken by the serializer until the hold commits
+        with transaction.atomic():
+            serializer.save()
+
+
+class BookingHoldDetailView(generics.RetrieveDestroyAPIView):
+    """Show or release one of the user's holds"""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BookingHoldSerializer
+    
+    def get_queryset(self):
+        return BookingHold.objects.filter(
+            user=self.request.user, expires_at__gt=timezone.now()
+        ).select_related('date_time_slot__restaurant')
@@ -0,0 +1,101 @@
+# apps/bookings/waitlist.py
+"""
+Waitlists for sold-out ``DateTimeSlot``s.
+
+A party joins the waitlist once instead of polling the time slots. When a
+cancellation frees a place, ``offer_free_places`` offers it to the party
+that has waited longest and fits it; a party too large for the freed
+table keeps its place in line. The offer holds the place for
+``WAITLIST_OFFER_MINUTES``, and the party accepts it by booking through
+the normal booking path. An offer that lapses is passed to the next
+party in line.
+
+``offer_free_places`` runs under the slot lock from ``claim_capacity``, so
+offers and ordinary bookings never take the same place. Waiting parties
+count against the slot's capacity (see ``capacity``), so a place freed
+before the offer is made cannot be booked past the line.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.metrics import WAITLIST_ENTRIES
+from apps.core.outbox import emit_many
+from .capacity import lock_slot, slot_plans
+from .models import DateTimeSlot, TimeSlot, WaitlistEntry
+
+
+def offer_timeout():
+    return timezone.timedelta(minutes=getattr(settings, 'WAITLIST_OFFER_MINUTES', 15))
+
+
+def slot_for_booking(restaurant_id, booking_date, time_slot_id):
+    """The ``DateTimeSlot`` a booking for ``time_slot_id`` on ``booking_date`` takes a place in"""
+    return DateTimeSlot.objects.filter(
+        restaurant_id=restaurant_id,
+        date=booking_date,
+        time__in=TimeSlot.objects.filter(pk=time_slot_id).values('time'),
+    ).first()
+
+
+def offer_free_places(slot_id, now=None):
+    """
+    Expire lapsed offers on the slot, then offer each free place to the
+    next waiting party. Returns the entries offered a place. Safe to run
+    any number of times.
+    """
+    from .tasks import promote_waitlist
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        try:
+            slot = lock_slot(slot_id)
+        except DateTimeSlot.DoesNotExist:
+            return []
+        queue = WaitlistEntry.objects.filter(date_time_slot=slot)
+
+        started = timezone.make_aware(datetime.combine(slot.date, slot.time)) <= now
+        if started:
+            # Nobody left in line can use the place any more
+            lapsed = queue.filter(status__in=['waiting', 'offered'])
+        else:
+            lapsed = queue.filter(status='offered', offer_expires_at__lte=now)
+        WAITLIST_ENTRIES.inc(lapsed.update(status='expired'), status='expired')
+        if started:
+            return []
+
+        if not slot.is_active:
+            return []
+        plan = slot_plans([slot], now=now, waiting=False)[slot.pk]
+        entries = []
+        for entry in queue.filter(status='waiting').order_by('id').iterator():
+            if not plan.capacity_for(1):
+                break
+            if plan.seat(entry.party_size):
+                entries.append(entry)
+        if not entries:
+            return []
+
+        expires_at = now + offer_timeout()
+        for entry in entries:
+            entry.status = 'offered'
+            entry.offered_at = now
+            entry.offer_expires_at = expires_at
+        WaitlistEntry.objects.bulk_update(entries, ['status', 'offered_at', 'offer_expires_at'])
+        WAITLIST_ENTRIES.inc(len(entries), status='offered')
+
+        # Notifiers subscribe to 'waitlist.offered' with @handler
+        emit_many('waitlist.offered', [
+            (entry.pk, {
+                'user_id': entry.user_id,
+                'date_time_slot_id': slot.pk,
+                'restaurant_id': str(slot.restaurant_id),
+                'offer_expires_at': expires_at.isoformat(),
+            })
+            for entry in entries
+        ])
+        # Pass on whatever is not taken up by the time the offers lapse
+        promote_waitlist.delay_until(expires_at, slot.pk)
+    return entries
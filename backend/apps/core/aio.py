@@ -0,0 +1,76 @@
+# apps/core/aio.py
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.http import HttpResponse
+
+from .renderers import FastJSONRenderer
+
+# Set by QueryInstrumentationMiddleware on the async path so that queries
+# run on pool threads are still counted against the request
+current_recorder = contextvars.ContextVar('current_recorder', default=None)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The bounded thread pool that async views run blocking code on"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ASYNC_DB_THREADS', 10),
+                    thread_name_prefix='airdine-async-db',
+                )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    recorder = current_recorder.get()
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            if recorder is not None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func, *args, **kwargs):
+    """
+    Await ``func(*args, **kwargs)`` on the bounded pool.
+
+    At most ``ASYNC_DB_THREADS`` calls run at once, however many requests
+    the event loop is holding, so a traffic spike queues here instead of
+    opening a database connection per request. With ``ASYNC_DB_THREADS = 0``
+    the call runs on the request's own thread, as Django's async ORM does.
+    """
+    if not getattr(settings, 'ASYNC_DB_THREADS', 10):
+        return await sync_to_async(func)(*args, **kwargs)
+    return await sync_to_async(_call, thread_sensitive=False, executor=get_executor())(func, args, kwargs)
+
+
+def async_view(view):
+    """Serve a synchronous (e.g. DRF) view from the async path through ``run_sync``"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        response = await run_sync(view, request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response = await run_sync(response.render)
+        return response
+    return wrapper
+
+
+def json_response(data, status=200):
+    """Render ``data`` exactly as a DRF ``Response`` would"""
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
@@ -0,0 +1,186 @@
+# apps/core/cache.py
+"""
+Application cache layer on top of Django's cache framework.
+
+The backend is the Django cache named by ``APP_CACHE_ALIAS`` (``default``
+when unset). Use LocMemCache in development and tests, and RedisCache, or
+any backend with atomic ``add``, in production.
+
+Entries can carry tags such as ``restaurant:<id>`` or ``offers:<restaurant>``.
+Each tag has a version token stored in the cache, and that token is part of
+every entry key built with the tag. ``invalidate_tags`` replaces the token,
+so all entries built with the old one become unreachable and expire through
+their TTL.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .metrics import CACHE_REQUESTS
+
+_MISSING = object()
+_local_locks = [threading.Lock() for _ in range(64)]
+
+
+def get_cache():
+    return caches[getattr(settings, 'APP_CACHE_ALIAS', 'default')]
+
+
+def _local_lock(key):
+    """Return the per-process lock guarding rebuilds of ``key``"""
+    return _local_locks[hash(key) % len(_local_locks)]
+
+
+def _tag_key(tag):
+    return f'tag:{tag}'
+
+
+def tags_version(tags):
+    """Return a digest of the current version tokens of ``tags``"""
+    cache = get_cache()
+    tag_keys = [_tag_key(tag) for tag in sorted(set(tags))]
+    versions = cache.get_many(tag_keys)
+    for tag_key in tag_keys:
+        if tag_key not in versions:
+            # add() keeps whichever token another process stored first
+            cache.add(tag_key, uuid.uuid4().hex, None)
+            versions[tag_key] = cache.get(tag_key)
+    return hashlib.md5(
+        '|'.join(str(versions[tag_key]) for tag_key in tag_keys).encode()
+    ).hexdigest()[:12]
+
+
+def _versioned_key(key, tags):
+    """Append the current version of ``tags`` to ``key``"""
+    if not tags:
+        return key
+    return f'{key}:{tags_version(tags)}'
+
+
+def invalidate_tags(*tags):
+    """Invalidate every entry carrying any of ``tags``"""
+    get_cache().set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+
+
+def invalidate_tags_on_commit(*tags):
+    """
+    Invalidate ``tags`` once the current transaction commits (immediately
+    outside a transaction), so readers cannot re-cache uncommitted state.
+    """
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def get_or_build(key, builder, timeout, tags=(), lock_timeout=10, wait_interval=0.05):
+    """
+    Return the cached value for ``key``, calling ``builder`` on a miss.
+
+    Only one caller rebuilds a missing key at a time: threads in this
+    process wait on a local lock, and other processes wait on a short-lived
+    lock entry in the shared cache until the value appears.
+    """
+    cache = get_cache()
+    namespace = key.split(':', 1)[0]
+    key = _versioned_key(key, tags)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        CACHE_REQUESTS.inc(namespace=namespace, result='hit')
+        return value
+
+    CACHE_REQUESTS.inc(namespace=namespace, result='miss')
+    with _local_lock(key):
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + lock_timeout
+        acquired = cache.add(lock_key, 1, lock_timeout)
+        while not acquired and time.monotonic() < deadline:
+            # Another process is rebuilding; use its result once it lands
+            time.sleep(wait_interval)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            acquired = cache.add(lock_key, 1, lock_timeout)
+
+        try:
+            value = builder()
+            cache.set(key, value, timeout)
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+        return value
+
+
+class CachedListMixin:
+    """
+    Cache the serialized output of a ListAPIView.
+
+    Views set ``cache_namespace`` and ``cache_tags``. Responses to
+    authenticated users are cached per user and also tagged ``user:<id>``,
+    because serializers may add per-user fields such as ``is_favorited``.
+
+    The key covers only the query parameters the view reads, sorted, so
+    reordered or unknown parameters (``?_=<timestamp>``) share one entry.
+    Views that read other parameters list them in ``cache_query_params``.
+    """
+    cache_namespace = None
+    cache_tags = ()
+    cache_timeout = None
+    cache_query_params = ()
+
+    def get_cache_query_params(self):
+        """Names of the query parameters that change this view's output"""
+        names = set(self.cache_query_params)
+        if hasattr(self, 'get_sparse_fields'):
+            names.update(('fields', 'expand'))
+        for backend_class in self.filter_backends:
+            backend = backend_class()
+            for attr in ('search_param', 'ordering_param'):
+                if hasattr(backend, attr):
+                    names.add(getattr(backend, attr))
+            if hasattr(backend, 'get_filterset_class'):
+                filterset_class = backend.get_filterset_class(self, self.get_queryset())
+                if filterset_class is not None:
+                    names.update(filterset_class.base_filters)
+        paginator = self.paginator
+        for attr in ('page_query_param', 'page_size_query_param', 'limit_query_param',
+                     'offset_query_param', 'cursor_query_param'):
+            if getattr(paginator, attr, None):
+                names.add(getattr(paginator, attr))
+        return names
+
+    def get_cache_key(self):
+        params = self.request.query_params
+        query = urlencode(
+            [(name, params.getlist(name)) for name in sorted(self.get_cache_query_params()) if name in params],
+            doseq=True
+        )
+        key = f'{self.cache_namespace}:{self.request.path}'
+        if query:
+            key = f'{key}?{hashlib.md5(query.encode()).hexdigest()}'
+        if self.request.user.is_authenticated:
+            key = f'{key}:user:{self.request.user.pk}'
+        return key
+
+    def get_cache_tags(self):
+        tags = list(self.cache_tags)
+        if self.request.user.is_authenticated:
+            tags.append(f'user:{self.request.user.pk}')
+        return tags
+
+    def list(self, request, *args, **kwargs):
+        data = get_or_build(
+            self.get_cache_key(),
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+            self.cache_timeout or getattr(settings, 'APP_CACHE_TIMEOUT', 60),
+            tags=self.get_cache_tags()
+        )
+        return Response(data)
@@ -0,0 +1,101 @@
+# apps/core/conditional.py
+"""
+Conditional GET support for DRF views.
+
+The validator is built from cheap data and not from the rendered response:
+
+* the row count and ``max(updated_at)`` of the view's queryset, in one
+  aggregate query,
+* the version tokens of cache tags (see ``apps.core.cache``), for data such
+  as restaurants that has no ``updated_at`` column,
+* the requesting user, because several serializers add per-user fields,
+* optionally a time bucket, for fields derived from the clock such as
+  ``is_open`` or ``is_valid``.
+
+A request whose ``If-None-Match`` matches the validator gets an empty 304
+without rendering the response.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import tags_version
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with 304 when the client's ETag is still current.
+
+    ``conditional_tags`` are tag templates formatted with the URL kwargs,
+    e.g. ``'restaurant:{pk}'``. Views whose output depends on the clock set
+    ``conditional_time_window = True`` to roll the ETag over every
+    ``CONDITIONAL_GET_TIME_WINDOW`` seconds. ``If-Modified-Since`` is only
+    honoured by views that set ``conditional_last_modified``, because
+    ``max(updated_at)`` misses deletions and changes to related rows.
+    """
+    conditional_tags = ()
+    conditional_time_window = False
+    conditional_last_modified = False
+
+    def get_conditional_queryset(self):
+        lookup_url_kwarg = getattr(self, 'lookup_url_kwarg', None) or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            return self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(self.get_queryset())
+
+    def get_conditional_tags(self):
+        tags = [tag.format(**self.kwargs) for tag in self.conditional_tags]
+        if self.request.user.is_authenticated:
+            tags.append(f'user:{self.request.user.pk}')
+        return tags
+
+    def get_conditional_validators(self):
+        """Return the ETag and the last modification time (or None)"""
+        queryset = self.get_conditional_queryset()
+        aggregates = {'count': Count('pk')}
+        field_names = {field.name for field in queryset.model._meta.concrete_fields}
+        if 'updated_at' in field_names:
+            aggregates['last_modified'] = Max('updated_at')
+        values = queryset.aggregate(**aggregates)
+        last_modified = values.get('last_modified')
+        
+        parts = [
+            self.request.get_full_path(),
+            self.request.user.pk or '',
+            values['count'],
+            last_modified.isoformat() if last_modified else '',
+        ]
+        tags = self.get_conditional_tags()
+        if tags:
+            parts.append(tags_version(tags))
+        if self.conditional_time_window:
+            window = getattr(settings, 'CONDITIONAL_GET_TIME_WINDOW', 60)
+            parts.append(int(time.time() // window))
+        
+        digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+        return f'W/"{digest}"', last_modified
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_conditional_validators()
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified if self.conditional_last_modified else None
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Clients may keep the body but must revalidate before reuse
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
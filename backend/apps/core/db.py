@@ -0,0 +1,61 @@
+# apps/core/db.py
+"""
+Connection lifecycle helpers for code that runs outside the request cycle,
+and the collector behind the ``airdine_db_pool_*`` metrics.
+
+Django only closes (or returns to the pool) the connections of threads that
+serve requests. Any other thread that touches the ORM must release its
+connections itself, or they stay open until the process exits.
+"""
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+
+@contextmanager
+def released_connections():
+    """
+    Close every connection the current thread opened on exit.
+
+    Pooled connections go back to the pool. Use it as a context manager or
+    decorator around work done by background threads.
+    """
+    try:
+        yield
+    finally:
+        connections.close_all()
+
+
+def _pool(alias):
+    # Read the pool without creating one; the ``pool`` property opens it
+    wrapper = connections[alias]
+    return getattr(type(wrapper), '_connection_pools', {}).get(alias)
+
+
+def collect_pool_metrics():
+    """Refresh pool gauges from the backends' native connection pools"""
+    for alias in connections:
+        pool = _pool(alias)
+        if pool is None:
+            continue
+        stats = pool.pop_stats()
+        size = stats.get('pool_size', 0)
+        idle = stats.get('pool_available', 0)
+        metrics.DB_POOL_CONNECTIONS.set(size - idle, alias=alias, state='in_use')
+        metrics.DB_POOL_CONNECTIONS.set(idle, alias=alias, state='idle')
+        metrics.DB_POOL_WAITING.set(stats.get('requests_waiting', 0), alias=alias)
+        if stats.get('requests_errors'):
+            metrics.DB_POOL_TIMEOUTS.inc(stats['requests_errors'], alias=alias)
+
+
+def _count_new_connection(sender, connection, **kwargs):
+    metrics.DB_CONNECTIONS_OPENED.inc(alias=connection.alias)
+
+
+def install():
+    """Hook connection accounting into Django; called from ``CoreConfig.ready``"""
+    connection_created.connect(_count_new_connection, dispatch_uid='core.count_new_connection')
+    metrics.REGISTRY.add_collector(collect_pool_metrics)
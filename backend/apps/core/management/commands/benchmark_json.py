@@ -0,0 +1,128 @@
+import time
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = 'Compare JSONRenderer and FastJSONRenderer on large menu and booking payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--menu-items',
+            type=int,
+            default=5000,
+            help='Number of menu items in the menu payload (default: 5000)',
+        )
+        parser.add_argument(
+            '--bookings',
+            type=int,
+            default=10000,
+            help='Number of bookings in the booking list payload (default: 10000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Renders per payload; the best time is reported (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        payloads = [
+            (f"menu ({options['menu_items']} items)", self.menu_payload(options['menu_items'])),
+            (f"bookings ({options['bookings']} rows)", self.booking_payload(options['bookings'], native=False)),
+            (f"bookings ({options['bookings']} rows, native types)", self.booking_payload(options['bookings'], native=True)),
+        ]
+        
+        self.stdout.write(f"{'payload':<40} {'JSONRenderer':>14} {'FastJSON':>10} {'speedup':>8}  identical")
+        for name, data in payloads:
+            baseline, expected = self.measure(JSONRenderer(), data, options['repeat'])
+            fast, rendered = self.measure(FastJSONRenderer(), data, options['repeat'])
+            self.stdout.write(
+                f'{name:<40} {baseline * 1000:>11.1f} ms {fast * 1000:>7.1f} ms '
+                f'{baseline / fast:>7.1f}x  {rendered == expected}'
+            )
+
+    def measure(self, renderer, data, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = renderer.render(data, 'application/json')
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
+
+    def menu_payload(self, count):
+        """Same shape as RestaurantMenuListView's response"""
+        categories = {}
+        for index in range(count):
+            category = f'Category {index % 12}'
+            categories.setdefault(category, []).append({
+                'id': index + 1,
+                'name': f'Dish {index}',
+                'description': 'Slow-cooked with whole spices, served with rice — chef’s special',
+                'price': f'{Decimal(150 + index % 400):.2f}',
+                'image': f'https://images.example.com/menu/{index}.jpg',
+                'category_id': index % 12 + 1,
+                'category_name': category,
+                'is_vegetarian': index % 2 == 0,
+                'is_vegan': index % 5 == 0,
+                'is_gluten_free': index % 7 == 0,
+                'is_spicy': index % 3 == 0,
+                'is_available': True,
+                'is_featured': index % 11 == 0,
+                'display_order': index % 50,
+            })
+        return {
+            'restaurant_id': str(uuid.uuid4()),
+            'restaurant_name': 'Benchmark Kitchen',
+            'total_items': count,
+            'categories': categories,
+            'categories_info': {
+                name: {'id': position + 1, 'name': name}
+                for position, name in enumerate(categories)
+            },
+        }
+
+    def booking_payload(self, count, native):
+        """
+        Same shape as BookingListSerializer output. With ``native`` the
+        values are left as UUID/Decimal/date/datetime objects, as a
+        values()-based serializer would produce them.
+        """
+        created = datetime(2025, 1, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        rows = []
+        for index in range(count):
+            original = Decimal(50 * (2 + index % 10))
+            discount = (original * Decimal('0.10')).quantize(Decimal('0.01'))
+            row = {
+                'id': uuid.uuid4(),
+                'booking_reference': f'AD{index:08d}',
+                'restaurant_name': 'Benchmark Kitchen',
+                'restaurant_image': 'https://images.example.com/restaurant.jpg',
+                'booking_date': date(2025, 1, 1) + timedelta(days=index % 90),
+                'time_slot_time': dt_time(12 + index % 10, 30),
+                'party_size': 2 + index % 10,
+                'status': ('pending', 'confirmed', 'completed', 'cancelled')[index % 4],
+                'customer_name': 'Test Customer',
+                'customer_phone': '9876543210',
+                'original_amount': original,
+                'discount_amount': discount,
+                'final_amount': original - discount,
+                'offer_title': 'Weekday 10% off' if index % 3 == 0 else None,
+                'created_at': created + timedelta(minutes=index),
+                'can_cancel': index % 4 < 2,
+            }
+            if not native:
+                for field in ('id', 'original_amount', 'discount_amount', 'final_amount'):
+                    row[field] = str(row[field])
+                for field in ('booking_date', 'time_slot_time'):
+                    row[field] = row[field].isoformat()
+                row['created_at'] = row['created_at'].isoformat().replace('+00:00', 'Z')
+            rows.append(row)
+        return rows
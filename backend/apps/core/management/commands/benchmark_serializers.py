@@ -0,0 +1,134 @@
+import time
+from datetime import time as dt_time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.bookings.models import Booking, TimeSlot
+from apps.bookings.serializers import BookingListSerializer, CompiledBookingListSerializer
+from apps.menu.models import MenuCategory, MenuItem
+from apps.menu.serializers import RestaurantMenuSerializer, CompiledRestaurantMenuSerializer
+from apps.offers.models import Offer
+from apps.offers.serializers import OfferListSerializer, CompiledOfferListSerializer
+from apps.restaurant.models import Restaurant
+from apps.restaurant.serializers import RestaurantListSerializer, CompiledRestaurantListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare the list serializers with their compiled versions on seeded data (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='Row counts to benchmark (default: 1000 10000)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(max(options['rows']))
+            context = {'request': SimpleNamespace(user=user)}
+            cases = [
+                ('bookings', Booking.objects.select_related('restaurant', 'time_slot', 'applied_offer'),
+                 BookingListSerializer, CompiledBookingListSerializer),
+                ('offers', Offer.objects.select_related('restaurant'),
+                 OfferListSerializer, CompiledOfferListSerializer),
+                ('restaurants', Restaurant.objects.all(),
+                 RestaurantListSerializer, CompiledRestaurantListSerializer),
+                ('menu items', MenuItem.objects.select_related('category', 'restaurant'),
+                 RestaurantMenuSerializer, CompiledRestaurantMenuSerializer),
+            ]
+            
+            self.stdout.write(f"{'serializer':<14} {'rows':>6} {'ModelSerializer':>16} {'compiled':>10} {'speedup':>8}  same JSON")
+            for name, queryset, serializer_class, compiled_class in cases:
+                for rows in options['rows']:
+                    baseline, expected = self.measure(
+                        lambda: serializer_class(queryset[:rows], many=True, context=context).data
+                    )
+                    compiled, output = self.measure(
+                        lambda: compiled_class(queryset[:rows], context=context).data
+                    )
+                    self.stdout.write(
+                        f'{name:<14} {rows:>6} {baseline * 1000:>13.1f} ms {compiled * 1000:>7.1f} ms '
+                        f'{baseline / compiled:>7.1f}x  {output == expected}'
+                    )
+            transaction.set_rollback(True)
+
+    def measure(self, build):
+        started = time.perf_counter()
+        data = build()
+        elapsed = time.perf_counter() - started
+        return elapsed, JSONRenderer().render(data)
+
+    def seed(self, count):
+        now = timezone.now()
+        user = get_user_model().objects.create_user(
+            username='benchmark-user', email='benchmark@example.com', password=None
+        )
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(
+                name=f'Benchmark Kitchen {index}',
+                cuisine='Indian',
+                address='1 Benchmark Street',
+                phone='1234567890',
+                email='kitchen@example.com',
+                image='https://example.com/kitchen.jpg',
+                opening_time=dt_time(9, 0),
+                closing_time=dt_time(23, 0),
+                rating=Decimal('4.50'),
+            )
+            for index in range(count)
+        ])
+        restaurant = restaurants[0]
+        slots = TimeSlot.objects.bulk_create([
+            TimeSlot(restaurant=restaurant, time=dt_time(hour, 0)) for hour in range(12, 23)
+        ])
+        category = MenuCategory.objects.create(name='Benchmark')
+        MenuItem.objects.bulk_create([
+            MenuItem(
+                restaurant=restaurant,
+                category=category,
+                name=f'Dish {index}',
+                description='Slow-cooked with whole spices',
+                price=Decimal(150 + index % 400),
+            )
+            for index in range(count)
+        ])
+        offers = Offer.objects.bulk_create([
+            Offer(
+                restaurant=restaurants[index],
+                title=f'Offer {index}',
+                description='Weekday discount',
+                offer_type='percentage',
+                discount_percentage=Decimal('10.00'),
+                valid_from=now - timedelta(days=1),
+                valid_until=now + timedelta(days=30),
+            )
+            for index in range(count)
+        ])
+        Booking.objects.bulk_create([
+            Booking(
+                user=user,
+                restaurant=restaurant,
+                time_slot=slots[index % len(slots)],
+                booking_date=now.date() + timedelta(days=index // len(slots)),
+                party_size=2 + index % 10,
+                customer_name='Benchmark Customer',
+                customer_phone='9876543210',
+                customer_email='benchmark@example.com',
+                applied_offer=offers[0] if index % 3 == 0 else None,
+                original_amount=Decimal('200.00'),
+                discount_amount=Decimal('20.00'),
+                final_amount=Decimal('180.00'),
+                booking_reference=f'BM{index:08d}',
+            )
+            for index in range(count)
+        ])
+        return user
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/api/bookings/date-info/',
+    '/api/restaurants/stats/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive running servers with many concurrent keep-alive connections and compare '
+        'their throughput, e.g. gunicorn sync workers against uvicorn ASGI workers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='name=base URL of a running server, e.g. asgi=http://127.0.0.1:8001 (repeatable)',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help=f"Path to request; connections cycle through all paths (default: {', '.join(DEFAULT_PATHS)})",
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1000,
+            help='Concurrent connections per target (default: 1000)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Seconds to run against each target (default: 30)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=10,
+            help='Seconds before a single request counts as failed (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            parts = urlsplit(url)
+            if not sep or parts.scheme != 'http' or not parts.hostname:
+                raise CommandError(f'--target must look like name=http://host:port, got {target!r}')
+            targets.append((name, parts.hostname, parts.port or 80, parts.path.rstrip('/')))
+        paths = options['path'] or DEFAULT_PATHS
+
+        self.stdout.write(
+            f"{'target':<10} {'requests':>9} {'errors':>7} {'req/s':>9} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  status codes"
+        )
+        for name, host, port, prefix in targets:
+            result = asyncio.run(self.run_target(
+                host, port, [prefix + path for path in paths],
+                options['concurrency'], options['duration'], options['timeout'],
+            ))
+            latencies = sorted(result['latencies'])
+            self.stdout.write(
+                f"{name:<10} {len(latencies):>9} {result['errors']:>7} "
+                f"{len(latencies) / result['elapsed']:>9.1f} "
+                f'{self.percentile(latencies, 50):>8.1f} {self.percentile(latencies, 95):>8.1f} '
+                f"{self.percentile(latencies, 99):>8.1f}  {dict(result['statuses'])}"
+            )
+
+    async def run_target(self, host, port, paths, concurrency, duration, timeout):
+        result = {'latencies': [], 'errors': 0, 'statuses': Counter()}
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            self.connection(host, port, paths, index, deadline, timeout, result)
+            for index in range(concurrency)
+        ])
+        result['elapsed'] = time.perf_counter() - started
+        return result
+
+    async def connection(self, host, port, paths, index, deadline, timeout, result):
+        """One client connection, reconnecting whenever the server closes it"""
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            request_started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                writer.write(
+                    f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                    f'Accept: application/json\r\n\r\n'.encode()
+                )
+                status, keep_alive = await asyncio.wait_for(self.read_response(reader), timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                result['errors'] += 1
+                writer = self.close(writer)
+                continue
+            result['latencies'].append((time.perf_counter() - request_started) * 1000)
+            result['statuses'][status] += 1
+            if not keep_alive:
+                writer = self.close(writer)
+        self.close(writer)
+
+    async def read_response(self, reader):
+        """Read one HTTP/1.1 response and return its status and whether the connection stays open"""
+        status_line = await reader.readuntil(b'\r\n')
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip().lower()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        else:
+            await reader.read()
+            return int(status), False
+
+        keep_alive = headers.get('connection') != 'close' and version == b'HTTP/1.1'
+        return int(status), keep_alive
+
+    def close(self, writer):
+        if writer is not None:
+            writer.close()
+        return None
+
+    def percentile(self, values, percent):
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
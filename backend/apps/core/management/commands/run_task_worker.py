@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.taskqueue import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks; start as many workers as the load needs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no task is due instead of polling for more',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the queue is empty (default: 1)',
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=300,
+            help='Seconds a claimed task stays locked before another worker may retry it (default: 300)',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(lease=options['lease'])
+        self.stdout.write(f'Task worker {worker.worker_id} started')
+        worker.run(once=options['once'], poll_interval=options['poll_interval'])
+        self.stdout.write(f'Task worker {worker.worker_id} stopped')
@@ -0,0 +1,345 @@
+# apps/core/metrics.py
+"""
+Minimal Prometheus-style metrics with multiprocess aggregation.
+
+Each process keeps its own counters and histograms in memory. When
+``METRICS_MULTIPROCESS_DIR`` is set, it also writes a snapshot to that
+directory at most once per ``METRICS_FLUSH_INTERVAL`` seconds. The metrics
+view merges every snapshot, so totals cover all gunicorn workers and do
+not depend on which worker serves the scrape. Gauges are summed across
+live workers; collectors registered with ``add_collector`` refresh them
+right before each snapshot. A dead worker's gauges are dropped at once,
+and its snapshot file is removed ``METRICS_DEAD_SNAPSHOT_MAX_AGE`` seconds
+after its last write, which Prometheus reads as a counter reset.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._token = f'{self._pid}-{uuid.uuid4().hex[:8]}'
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._last_flush = 0.0
+
+    def _check_fork(self):
+        # A forked worker must not report its parent's samples as its own
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector):
+        """Call ``collector()`` before every snapshot to update gauges"""
+        self._collectors.append(collector)
+        return collector
+
+    def inc(self, name, labels, amount):
+        with self._lock:
+            self._check_fork()
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._check_fork()
+            self._gauges[(name, labels)] = value
+
+    def observe(self, name, labels, buckets, value):
+        with self._lock:
+            self._check_fork()
+            key = (name, labels)
+            sample = self._histograms.get(key)
+            if sample is None:
+                sample = self._histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    sample['buckets'][index] += 1
+            sample['sum'] += value
+            sample['count'] += 1
+        self._maybe_flush()
+
+    def snapshot(self):
+        for collector in self._collectors:
+            collector()
+        with self._lock:
+            self._check_fork()
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self._gauges.items()],
+                'histograms': [
+                    [name, list(labels), {**sample, 'buckets': list(sample['buckets'])}]
+                    for (name, labels), sample in self._histograms.items()
+                ],
+            }
+
+    def _directory(self):
+        return getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+
+    def _maybe_flush(self):
+        if self._directory() and time.monotonic() - self._last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot for other workers to aggregate"""
+        directory = self._directory()
+        if not directory:
+            return
+        self._last_flush = time.monotonic()
+        snapshot = self.snapshot()
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(snapshot, handle)
+        os.replace(temp_path, os.path.join(directory, f'{self._token}.json'))
+
+    def _read_snapshots(self, directory):
+        """Every worker's snapshot, without the gauges of workers that have exited"""
+        max_age = getattr(settings, 'METRICS_DEAD_SNAPSHOT_MAX_AGE', 3600)
+        snapshots = []
+        for filename in os.listdir(directory) if os.path.isdir(directory) else []:
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                alive = _process_alive(int(filename.split('-', 1)[0]))
+                if not alive and time.time() - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+                    continue
+                with open(path) as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                # Worker is mid-write or the file was removed; skip it this scrape
+                continue
+            if not alive:
+                # Pool sizes and the like describe a process that is gone
+                snapshot['gauges'] = []
+            snapshots.append(snapshot)
+        return snapshots
+
+    def collect(self):
+        """Merge the snapshots of every process into one set of samples"""
+        directory = self._directory()
+        if directory:
+            self.flush()
+            snapshots = self._read_snapshots(directory)
+        else:
+            snapshots = [self.snapshot()]
+
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            # Gauges are summed across workers just like counters
+            for name, labels, value in snapshot['counters'] + snapshot.get('gauges', []):
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, sample in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                merged = histograms.setdefault(key, {'buckets': [0] * len(sample['buckets']), 'sum': 0.0, 'count': 0})
+                merged['buckets'] = [a + b for a, b in zip(merged['buckets'], sample['buckets'])]
+                merged['sum'] += sample['sum']
+                merged['count'] += sample['count']
+        return counters, histograms
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        counters, histograms = self.collect()
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda metric: metric.name):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            if metric.kind in ('counter', 'gauge'):
+                for (name, labels), value in sorted(counters.items()):
+                    if name == metric.name:
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            else:
+                for (name, labels), sample in sorted(histograms.items()):
+                    if name != metric.name:
+                        continue
+                    for bound, count in zip(metric.buckets, sample['buckets']):
+                        lines.append(f'{name}_bucket{_format_labels(labels + (("le", _format_value(bound)),))} {count}')
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {sample["count"]}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(sample["sum"])}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {sample["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _process_alive(pid):
+    """Whether process ``pid`` is still running on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        self.registry.inc(self.name, _label_key(self.labelnames, labels), amount)
+
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def set(self, value, **labels):
+        self.registry.set(self.name, _label_key(self.labelnames, labels), value)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.registry = registry
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        self.registry.observe(self.name, _label_key(self.labelnames, labels), self.buckets, value)
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple((name, str(labels[name])) for name in labelnames)
+
+
+# Application metrics
+HTTP_REQUESTS = Counter(
+    'airdine_http_requests_total', 'HTTP requests by route, method and status',
+    ['route', 'method', 'status']
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'airdine_http_request_duration_seconds', 'HTTP request wall time',
+    ['route', 'method']
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'airdine_db_queries_per_request', 'Database queries issued per HTTP request',
+    ['route'], buckets=QUERY_COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'airdine_db_time_per_request_seconds', 'Database time spent per HTTP request',
+    ['route']
+)
+OFFER_EXPIRY_SWEEPS = Counter(
+    'airdine_offer_expiry_sweeps_total', 'Expired offer activation sweeps run'
+)
+OFFER_EXPIRY_ROWS = Counter(
+    'airdine_offer_expiry_rows_total', 'Offer activations marked expired by sweeps'
+)
+BOOKING_CREATIONS = Counter(
+    'airdine_booking_creations_total', 'Booking creation attempts by outcome',
+    ['outcome']
+)
+CACHE_REQUESTS = Counter(
+    'airdine_cache_requests_total', 'Application cache lookups by namespace and result',
+    ['namespace', 'result']
+)
+DB_CONNECTIONS_OPENED = Counter(
+    'airdine_db_connections_opened_total', 'New database connections opened, by alias',
+    ['alias']
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'airdine_db_pool_connections', 'Pooled database connections by alias and state (in_use, idle)',
+    ['alias', 'state']
+)
+DB_POOL_WAITING = Gauge(
+    'airdine_db_pool_waiting', 'Requests currently waiting for a pooled database connection',
+    ['alias']
+)
+DB_POOL_TIMEOUTS = Counter(
+    'airdine_db_pool_timeouts_total', 'Pooled connection requests that failed or timed out waiting',
+    ['alias']
+)
+DB_REPLICA_LAG = Gauge(
+    'airdine_db_replica_lag_seconds', 'Replication lag last measured on each read replica',
+    ['alias']
+)
+TASKS_QUEUED = Counter(
+    'airdine_tasks_queued_total', 'Background tasks written to the task queue',
+    ['task']
+)
+TASK_RUNS = Counter(
+    'airdine_task_runs_total', 'Background task executions by outcome (done, retry, failed)',
+    ['task', 'outcome']
+)
+TASK_DURATION = Histogram(
+    'airdine_task_duration_seconds', 'Background task execution wall time',
+    ['task']
+)
+OUTBOX_EVENTS = Counter(
+    'airdine_outbox_events_total', 'Outbox events handed to handlers by outcome (dispatched, failed)',
+    ['topic', 'outcome']
+)
+OUTBOX_DISPATCH_LAG = Histogram(
+    'airdine_outbox_dispatch_lag_seconds', 'Time from an outbox event being recorded to its dispatch',
+    ['topic'], buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+BOOKING_EVENTS = Counter(
+    'airdine_booking_events_total', 'Booking lifecycle events delivered through the outbox, by new status',
+    ['event', 'status']
+)
+WAITLIST_ENTRIES = Counter(
+    'airdine_waitlist_entries_total', 'Waitlist entries moved to each status (waiting, offered, booked, expired, cancelled)',
+    ['status']
+)
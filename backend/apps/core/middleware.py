@@ -0,0 +1,175 @@
+# apps/core/middleware.py
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .aio import current_recorder
+
+logger = logging.getLogger('airdine.performance')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Reduce a statement to a fingerprint shared by all its parameter variants"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper that times every statement run on a connection"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries.append((context['connection'].alias, sql, duration))
+
+    @property
+    def total_time(self):
+        return sum(duration for alias, sql, duration in self.queries)
+
+    def fingerprints(self):
+        return Counter(normalize_sql(sql) for alias, sql, duration in self.queries)
+
+
+def record_queries(recorder):
+    """Install ``recorder`` on this thread's connections until the returned stack is closed"""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+    return stack
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, DB time, duplicate query fingerprints and wall time
+    for every request.
+
+    Metrics are logged to ``airdine.performance`` and, when DEBUG is on,
+    returned as ``X-DB-*`` / ``X-Request-Time-Ms`` response headers. Requests
+    over the ``SLOW_REQUEST_*`` thresholds are logged as warnings together
+    with the normalized SQL responsible.
+
+    On the async path, queries are recorded both on the request's
+    thread-sensitive thread, where Django runs sync views and
+    ``sync_to_async`` calls, and on the ``apps.core.aio.run_sync`` pool.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.max_request_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        self.max_queries = getattr(settings, 'SLOW_REQUEST_QUERY_COUNT', 30)
+        self.max_duplicates = getattr(settings, 'SLOW_REQUEST_DUPLICATE_QUERIES', 5)
+        self.max_query_ms = getattr(settings, 'SLOW_QUERY_MS', 100)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = current_recorder.set(recorder)
+        try:
+            with record_queries(recorder):
+                response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        self.report(request, response, recorder, wall_ms)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        token = current_recorder.set(recorder)
+        # Connections belong to a thread, so the wrapper goes on the thread
+        # that sync views and thread-sensitive calls of this request use
+        stack = await sync_to_async(record_queries)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_recorder.reset(token)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        self.report(request, response, recorder, wall_ms)
+        return response
+
+    def report(self, request, response, recorder, wall_ms):
+        db_ms = recorder.total_time * 1000
+        fingerprints = recorder.fingerprints()
+        duplicates = {sql: count for sql, count in fingerprints.items() if count > 1}
+        duplicate_count = sum(count - 1 for count in duplicates.values())
+
+        route = request.resolver_match.route if request.resolver_match else 'unmatched'
+        metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        metrics.HTTP_REQUEST_DURATION.observe(wall_ms / 1000, route=route, method=request.method)
+        metrics.DB_QUERIES_PER_REQUEST.observe(len(recorder.queries), route=route)
+        metrics.DB_TIME_PER_REQUEST.observe(recorder.total_time, route=route)
+
+        if settings.DEBUG:
+            response['X-DB-Query-Count'] = str(len(recorder.queries))
+            response['X-DB-Time-Ms'] = f'{db_ms:.1f}'
+            response['X-DB-Duplicate-Queries'] = str(duplicate_count)
+            response['X-Request-Time-Ms'] = f'{wall_ms:.1f}'
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'wall_ms': round(wall_ms, 1),
+            'db_ms': round(db_ms, 1),
+            'query_count': len(recorder.queries),
+            'duplicate_queries': duplicate_count,
+        }
+
+        reasons = []
+        if wall_ms > self.max_request_ms:
+            reasons.append('slow_request')
+        if len(recorder.queries) > self.max_queries:
+            reasons.append('too_many_queries')
+        if duplicate_count > self.max_duplicates:
+            reasons.append('duplicate_queries')
+        slow_queries = [
+            {'sql': normalize_sql(sql), 'ms': round(duration * 1000, 1)}
+            for alias, sql, duration in recorder.queries
+            if duration * 1000 > self.max_query_ms
+        ]
+        if slow_queries:
+            reasons.append('slow_query')
+
+        if not reasons:
+            logger.info(json.dumps(record), extra={'request_metrics': record})
+            return
+
+        record['reasons'] = reasons
+        record['duplicated_sql'] = [
+            {'sql': sql, 'count': count}
+            for sql, count in sorted(duplicates.items(), key=lambda item: -item[1])[:5]
+        ]
+        record['slow_sql'] = sorted(slow_queries, key=lambda query: -query['ms'])[:5]
+        logger.warning(json.dumps(record), extra={'request_metrics': record})
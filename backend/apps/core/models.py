@@ -0,0 +1,67 @@
+# apps/core/models.py
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """A unit of background work queued by ``apps.core.taskqueue``"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Set for tasks declared unique, so a pending duplicate can be found cheaply
+    unique_key = models.CharField(max_length=32, blank=True, default='', db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+            models.Index(fields=['name', 'started_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class OutboxEvent(models.Model):
+    """A domain event recorded by ``apps.core.outbox.emit`` in the transaction that caused it"""
+    topic = models.CharField(max_length=100)
+    # The id of the object the event is about
+    key = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['available_at'],
+                condition=models.Q(dispatched_at__isnull=True),
+                name='core_outbox_pending_idx',
+            ),
+            models.Index(fields=['dispatched_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.topic} {self.key}"
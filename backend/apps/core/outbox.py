@@ -0,0 +1,149 @@
+# apps/core/outbox.py
+"""
+Transactional outbox for domain events.
+
+``emit()`` inserts an event row inside the caller's transaction, so an
+event exists exactly when the change that caused it commits; there is no
+window where the row is saved but the follow-up work is lost, or the
+reverse. Task workers (``run_task_worker``) hand pending events, in batches
+and in insertion order, to the handlers registered with ``@handler`` in
+each app's ``events.py``.
+
+Delivery is at least once: a handler that raises is retried with backoff,
+and a worker that dies mid-batch leaves the whole batch pending. Handlers
+must therefore be idempotent, e.g. recompute a rollup rather than
+increment it.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = defaultdict(list)
+
+_discovered = False
+
+
+def handler(*topics):
+    """Register ``func(event)`` to run for every dispatched event of ``topics``"""
+    def register(func):
+        for topic in topics:
+            HANDLERS[topic].append(func)
+        return func
+    return register
+
+
+def _event(topic, key, payload):
+    from .models import OutboxEvent
+
+    return OutboxEvent(topic=topic, key=str(key), payload=payload)
+
+
+def _dispatch_on_commit():
+    # With the in-memory task queue there is no worker to poll the outbox
+    if getattr(settings, 'TASK_QUEUE_BACKEND', 'database') == 'memory':
+        transaction.on_commit(dispatch_pending)
+
+
+def emit(topic, key, **payload):
+    """Record ``topic`` for the object ``key``; call it inside the transaction that makes the change"""
+    event = _event(topic, key, payload)
+    event.save()
+    _dispatch_on_commit()
+    return event
+
+
+def emit_many(topic, events):
+    """Record one ``topic`` event per ``(key, payload)`` pair with a single insert"""
+    from .models import OutboxEvent
+
+    rows = [_event(topic, key, payload) for key, payload in events]
+    if rows:
+        OutboxEvent.objects.bulk_create(rows)
+        _dispatch_on_commit()
+    return rows
+
+
+class TransactionalSaveMixin:
+    """
+    Run ``save()`` in a transaction so that events emitted by ``post_save``
+    receivers commit together with the row. Deletes already run in one.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+def discover():
+    global _discovered
+    if not _discovered:
+        autodiscover_modules('events')
+        _discovered = True
+
+
+def dispatch_batch(batch_size=None):
+    """
+    Deliver up to ``batch_size`` due events; return how many were taken.
+
+    Pending rows are locked with ``SKIP LOCKED`` where supported, so several
+    workers share the outbox without delivering the same batch twice.
+    """
+    from .models import OutboxEvent
+
+    discover()
+    batch_size = batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 100)
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 10)
+    retry_delay = getattr(settings, 'OUTBOX_RETRY_DELAY', 10)
+    now = timezone.now()
+
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True, available_at__lte=now, attempts__lt=max_attempts)
+            .order_by('id')[:batch_size]
+        )
+        delivered = []
+        for event in events:
+            try:
+                # A failing handler only rolls back its own event's changes
+                with transaction.atomic():
+                    for func in HANDLERS.get(event.topic, ()):
+                        func(event)
+            except Exception as exc:
+                logger.exception("Outbox event %s #%s failed (attempt %s)", event.topic, event.pk, event.attempts + 1)
+                metrics.OUTBOX_EVENTS.inc(topic=event.topic, outcome='failed')
+                OutboxEvent.objects.filter(pk=event.pk).update(
+                    attempts=F('attempts') + 1,
+                    available_at=now + timedelta(seconds=retry_delay * 2 ** event.attempts),
+                    last_error=f'{type(exc).__name__}: {exc}',
+                )
+                continue
+            delivered.append(event.pk)
+            metrics.OUTBOX_EVENTS.inc(topic=event.topic, outcome='dispatched')
+            metrics.OUTBOX_DISPATCH_LAG.observe((now - event.created_at).total_seconds(), topic=event.topic)
+        if delivered:
+            OutboxEvent.objects.filter(pk__in=delivered).update(dispatched_at=now)
+    return len(events)
+
+
+def dispatch_pending():
+    """Deliver every due event"""
+    while dispatch_batch():
+        pass
+
+
+def purge(cutoff):
+    """Delete events dispatched before ``cutoff``"""
+    from .models import OutboxEvent
+
+    OutboxEvent.objects.filter(dispatched_at__lt=cutoff).delete()
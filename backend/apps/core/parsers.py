@@ -0,0 +1,42 @@
+# apps/core/parsers.py
+"""
+Fast JSON parsing for DRF views.
+
+``FastJSONParser`` decodes UTF-8 request bodies with orjson. It defers to
+DRF's ``JSONParser`` for other encodings, non-strict JSON, bodies that
+may hold integers wider than 64 bits and any body orjson rejects, so error
+messages and edge cases behave exactly as before.
+"""
+import codecs
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson turns integers wider than 64 bits into floats; leave such bodies
+# (and harmless look-alikes, such as long digit strings) to the stdlib
+_LONG_NUMBER = re.compile(rb'\d{19}')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding through orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        
+        body = stream.read()
+        if _LONG_NUMBER.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,67 @@
+# apps/core/renderers.py
+"""
+Fast JSON rendering for DRF views.
+
+``FastJSONRenderer`` renders through orjson, which encodes UUID, date, time
+and datetime values natively, and falls back to DRF's ``JSONRenderer``
+whenever orjson is not installed or cannot produce byte-identical output:
+indented or non-compact rendering, ``ensure_ascii``, non-strict JSON, and
+values orjson rejects (e.g. integers wider than 64 bits). Other types,
+Decimal included, go through DRF's own ``JSONEncoder.default``.
+
+Floats outside ``[1e-4, 1e16)`` are written without the exponent padding
+Python uses (``1e16`` rather than ``1e+16``), and NaN/Infinity become
+``null`` rather than raising. No field in this project produces either.
+
+Enable it globally through ``DEFAULT_RENDERER_CLASSES`` or per view with
+``renderer_classes = FAST_RENDERER_CLASSES``.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer producing the same bytes through orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        # Same \u2028/\u2029 escaping as JSONRenderer
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+# Renderer list for views that opt in: FastJSONRenderer takes JSON requests,
+# the configured defaults (e.g. the browsable API) keep working
+FAST_RENDERER_CLASSES = [FastJSONRenderer] + [
+    renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    if renderer is not FastJSONRenderer
+]
@@ -0,0 +1,173 @@
+# apps/core/routers.py
+"""
+Read-replica routing for designated read-only views and querysets.
+
+Reads go to a replica only inside ``replica_reads()`` (or a view wrapped
+by ``ReplicaReadMixin`` / ``@replica_view``) and only when
+``DATABASE_REPLICAS`` lists at least one alias. Everything else, and every
+write, uses the primary. Within a replica block, reads fall back to the
+primary when:
+
+* the block has already written, so it reads its own writes;
+* the user wrote a booking, review or favorite within
+  ``REPLICA_STICKY_SECONDS`` (see ``pin_to_primary_on_commit``);
+* a replica lags by more than ``REPLICA_MAX_LAG`` seconds.
+"""
+import contextvars
+import functools
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+
+from . import metrics
+from .cache import get_cache
+
+PIN_KEY = 'replica:pin:user:{}'
+
+_state = contextvars.ContextVar('replica_state', default=None)
+
+_lag_lock = threading.Lock()
+_lag_checks = {}
+
+
+class _ReplicaState:
+    __slots__ = ('primary',)
+
+    def __init__(self, primary):
+        self.primary = primary
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def is_pinned(user):
+    """Whether ``user`` recently wrote and must read from the primary"""
+    if user is None or not user.is_authenticated:
+        return False
+    return bool(get_cache().get(PIN_KEY.format(user.pk)))
+
+
+def pin_to_primary_on_commit(user_id):
+    """Send ``user_id``'s replica reads to the primary for a while after this commit"""
+    if user_id is None or not get_replicas():
+        return
+    key = PIN_KEY.format(user_id)
+    timeout = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+    transaction.on_commit(lambda: get_cache().set(key, 1, timeout))
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Route reads inside the block to a replica, honouring ``user``'s stickiness"""
+    token = _state.set(_ReplicaState(primary=is_pinned(user)))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def replica_view(view):
+    """
+    Serve a read-only function view from a replica.
+
+    Apply it directly to the function, below ``@api_view``, so that the
+    request's user is known when stickiness is checked.
+    """
+    if iscoroutinefunction(view):
+        # Resolving the user would hit the database from the event loop,
+        # so async views are treated as anonymous public reads
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads(getattr(request, 'user', None)):
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Serve a read-only DRF view from a replica once the user is authenticated"""
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _state.set(_ReplicaState(primary=True))
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _state.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            _state.get().primary = is_pinned(request.user)
+
+
+def replica_lag(alias):
+    """Seconds the replica ``alias`` is behind its primary"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        # An idle primary sends no WAL, so a fully replayed standby is not lagging
+        cursor.execute(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def replica_is_fresh(alias):
+    """Whether ``alias`` is within ``REPLICA_MAX_LAG``, re-checked at most every ``REPLICA_LAG_CHECK_INTERVAL`` seconds"""
+    now = time.monotonic()
+    with _lag_lock:
+        checked = _lag_checks.get(alias)
+    if checked and now - checked[0] < getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 1.0):
+        return checked[1]
+
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError:
+        fresh = False
+    else:
+        metrics.DB_REPLICA_LAG.set(lag, alias=alias)
+        fresh = lag <= getattr(settings, 'REPLICA_MAX_LAG', 5)
+    with _lag_lock:
+        _lag_checks[alias] = (now, fresh)
+    return fresh
+
+
+class ReplicaRouter:
+    """Add to ``DATABASE_ROUTERS``; a no-op until ``DATABASE_REPLICAS`` is set"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            return None
+        if state.primary:
+            return DEFAULT_DB_ALIAS
+        replicas = [alias for alias in get_replicas() if replica_is_fresh(alias)]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.primary = True
+        # Never let an instance loaded from a replica be saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -0,0 +1,338 @@
+# apps/core/serializers.py
+"""
+Serializer helpers for hot read endpoints.
+
+Sparse fieldsets
+    Views using ``SparseFieldsMixin`` accept ``?fields=id,name,image`` to
+    return only those fields and ``?expand=restaurant`` to embed the related
+    objects a serializer lists in ``expandable_fields``. Serializers using
+    ``SparseFieldsSerializerMixin`` drop the fields that were not asked for.
+    ``field_dependencies`` maps their property and method fields to the
+    columns they read, so the queryset can be pruned with ``only()`` (or a
+    narrower ``values()``) as well.
+
+Compiled list serializers
+    A ``CompiledListSerializer`` mirrors an existing ``ModelSerializer``: it
+    reads the field list, sources and field types from ``serializer_class``,
+    but builds plain dicts from ``queryset.values()`` rows instead of running
+    the field machinery for every row of every model instance. Output keys,
+    order and formatting match the mirrored serializer:
+
+    * plain values (strings, integers, booleans) are copied as-is,
+    * Decimal, date, time, datetime, UUID and float fields go through the
+      mirrored field's own ``to_representation``,
+    * read-only fields backed by a model property call the property's getter
+      on the row, so the logic is not duplicated,
+    * ``SerializerMethodField``s are answered by ``get_<name>(row)`` methods
+      on the compiled class, which usually batch their lookups in ``prepare``,
+    * a field sourced through a null foreign key (``applied_offer.title`` with
+      no offer) is left out of the row, as DRF skips it.
+"""
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+CONVERTED_FIELDS = (
+    serializers.DecimalField,
+    serializers.DateTimeField,
+    serializers.DateField,
+    serializers.TimeField,
+    serializers.UUIDField,
+    serializers.FloatField,
+)
+
+
+def _is_property(model, source):
+    return isinstance(getattr(model, source, None), property)
+
+
+def source_lookups(serializer_class, fields):
+    """
+    Return the values()/only() lookups needed to render ``fields`` (bound
+    fields of ``serializer_class``), or None when a field's needs are
+    unknown: a nested serializer, or a property or method field missing
+    from ``field_dependencies``.
+    """
+    model = serializer_class.Meta.model
+    dependencies = getattr(serializer_class, 'field_dependencies', {})
+    lookups = [model._meta.pk.attname]
+    for name, field in fields.items():
+        if name in dependencies:
+            needed = dependencies[name]
+        elif (
+            isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField))
+            or _is_property(model, field.source)
+        ):
+            return None
+        else:
+            needed = [field.source.replace('.', '__')]
+        
+        for lookup in needed:
+            if lookup not in lookups:
+                lookups.append(lookup)
+    return lookups
+
+
+def prune_queryset(queryset, lookups):
+    """
+    Load only the columns behind ``lookups`` and keep select_related only
+    for the relations they traverse (Django refuses to defer a relation it
+    also selects).
+    """
+    selected = queryset.query.select_related
+    if selected is True:
+        return queryset
+    
+    traversed = {lookup.split('__', 1)[0] for lookup in lookups if '__' in lookup}
+    kept = [relation for relation in (selected or {}) if relation in traversed]
+    queryset = queryset.select_related(None)
+    if kept:
+        queryset = queryset.select_related(*kept)
+    return queryset.only(*lookups)
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Restrict a serializer to ``context['fields']`` and add the nested
+    serializers of ``context['expand']`` from ``expandable_fields``.
+    """
+    field_dependencies = {}
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested is not None:
+            for name in list(self.fields):
+                if name not in requested:
+                    self.fields.pop(name)
+        for name in self.context.get('expand', ()):
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+
+
+class SparseFieldsMixin:
+    """
+    Parse ``?fields=`` and ``?expand=`` for GET requests into the serializer
+    context and prune the queryset to the columns those fields need.
+    """
+
+    def _query_list(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return [part.strip() for part in value.split(',') if part.strip()]
+
+    def get_sparse_fields(self):
+        """Return the validated ``(fields, expand)`` of this request"""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        
+        fields = expand = None
+        if self.request.method == 'GET':
+            fields = self._query_list('fields')
+            expand = self._query_list('expand')
+        
+        serializer_class = self.get_serializer_class()
+        expandable = getattr(serializer_class, 'expandable_fields', {})
+        errors = {}
+        if fields is not None:
+            available = set(serializer_class(context={}).fields) | set(expandable)
+            unknown = [name for name in fields if name not in available]
+            if unknown:
+                errors['fields'] = f"Unknown field(s): {', '.join(unknown)}"
+        if expand is not None:
+            unknown = [name for name in expand if name not in expandable]
+            if unknown:
+                errors['expand'] = f"Cannot expand: {', '.join(unknown)}"
+        if errors:
+            raise ValidationError(errors)
+        
+        self._sparse_fields = (fields, expand or [])
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, expand = self.get_sparse_fields()
+        if fields is not None:
+            context['fields'] = fields
+        if expand:
+            context['expand'] = expand
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields, expand = self.get_sparse_fields()
+        if fields is None or expand:
+            return queryset
+        
+        serializer_class = self.get_serializer_class()
+        serializer = serializer_class(context={'fields': fields})
+        lookups = source_lookups(serializer_class, serializer.fields)
+        if lookups is None:
+            return queryset
+        return prune_queryset(queryset, lookups)
+
+
+class Row(dict):
+    """A values() row whose keys can also be read as attributes"""
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class CompiledListSerializer:
+    """
+    Read-only list serializer over values() rows.
+
+    ``expandable_fields`` maps ``?expand=`` names to the compiled serializer
+    of the related model; expanded objects are fetched in one query.
+    """
+    serializer_class = None
+    expandable_fields = {}
+
+    def __init__(self, instance=None, context=None):
+        self.instance = instance
+        self.context = context or {}
+        self.fields = self.serializer_class(context=self.context).fields
+        self.model = self.serializer_class.Meta.model
+        self.expand = [name for name in self.context.get('expand', ()) if name in self.expandable_fields]
+
+    def wants(self, name):
+        """Whether ``name`` is part of the output"""
+        return name in self.fields
+
+    def get_lookups(self):
+        """values() lookups for the requested fields and expansions"""
+        plain_fields = {
+            name: field for name, field in self.fields.items()
+            if name not in self.expand
+        }
+        lookups = source_lookups(self.serializer_class, plain_fields)
+        if lookups is None:
+            # Unknown needs: every concrete column plus the related sources
+            lookups = [field.attname for field in self.model._meta.concrete_fields]
+            for name, field in plain_fields.items():
+                if hasattr(self, f'get_{name}') or _is_property(self.model, field.source):
+                    continue
+                lookup = field.source.replace('.', '__')
+                if lookup not in lookups:
+                    lookups.append(lookup)
+        
+        for name, field in plain_fields.items():
+            relation = self._relation_attname(field.source)
+            if relation is not None and relation not in lookups:
+                lookups.append(relation)
+        for name in self.expand:
+            attname = self.model._meta.get_field(name).attname
+            if attname not in lookups:
+                lookups.append(attname)
+        return lookups
+
+    def values(self, queryset):
+        return queryset.values(*self.get_lookups())
+
+    def prepare(self, rows):
+        """Hook for batch lookups over the rows about to be serialized"""
+
+    def _prepare_expansions(self, rows):
+        context = {
+            key: value for key, value in self.context.items()
+            if key not in ('fields', 'expand')
+        }
+        expanded = {}
+        for name in self.expand:
+            field = self.model._meta.get_field(name)
+            ids = {row[field.attname] for row in rows} - {None}
+            nested = self.expandable_fields[name](context=context)
+            nested_rows = list(nested.values(field.related_model.objects.filter(pk__in=ids)))
+            pk = field.related_model._meta.pk.attname
+            expanded[name] = {
+                row[pk]: item for row, item in zip(nested_rows, nested.serialize(nested_rows))
+            }
+        return expanded
+
+    def _relation_attname(self, source):
+        """Column holding the nullable foreign key a dotted source goes through"""
+        if '.' not in source:
+            return None
+        try:
+            field = self.model._meta.get_field(source.split('.', 1)[0])
+        except FieldDoesNotExist:
+            return None
+        if field.many_to_one and field.null:
+            return field.attname
+        return None
+
+    def _compile(self, expanded):
+        plan = []
+        for name, field in self.fields.items():
+            if name in expanded:
+                attname = self.model._meta.get_field(name).attname
+                getter = lambda row, objects=expanded[name], attname=attname: objects.get(row[attname])
+                plan.append((name, getter, None, None))
+                continue
+            
+            method = getattr(self, f'get_{name}', None)
+            if method is not None:
+                plan.append((name, method, None, None))
+                continue
+            
+            if _is_property(self.model, field.source):
+                getter = getattr(self.model, field.source).fget
+            else:
+                getter = itemgetter(field.source.replace('.', '__'))
+            convert = field.to_representation if isinstance(field, CONVERTED_FIELDS) else None
+            plan.append((name, getter, convert, self._relation_attname(field.source)))
+        return plan
+
+    def serialize(self, rows):
+        rows = [Row(row) for row in rows]
+        self.prepare(rows)
+        plan = self._compile(self._prepare_expansions(rows))
+        
+        data = []
+        for row in rows:
+            item = {}
+            for name, getter, convert, relation in plan:
+                if relation is not None and row[relation] is None:
+                    continue
+                value = getter(row)
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+        return data
+
+    @property
+    def data(self):
+        if not hasattr(self, '_data'):
+            rows = self.instance
+            if isinstance(rows, QuerySet):
+                rows = self.values(rows)
+            self._data = self.serialize(rows)
+        return self._data
+
+
+class CompiledListMixin:
+    """
+    Serve a ListAPIView through ``compiled_serializer_class``, paginating
+    the values() rows exactly as the view paginated model instances.
+    """
+    compiled_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.compiled_serializer_class(context=self.get_serializer_context())
+        rows = serializer.values(self.filter_queryset(self.get_queryset()))
+        
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
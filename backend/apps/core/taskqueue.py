@@ -0,0 +1,288 @@
+# apps/core/taskqueue.py
+"""
+A small durable task queue backed by the ``core_task`` table.
+
+Declare work with ``@task`` in an app's ``tasks.py`` and queue it with
+``.delay(...)``. Arguments must be JSON-serializable (UUIDs, dates and
+Decimals arrive as strings). Queued rows commit atomically with the
+request's own writes and are executed by ``python manage.py
+run_task_worker``. Failed tasks are retried with exponential backoff, and
+``rate_limit`` caps how often a task may start across all workers.
+
+Workers also dispatch the events in the outbox (``apps.core.outbox``).
+
+With ``TASK_QUEUE_BACKEND = 'memory'`` tasks and outbox events are
+handled in process right after the enqueuing transaction commits, which
+suits tests and local development without a worker.
+"""
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from . import metrics, outbox
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+_RATE_PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+
+_memory_queue = deque()
+_memory_lock = threading.Lock()
+
+
+def _parse_rate(rate):
+    """'10/m' -> (10, 60)"""
+    count, _, period = rate.partition('/')
+    return int(count), _RATE_PERIODS[period]
+
+
+class RegisteredTask:
+    def __init__(self, func, name, max_attempts, retry_delay, rate_limit, unique):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.rate_limit = _parse_rate(rate_limit) if rate_limit else None
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` to run in the background"""
+        return enqueue(self, args, kwargs)
+
+    def delay_until(self, run_at, *args, **kwargs):
+        """Like ``delay()``, but not before ``run_at``; the memory backend runs it on commit regardless"""
+        return enqueue(self, args, kwargs, run_at=run_at)
+
+    def retry_at(self, attempts, now):
+        return now + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+
+    def is_rate_limited(self, now):
+        if self.rate_limit is None:
+            return False
+        from .models import Task
+
+        limit, period = self.rate_limit
+        started = Task.objects.filter(name=self.name, started_at__gte=now - timedelta(seconds=period)).count()
+        return started >= limit
+
+
+def task(func=None, *, name=None, max_attempts=3, retry_delay=10, rate_limit=None, unique=False):
+    """
+    Register ``func`` as a background task.
+
+    ``retry_delay`` is the first backoff in seconds and doubles per attempt.
+    ``rate_limit`` is ``'<count>/<s|m|h>'``. ``unique`` skips ``delay()``
+    while an identical call is still pending.
+    """
+    def register(func):
+        registered = RegisteredTask(
+            func, name or f'{func.__module__}.{func.__name__}',
+            max_attempts, retry_delay, rate_limit, unique
+        )
+        TASKS[registered.name] = registered
+        return registered
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def _payload(args, kwargs):
+    # Round-trip through JSON so both backends hand tasks the same types
+    return json.loads(json.dumps([list(args), kwargs], cls=DjangoJSONEncoder))
+
+
+def enqueue(registered, args=(), kwargs=None, run_at=None):
+    args, kwargs = _payload(args, kwargs or {})
+    if getattr(settings, 'TASK_QUEUE_BACKEND', 'database') == 'memory':
+        with _memory_lock:
+            _memory_queue.append((registered.name, args, kwargs))
+        transaction.on_commit(run_memory_queue)
+        return None
+
+    from .models import Task
+
+    unique_key = ''
+    if registered.unique:
+        unique_key = hashlib.md5(
+            json.dumps([registered.name, args, kwargs], sort_keys=True).encode()
+        ).hexdigest()
+        if Task.objects.filter(unique_key=unique_key, status='pending').exists():
+            return None
+    metrics.TASKS_QUEUED.inc(task=registered.name)
+    return Task.objects.create(
+        name=registered.name,
+        args=args,
+        kwargs=kwargs,
+        unique_key=unique_key,
+        max_attempts=registered.max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def run_memory_queue():
+    """Run everything queued in memory, retrying failures straight away"""
+    while True:
+        with _memory_lock:
+            if not _memory_queue:
+                return
+            name, args, kwargs = _memory_queue.popleft()
+        registered = TASKS[name]
+        for attempt in range(1, registered.max_attempts + 1):
+            try:
+                registered.func(*args, **kwargs)
+            except Exception:
+                logger.exception("Task %s failed (attempt %s of %s)", name, attempt, registered.max_attempts)
+                continue
+            metrics.TASK_RUNS.inc(task=name, outcome='done')
+            break
+        else:
+            metrics.TASK_RUNS.inc(task=name, outcome='failed')
+
+
+class Worker:
+    """
+    Claims due tasks one at a time and runs them.
+
+    A claimed task is leased for ``lease`` seconds; if its worker dies, any
+    worker may claim it again once the lease expires.
+    """
+
+    def __init__(self, worker_id=None, lease=300, batch_size=20):
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.lease = lease
+        self.batch_size = batch_size
+        self.stopping = False
+
+    def _claimable(self, now):
+        return Q(status='pending', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+
+    def claim(self):
+        """Claim the next due task that is not rate limited, or return None"""
+        from .models import Task
+
+        now = timezone.now()
+        candidates = Task.objects.filter(self._claimable(now)).order_by('run_at').values_list('pk', 'name')
+        limited = set()
+        for pk, name in candidates[:self.batch_size]:
+            registered = TASKS.get(name)
+            if name in limited or (registered and registered.is_rate_limited(now)):
+                limited.add(name)
+                continue
+            # The conditional update is the lock: only one worker can win it
+            claimed = Task.objects.filter(self._claimable(now), pk=pk).update(
+                status='running',
+                attempts=F('attempts') + 1,
+                locked_by=self.worker_id,
+                locked_until=now + timedelta(seconds=self.lease),
+                started_at=now,
+            )
+            if claimed:
+                return Task.objects.get(pk=pk)
+        return None
+
+    def execute(self, row):
+        from .models import Task
+
+        registered = TASKS.get(row.name)
+        started = time.perf_counter()
+        try:
+            if registered is None:
+                raise LookupError(f'No task registered as {row.name!r}')
+            registered.func(*row.args, **row.kwargs)
+        except Exception as exc:
+            logger.exception("Task %s #%s failed (attempt %s of %s)", row.name, row.pk, row.attempts, row.max_attempts)
+            now = timezone.now()
+            if registered is not None and row.attempts < row.max_attempts:
+                outcome = 'retry'
+                changes = {'status': 'pending', 'run_at': registered.retry_at(row.attempts, now)}
+            else:
+                outcome = 'failed'
+                changes = {'status': 'failed', 'finished_at': now}
+            changes['last_error'] = f'{type(exc).__name__}: {exc}'
+        else:
+            outcome = 'done'
+            changes = {'status': 'done', 'finished_at': timezone.now()}
+        finally:
+            metrics.TASK_DURATION.observe(time.perf_counter() - started, task=row.name)
+
+        metrics.TASK_RUNS.inc(task=row.name, outcome=outcome)
+        # Skip the update if the lease ran out and another worker took over
+        Task.objects.filter(pk=row.pk, locked_by=self.worker_id, status='running').update(
+            locked_until=None, **changes
+        )
+        return outcome
+
+    def run_one(self):
+        """Run one due task; return False when there was nothing to do"""
+        close_old_connections()
+        try:
+            row = self.claim()
+            if row is None:
+                return False
+            self.execute(row)
+            return True
+        finally:
+            close_old_connections()
+
+    def dispatch_events(self):
+        """Dispatch one batch of outbox events; return False when none were due"""
+        close_old_connections()
+        try:
+            return bool(outbox.dispatch_batch())
+        finally:
+            close_old_connections()
+
+    def purge(self):
+        """Delete finished tasks and dispatched events older than ``TASK_QUEUE_RETENTION_DAYS``"""
+        from .models import Task
+
+        cutoff = timezone.now() - timedelta(days=getattr(settings, 'TASK_QUEUE_RETENTION_DAYS', 7))
+        Task.objects.filter(status='done', finished_at__lt=cutoff).delete()
+        outbox.purge(cutoff)
+
+    def run(self, once=False, poll_interval=1.0):
+        """Process tasks and events until stopped (or, with ``once``, until none are due)"""
+        autodiscover_modules('tasks')
+        outbox.discover()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        last_purge = 0.0
+        while not self.stopping:
+            ran = self.run_one()
+            dispatched = self.dispatch_events()
+            if ran or dispatched:
+                continue
+            if once:
+                break
+            if time.monotonic() - last_purge > 3600:
+                self.purge()
+                last_purge = time.monotonic()
+            time.sleep(poll_interval)
+
+    def _stop(self, signum, frame):
+        # Finish the current task, then exit
+        self.stopping = True
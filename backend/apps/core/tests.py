@@ -0,0 +1,897 @@
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+import uuid
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.template.response import TemplateResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import aio, outbox, routers, taskqueue
+from .cache import get_cache, get_or_build, invalidate_tags
+from .db import collect_pool_metrics, released_connections
+from .metrics import Counter, Gauge, Histogram, MetricsRegistry, REGISTRY
+from .models import OutboxEvent, Task
+from .middleware import QueryInstrumentationMiddleware, QueryRecorder, normalize_sql
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+
+
+class MetricsRegistryTest(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.requests = Counter('test_requests_total', 'Requests', ['route'], registry=self.registry)
+        self.latency = Histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1.0), registry=self.registry)
+
+    def test_render_text_exposition(self):
+        self.requests.inc(route='/a')
+        self.requests.inc(2, route='/a')
+        self.latency.observe(0.05)
+        self.latency.observe(0.5)
+
+        output = self.registry.render()
+
+        self.assertIn('# TYPE test_requests_total counter', output)
+        self.assertIn('test_requests_total{route="/a"} 3', output)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', output)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 2', output)
+        self.assertIn('test_latency_seconds_count 2', output)
+
+    def test_label_names_are_enforced(self):
+        with self.assertRaises(ValueError):
+            self.requests.inc(path='/a')
+
+    def test_gauges_are_refreshed_by_collectors(self):
+        in_use = Gauge('test_in_use', 'In use', ['alias'], registry=self.registry)
+        values = iter([3, 1])
+        self.registry.add_collector(lambda: in_use.set(next(values), alias='default'))
+
+        self.assertIn('# TYPE test_in_use gauge', self.registry.render())
+        self.assertIn('test_in_use{alias="default"} 1', self.registry.render())
+
+    def test_snapshots_from_all_workers_are_aggregated(self):
+        worker = MetricsRegistry()
+        worker_requests = Counter('test_requests_total', 'Requests', ['route'], registry=worker)
+        worker_latency = Histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1.0), registry=worker)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_MULTIPROCESS_DIR=directory, METRICS_FLUSH_INTERVAL=0):
+                self.requests.inc(route='/a')
+                self.latency.observe(0.05)
+                worker_requests.inc(4, route='/a')
+                worker_latency.observe(2.0)
+
+                output = self.registry.render()
+
+        self.assertIn('test_requests_total{route="/a"} 5', output)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 2', output)
+
+    def test_dead_workers_drop_their_gauges_then_their_snapshot(self):
+        in_use = Gauge('test_in_use', 'In use', ['alias'], registry=self.registry)
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f'{exited.pid}-deadbeef.json')
+            with open(path, 'w') as handle:
+                json.dump({
+                    'counters': [['test_requests_total', [['route', '/a']], 4]],
+                    'gauges': [['test_in_use', [['alias', 'default']], 7]],
+                    'histograms': [],
+                }, handle)
+            with override_settings(METRICS_MULTIPROCESS_DIR=directory, METRICS_FLUSH_INTERVAL=0):
+                in_use.set(2, alias='default')
+                output = self.registry.render()
+                self.assertIn('test_requests_total{route="/a"} 4', output)
+                self.assertIn('test_in_use{alias="default"} 2', output)
+
+                stale = time.time() - 7200
+                os.utime(path, (stale, stale))
+                self.assertNotIn('test_requests_total{route="/a"}', self.registry.render())
+                self.assertFalse(os.path.exists(path))
+
+
+class MetricsViewTest(TestCase):
+    def test_metrics_are_served_to_internal_clients(self):
+        response = self.client.get('/internal/metrics/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE airdine_booking_creations_total counter', response.content.decode())
+
+    def test_metrics_are_hidden_from_other_clients(self):
+        response = self.client.get('/internal/metrics/', REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_is_required_when_configured(self):
+        # A reverse proxy on the same host makes every client look local
+        response = self.client.get('/internal/metrics/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/internal/metrics/', REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/internal/metrics/', REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-cache-tests'}})
+class TaggedCacheTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_value_is_built_once(self):
+        calls = []
+        build = lambda: calls.append(1) or len(calls)
+
+        self.assertEqual(get_or_build('test:key', build, 60, tags=('a',)), 1)
+        self.assertEqual(get_or_build('test:key', build, 60, tags=('a',)), 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidating_a_tag_rebuilds_its_entries_only(self):
+        counter = iter(range(100))
+        build = lambda: next(counter)
+
+        tagged = get_or_build('test:tagged', build, 60, tags=('a', 'b'))
+        other = get_or_build('test:other', build, 60, tags=('c',))
+        invalidate_tags('b')
+
+        self.assertNotEqual(get_or_build('test:tagged', build, 60, tags=('a', 'b')), tagged)
+        self.assertEqual(get_or_build('test:other', build, 60, tags=('c',)), other)
+
+    def test_concurrent_misses_share_one_build(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        threads = [
+            threading.Thread(target=get_or_build, args=('test:flight', build, 60))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_waits_for_a_build_running_in_another_process(self):
+        from .cache import _versioned_key
+
+        calls = []
+        # Another process holds the rebuild lock and stores the value shortly
+        get_cache().add(f"{_versioned_key('test:remote', ())}:lock", 1, 10)
+        timer = threading.Timer(0.05, lambda: get_cache().set('test:remote', 'built elsewhere', 60))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        value = get_or_build('test:remote', lambda: calls.append(1) or 'built here', 60, wait_interval=0.01)
+
+        self.assertEqual(value, 'built elsewhere')
+        self.assertEqual(calls, [])
+
+    def test_list_cache_key_covers_only_the_parameters_the_view_reads(self):
+        from django_filters.rest_framework import DjangoFilterBackend
+        from rest_framework import filters, generics
+        from apps.restaurant.models import Restaurant
+        from apps.restaurant.views import RecommendedRestaurantsView
+        from .cache import CachedListMixin
+
+        class FilteredView(CachedListMixin, generics.ListAPIView):
+            queryset = Restaurant.objects.all()
+            filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+            filterset_fields = ['cuisine']
+            search_fields = ['name']
+            cache_namespace = 'test'
+
+        def key(view_class, query):
+            view = view_class()
+            view.setup(APIRequestFactory().get(f'/api/test/{query}'))
+            view.request = view.initialize_request(view.request)
+            return view.get_cache_key()
+
+        self.assertEqual(key(FilteredView, ''), key(FilteredView, '?_=1700000000&utm_source=mail'))
+        self.assertEqual(
+            key(FilteredView, '?search=tandoor&cuisine=Indian&ordering=name'),
+            key(FilteredView, '?ordering=name&_=1700000000&cuisine=Indian&search=tandoor')
+        )
+        self.assertNotEqual(key(FilteredView, '?cuisine=Indian'), key(FilteredView, '?cuisine=Thai'))
+        self.assertNotEqual(key(FilteredView, '?ordering=name'), key(FilteredView, '?ordering=-name'))
+        self.assertEqual(
+            key(RecommendedRestaurantsView, '?fields=id,name&expand=offers'),
+            key(RecommendedRestaurantsView, '?expand=offers&_=1700000000&fields=id,name')
+        )
+        self.assertNotEqual(key(RecommendedRestaurantsView, '?fields=id'), key(RecommendedRestaurantsView, '?fields=name'))
+
+
+class FastJSONTest(TestCase):
+    def setUp(self):
+        self.data = {
+            'id': uuid.uuid4(),
+            'amount': Decimal('170.50'),
+            'date': date(2025, 1, 2),
+            'time': dt_time(19, 30),
+            'created_at': datetime(2025, 1, 2, 19, 30, 0, 123456, tzinfo=dt_timezone.utc),
+            'local': datetime(2025, 1, 2, 19, 30, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+            'text': 'Chef\u2019s special \u2028 "quoted" \x1f',
+            'rows': [{1: True, 'none': None, 'rating': 4.6}],
+        }
+
+    def test_output_matches_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, 'application/json'),
+            JSONRenderer().render(self.data, 'application/json')
+        )
+
+    def test_indented_output_falls_back(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, 'application/json; indent=4'),
+            JSONRenderer().render(self.data, 'application/json; indent=4')
+        )
+
+    def test_parser_matches_json_parser(self):
+        body = b'{"party_size": 4, "big": 123456789012345678901234567890, "note": "\\u00e9"}'
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"party_size": NaN}'))
+
+
+class BatchViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='batch', email='batch@example.com', password=None)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_sub_requests_share_one_authentication(self):
+        requests = [
+            {'id': 'featured', 'url': '/api/restaurants/featured/'},
+            {'id': 'bookings', 'url': '/api/bookings/?fields=id'},
+            {'id': 'date', 'url': '/api/bookings/date-info/'},
+            {'id': 'missing', 'url': '/api/nowhere/'},
+        ]
+        with mock.patch.object(JWTAuthentication, 'get_user', autospec=True, side_effect=JWTAuthentication.get_user) as get_user:
+            response = self.client.post('/api/batch/', {'requests': requests}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_user.call_count, 1)
+        responses = response.json()['responses']
+        self.assertEqual([item['id'] for item in responses], ['featured', 'bookings', 'date', 'missing'])
+        self.assertEqual([item['status'] for item in responses], [200, 200, 200, 404])
+        self.assertEqual(responses[1]['body'], self.client.get('/api/bookings/?fields=id').json())
+
+    def test_anonymous_sub_requests_keep_their_permissions(self):
+        response = APIClient().post('/api/batch/', {'requests': [
+            {'url': '/api/restaurants/featured/'},
+            {'url': '/api/bookings/'},
+        ]}, format='json')
+        self.assertEqual([item['status'] for item in response.json()['responses']], [200, 401])
+
+    def test_rejects_invalid_batches(self):
+        for requests in ([], [{'url': 'api/bookings/'}], [{'url': '/api/bookings/', 'method': 'POST'}]):
+            response = self.client.post('/api/batch/', {'requests': requests}, format='json')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/batch/', {'requests': [{'url': '/api/batch/'}]}, format='json')
+        self.assertEqual(response.json()['responses'][0]['status'], 400)
+
+    def test_only_api_routes_can_be_batched(self):
+        requests = [{'url': '/admin/login/'}, {'url': '/internal/metrics/'}, {'url': '/api/restaurants/featured/'}]
+        response = self.client.post('/api/batch/', {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['status'] for item in response.json()['responses']], [404, 404, 200])
+
+    def test_sub_request_render_errors_stay_in_their_entry(self):
+        def broken_view(request):
+            return TemplateResponse(request, 'missing/template.html')
+
+        with mock.patch('apps.core.views.resolve') as resolve:
+            resolve.return_value = mock.Mock(func=broken_view, args=(), kwargs={})
+            response = self.client.post('/api/batch/', {'requests': [{'url': '/api/broken/'}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['responses'][0]['status'], 500)
+
+
+class ConcurrentBatchViewTest(TransactionTestCase):
+    def test_sub_requests_run_on_worker_threads(self):
+        from apps.bookings.views import get_booking_date_info as date_info
+        from .views import batch_view
+
+        threads = set()
+
+        async def record_thread(*args, **kwargs):
+            threads.add(threading.get_ident())
+            return await date_info(*args, **kwargs)
+
+        with mock.patch('apps.core.views.resolve') as resolve:
+            resolve.return_value = mock.Mock(func=record_thread, args=(), kwargs={})
+            # Called directly, so no middleware opens a connection of its own
+            request = APIRequestFactory().post('/api/batch/', {'requests': [
+                {'url': '/api/bookings/date-info/'} for _ in range(4)
+            ]}, format='json')
+            response = batch_view(request)
+
+        self.assertEqual([item['status'] for item in response.data['responses']], [200] * 4)
+        self.assertNotIn(threading.get_ident(), threads)
+
+
+class RunSyncTest(TransactionTestCase):
+    def setUp(self):
+        aio._executor = None
+        self.addCleanup(setattr, aio, '_executor', None)
+
+    @override_settings(ASYNC_DB_THREADS=2)
+    def test_blocking_calls_share_a_bounded_pool(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+        names = set()
+
+        def blocking():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+                names.add(threading.current_thread().name)
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        async def spike():
+            await asyncio.gather(*[aio.run_sync(blocking) for _ in range(8)])
+
+        async_to_sync(spike)()
+        self.assertEqual(max(peak), 2)
+        self.assertTrue(all(name.startswith('airdine-async-db') for name in names))
+
+    @override_settings(ASYNC_DB_THREADS=2)
+    def test_pool_queries_are_recorded_for_the_request(self):
+        from apps.restaurant.models import Restaurant
+
+        recorder = QueryRecorder()
+
+        async def view():
+            token = aio.current_recorder.set(recorder)
+            try:
+                return await aio.run_sync(Restaurant.objects.count)
+            finally:
+                aio.current_recorder.reset(token)
+
+        self.assertEqual(async_to_sync(view)(), 0)
+        self.assertEqual(len(recorder.queries), 1)
+
+
+@override_settings(DEBUG=True)
+class QueryInstrumentationTest(TestCase):
+    def run_async(self, view):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        async def get_response(request):
+            await view()
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(get_response)
+        return async_to_sync(middleware)(RequestFactory().get('/api/restaurants/'))
+
+    def test_sync_code_under_asgi_is_recorded(self):
+        from apps.restaurant.models import Restaurant
+
+        async def view():
+            # How Django's ASGI handler runs a sync view
+            await sync_to_async(Restaurant.objects.count)()
+
+        response = self.run_async(view)
+        self.assertEqual(response['X-DB-Query-Count'], '1')
+
+    @override_settings(ASYNC_DB_THREADS=0)
+    def test_run_sync_without_a_pool_is_recorded(self):
+        from apps.restaurant.models import Restaurant
+
+        async def view():
+            await aio.run_sync(Restaurant.objects.count)
+
+        response = self.run_async(view)
+        self.assertEqual(response['X-DB-Query-Count'], '1')
+
+    def run_sync_view(self, view):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        def get_response(request):
+            view()
+            return HttpResponse()
+
+        middleware = QueryInstrumentationMiddleware(get_response)
+        return middleware(RequestFactory().get('/api/restaurants/'))
+
+    def test_normalize_sql_shares_one_fingerprint_across_parameters(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE name = 'O''Brien' AND id = 42 AND price > 9.5"),
+            'SELECT * FROM t WHERE name = ? AND id = ? AND price > ?'
+        )
+        self.assertEqual(
+            normalize_sql('SELECT *\n  FROM t\n WHERE id IN (%s, %s, %s)'),
+            normalize_sql('SELECT * FROM t WHERE id IN (%s)'),
+        )
+        self.assertEqual(normalize_sql('SELECT * FROM t WHERE id IN (%s, %s)'), 'SELECT * FROM t WHERE id IN (...)')
+        # Digits inside identifiers are kept
+        self.assertEqual(normalize_sql('SELECT col1 FROM t2'), 'SELECT col1 FROM t2')
+
+    def test_repeated_statements_are_counted_as_duplicates(self):
+        from apps.restaurant.models import Restaurant
+
+        def view():
+            for name in ('a', 'b', 'c'):
+                Restaurant.objects.filter(name=name).exists()
+            Restaurant.objects.count()
+
+        response = self.run_sync_view(view)
+        self.assertEqual(response['X-DB-Query-Count'], '4')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '2')
+
+    def test_requests_under_the_thresholds_are_logged_as_info(self):
+        from apps.restaurant.models import Restaurant
+
+        with self.assertLogs('airdine.performance', 'INFO') as logs:
+            self.run_sync_view(Restaurant.objects.count)
+        self.assertEqual([record.levelname for record in logs.records], ['INFO'])
+        self.assertEqual(logs.records[0].request_metrics['query_count'], 1)
+        self.assertNotIn('reasons', logs.records[0].request_metrics)
+
+    @override_settings(SLOW_REQUEST_QUERY_COUNT=3, SLOW_REQUEST_DUPLICATE_QUERIES=1, SLOW_REQUEST_MS=0, SLOW_QUERY_MS=-1)
+    def test_requests_over_the_thresholds_are_logged_as_warnings(self):
+        from apps.restaurant.models import Restaurant
+
+        def view():
+            for name in ('a', 'b', 'c', 'd'):
+                Restaurant.objects.filter(name=name).exists()
+
+        with self.assertLogs('airdine.performance', 'WARNING') as logs:
+            self.run_sync_view(view)
+        record = logs.records[0].request_metrics
+        self.assertEqual(record['reasons'], ['slow_request', 'too_many_queries', 'duplicate_queries', 'slow_query'])
+        self.assertEqual(len(record['duplicated_sql']), 1)
+        self.assertEqual(record['duplicated_sql'][0]['count'], 4)
+        self.assertIn('"name" = ?', record['duplicated_sql'][0]['sql'])
+        self.assertEqual(len(record['slow_sql']), 4)
+
+    @override_settings(SLOW_REQUEST_QUERY_COUNT=4, SLOW_REQUEST_DUPLICATE_QUERIES=3)
+    def test_thresholds_are_exclusive(self):
+        from apps.restaurant.models import Restaurant
+
+        def view():
+            for name in ('a', 'b', 'c', 'd'):
+                Restaurant.objects.filter(name=name).exists()
+
+        with self.assertLogs('airdine.performance', 'INFO') as logs:
+            self.run_sync_view(view)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+
+
+class ConnectionLifecycleTest(TransactionTestCase):
+    def test_background_threads_release_their_connections(self):
+        from apps.restaurant.models import Restaurant
+
+        @released_connections()
+        def job():
+            Restaurant.objects.count()
+            raise ValueError
+
+        def worker():
+            with self.assertRaises(ValueError):
+                job()
+
+        # SQLite keeps in-memory test databases open, so watch the release itself
+        with mock.patch.object(connections, 'close_all', wraps=connections.close_all) as close_all:
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        self.assertEqual(close_all.call_count, 1)
+
+    def test_pool_metrics_are_read_from_the_native_pool(self):
+        class FakePool:
+            def pop_stats(self):
+                return {'pool_size': 5, 'pool_available': 2, 'requests_waiting': 4, 'requests_errors': 1}
+
+        wrapper_class = type(connections['default'])
+        with mock.patch.object(wrapper_class, '_connection_pools', {'default': FakePool()}, create=True):
+            collect_pool_metrics()
+            output = REGISTRY.render()
+
+        self.assertIn('airdine_db_pool_connections{alias="default",state="in_use"} 3', output)
+        self.assertIn('airdine_db_pool_connections{alias="default",state="idle"} 2', output)
+        self.assertIn('airdine_db_pool_waiting{alias="default"} 4', output)
+        self.assertIn('airdine_db_pool_timeouts_total{alias="default"}', output)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    REPLICA_MAX_LAG=5,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-router-tests'}},
+)
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        routers._lag_checks.clear()
+        self.router = routers.ReplicaRouter()
+        patcher = mock.patch.object(routers, 'replica_lag', return_value=0.5)
+        self.replica_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_designated_reads_use_the_replica(self):
+        self.assertIsNone(self.router.db_for_read(None))
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(None), 'replica')
+            self.assertEqual(self.router.db_for_write(None), 'default')
+            # Reads after a write in the same block see that write
+            self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        self.replica_lag.return_value = 30
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_users_who_just_wrote_read_from_primary(self):
+        user = get_user_model().objects.create_user(username='writer', email='writer@example.com', password=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            routers.pin_to_primary_on_commit(user.pk)
+
+        with routers.replica_reads(user):
+            self.assertEqual(self.router.db_for_read(None), 'default')
+        with routers.replica_reads(types.SimpleNamespace(is_authenticated=True, pk=user.pk + 1)):
+            self.assertEqual(self.router.db_for_read(None), 'replica')
+
+
+@unittest.skipUnless('replica' in settings.DATABASES, "needs a 'replica' entry in DATABASES")
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    DATABASE_ROUTERS=['apps.core.routers.ReplicaRouter'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'core-replica-tests'}},
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    # Only name the replica where it exists; Django checks the aliases even for skipped classes
+    databases = {'default'} | ({'replica'} & set(settings.DATABASES))
+
+    def setUp(self):
+        from apps.restaurant.models import Restaurant
+
+        cache.clear()
+        routers._lag_checks.clear()
+        fields = {
+            'cuisine': 'Indian', 'address': '1 Test Street', 'phone': '1234567890',
+            'email': 'kitchen@example.com', 'image': 'https://example.com/kitchen.jpg',
+            'opening_time': dt_time(9, 0), 'closing_time': dt_time(23, 0),
+        }
+        self.primary_restaurant = Restaurant.objects.create(name='Primary Kitchen', **fields)
+        Restaurant.objects.using('replica').create(name='Replica Kitchen', **fields)
+        self.user = get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+
+    def names(self, client):
+        response = client.get('/api/restaurants/', {'fields': 'name'})
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [item['name'] for item in results]
+
+    def test_listing_reads_replica_until_the_user_writes(self):
+        from apps.favorites.models import Favorite
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(self.names(client), ['Replica Kitchen'])
+
+        Favorite.objects.create(user=self.user, restaurant=self.primary_restaurant)
+        self.assertEqual(self.names(client), ['Primary Kitchen'])
+        self.assertEqual(self.names(APIClient()), ['Replica Kitchen'])
+
+
+task_calls = []
+
+
+@taskqueue.task(name='tests.record', retry_delay=30)
+def record_call(value, when=None):
+    task_calls.append((value, when))
+
+
+@taskqueue.task(name='tests.flaky', max_attempts=2)
+def flaky_task():
+    task_calls.append('flaky')
+    raise RuntimeError('boom')
+
+
+@taskqueue.task(name='tests.limited', rate_limit='1/m', unique=True)
+def limited_task(key):
+    task_calls.append(key)
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        task_calls.clear()
+        self.worker = taskqueue.Worker(worker_id='test-worker')
+
+    def test_delay_stores_json_arguments_until_a_worker_runs_them(self):
+        when = timezone.now().replace(microsecond=0)
+        record_call.delay(Decimal('2.50'), when=when)
+        self.assertEqual(task_calls, [])
+
+        row = Task.objects.get()
+        self.assertEqual((row.name, row.status), ('tests.record', 'pending'))
+        self.assertTrue(self.worker.run_one())
+        self.assertEqual(task_calls, [('2.50', when.isoformat().replace('+00:00', 'Z'))])
+
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts, row.locked_until), ('done', 1, None))
+        self.assertFalse(self.worker.run_one())
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        flaky_task.delay()
+        self.worker.run_one()
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts), ('pending', 1))
+        self.assertIn('RuntimeError: boom', row.last_error)
+        self.assertGreater(row.run_at, timezone.now())
+        # Not due yet
+        self.assertFalse(self.worker.run_one())
+
+        Task.objects.update(run_at=timezone.now())
+        self.worker.run_one()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('failed', 2))
+        self.assertEqual(task_calls, ['flaky', 'flaky'])
+
+    def test_backoff_doubles_per_attempt(self):
+        now = timezone.now()
+        self.assertEqual(record_call.retry_at(1, now) - now, timedelta(seconds=30))
+        self.assertEqual(record_call.retry_at(3, now) - now, timedelta(seconds=120))
+
+    def test_expired_lease_is_reclaimed(self):
+        record_call.delay('lost')
+        Task.objects.update(
+            status='running', attempts=1, locked_by='dead-worker',
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertTrue(self.worker.run_one())
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts), ('done', 2))
+
+    def test_running_task_is_not_claimed_twice(self):
+        record_call.delay('once')
+        self.assertIsNotNone(self.worker.claim())
+        self.assertIsNone(taskqueue.Worker(worker_id='other').claim())
+
+    def test_unique_task_is_queued_once_while_pending(self):
+        limited_task.delay('a')
+        limited_task.delay('a')
+        limited_task.delay('b')
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_rate_limit_defers_later_runs(self):
+        limited_task.delay('a')
+        limited_task.delay('b')
+        record_call.delay('free')
+
+        self.assertTrue(self.worker.run_one())
+        self.assertTrue(self.worker.run_one())
+        # 'b' waits for the next minute; the unlimited task still ran
+        self.assertFalse(self.worker.run_one())
+        self.assertEqual(task_calls, ['a', ('free', None)])
+        self.assertEqual(Task.objects.get(status='pending').args, ['b'])
+
+    def test_purge_removes_old_finished_tasks(self):
+        record_call.delay('old')
+        record_call.delay('new')
+        Task.objects.update(status='done', finished_at=timezone.now())
+        Task.objects.filter(args=['old']).update(finished_at=timezone.now() - timedelta(days=30))
+        self.worker.purge()
+        self.assertEqual(list(Task.objects.values_list('args', flat=True)), [['new']])
+
+    def test_worker_command_drains_due_tasks(self):
+        record_call.delay('first')
+        record_call.delay('second')
+        with mock.patch('signal.signal'):
+            call_command('run_task_worker', '--once', stdout=io.StringIO())
+        self.assertEqual(task_calls, [('first', None), ('second', None)])
+
+    @override_settings(TASK_QUEUE_BACKEND='memory')
+    def test_memory_backend_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_call.delay(uuid.UUID(int=1))
+            self.assertEqual(task_calls, [])
+        self.assertEqual(task_calls, [(str(uuid.UUID(int=1)), None)])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASK_QUEUE_BACKEND='memory')
+    def test_memory_backend_retries_failures(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky_task.delay()
+        self.assertEqual(task_calls, ['flaky', 'flaky'])
+
+
+handled_events = []
+
+
+@outbox.handler('tests.ping')
+def handle_ping(event):
+    if event.payload.get('fail'):
+        raise ValueError('handler failed')
+    handled_events.append((event.topic, event.key, event.payload))
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        handled_events.clear()
+
+    def test_event_is_discarded_with_its_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                outbox.emit('tests.ping', 1)
+                raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_dispatch_delivers_in_order_and_marks_events(self):
+        outbox.emit('tests.ping', 1, value=Decimal('1.5'))
+        outbox.emit_many('tests.ping', [(2, {}), (3, {})])
+        outbox.emit('tests.unhandled', 4)
+
+        self.assertEqual(outbox.dispatch_batch(), 4)
+        self.assertEqual(handled_events, [('tests.ping', '1', {'value': '1.5'}), ('tests.ping', '2', {}), ('tests.ping', '3', {})])
+        self.assertFalse(OutboxEvent.objects.filter(dispatched_at__isnull=True).exists())
+        self.assertEqual(outbox.dispatch_batch(), 0)
+
+    def test_failed_event_is_retried_later_without_blocking_others(self):
+        failing = outbox.emit('tests.ping', 1, fail=True)
+        outbox.emit('tests.ping', 2)
+
+        outbox.dispatch_batch()
+        failing.refresh_from_db()
+        self.assertIsNone(failing.dispatched_at)
+        self.assertEqual(failing.attempts, 1)
+        self.assertIn('handler failed', failing.last_error)
+        self.assertGreater(failing.available_at, timezone.now())
+        self.assertEqual(handled_events, [('tests.ping', '2', {})])
+
+        OutboxEvent.objects.filter(pk=failing.pk).update(available_at=timezone.now(), payload={})
+        outbox.dispatch_batch()
+        failing.refresh_from_db()
+        self.assertIsNotNone(failing.dispatched_at)
+
+    def test_worker_dispatches_and_purges_events(self):
+        outbox.emit('tests.ping', 1)
+        with mock.patch('signal.signal'):
+            call_command('run_task_worker', '--once', stdout=io.StringIO())
+        self.assertEqual(len(handled_events), 1)
+
+        OutboxEvent.objects.update(dispatched_at=timezone.now() - timedelta(days=30))
+        taskqueue.Worker().purge()
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(TASK_QUEUE_BACKEND='memory')
+    def test_memory_backend_dispatches_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.emit('tests.ping', 1)
+            self.assertEqual(handled_events, [])
+        self.assertEqual(handled_events, [('tests.ping', '1', {})])
+
+
+class HotQueryIndexTest(TestCase):
+    """The hot read paths are served by index scans, not table scans"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from apps.bookings.models import Booking, TimeSlot
+        from apps.favorites.models import Favorite
+        from apps.restaurant.models import Restaurant
+        from apps.reviews.models import Review
+
+        cls.today = timezone.localdate()
+        restaurants = [
+            Restaurant.objects.create(
+                name=f'Kitchen {index}', cuisine='Indian', address='1 Test Street', phone='1234567890',
+                email='kitchen@example.com', image='https://example.com/kitchen.jpg',
+                opening_time=dt_time(9, 0), closing_time=dt_time(23, 0),
+            )
+            for index in range(5)
+        ]
+        users = [
+            get_user_model().objects.create_user(username=f'diner{index}', email=f'diner{index}@example.com', password=None)
+            for index in range(20)
+        ]
+        slots = {
+            restaurant.pk: TimeSlot.objects.bulk_create([
+                TimeSlot(restaurant=restaurant, time=dt_time(hour, 0)) for hour in range(12, 22)
+            ])
+            for restaurant in restaurants
+        }
+        statuses = ['pending', 'confirmed', 'completed', 'cancelled']
+        Booking.objects.bulk_create([
+            Booking(
+                user=users[index % 20],
+                restaurant=restaurants[index % 5],
+                time_slot=slots[restaurants[index % 5].pk][(index // 20) % 10],
+                booking_date=cls.today + timedelta(days=index // 100 - 10),
+                party_size=2,
+                customer_name='Diner',
+                customer_phone='9876543210',
+                customer_email='diner@example.com',
+                status=statuses[index % 4],
+                booking_reference=f'REF{index:05d}',
+            )
+            for index in range(2000)
+        ])
+        for user in users:
+            for restaurant in restaurants:
+                Review.objects.create(restaurant=restaurant, user=user, rating=4, comment='Good')
+                Favorite.objects.create(user=user, restaurant=restaurant)
+        cls.restaurant, cls.user = restaurants[0], users[0]
+
+    def setUp(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE')
+            if connections['default'].vendor == 'postgresql':
+                # Tiny tables fit in a page, where a seq scan is always cheapest
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f'{index_name} not used:\n{plan}')
+
+    def test_slot_availability(self):
+        from apps.bookings.models import Booking
+
+        self.assertUsesIndex(Booking.objects.filter(
+            restaurant=self.restaurant, booking_date=self.today,
+            time_slot__time=dt_time(12, 0), status__in=['confirmed', 'pending'],
+        ), 'booking_slot_status_idx')
+
+    def test_upcoming_bookings(self):
+        from apps.bookings.models import Booking
+
+        self.assertUsesIndex(Booking.objects.filter(
+            user=self.user, booking_date__gte=self.today, status__in=['pending', 'confirmed'],
+        ).order_by('booking_date', 'time_slot__time'), 'booking_user_date_idx')
+
+    def test_staff_recent_bookings(self):
+        from apps.bookings.models import Booking
+
+        self.assertUsesIndex(Booking.objects.filter(
+            restaurant=self.restaurant, created_at__gte=timezone.now() - timedelta(days=7),
+        ).order_by('-created_at')[:5], 'booking_rest_created_idx')
+
+    def test_restaurant_reviews(self):
+        from apps.reviews.models import Review
+
+        self.assertUsesIndex(
+            Review.objects.filter(restaurant=self.restaurant).order_by('-created_at'), 'review_rest_created_idx'
+        )
+
+    def test_user_favorites(self):
+        from apps.favorites.models import Favorite
+
+        self.assertUsesIndex(
+            Favorite.objects.filter(user=self.user).order_by('-created_at'), 'favorite_user_created_idx'
+        )
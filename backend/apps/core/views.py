@@ -0,0 +1,168 @@
+# apps/core/views.py
+import hmac
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .db import released_connections
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Caller headers that must not leak into batched sub-requests
+_DROPPED_META = {
+    'HTTP_AUTHORIZATION', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE',
+    'CONTENT_TYPE', 'CONTENT_LENGTH', 'wsgi.input', 'QUERY_STRING', 'PATH_INFO',
+}
+
+
+def metrics_view(request):
+    """
+    Expose application metrics in the Prometheus text format (internal only).
+
+    Behind a reverse proxy on the same host every request comes from
+    localhost, so the IP allowlist alone lets anyone through; set
+    ``METRICS_TOKEN`` to also require ``Authorization: Bearer <token>``.
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips:
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), f'Bearer {token}'.encode()):
+        raise Http404
+    return HttpResponse(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _sub_request(request, url):
+    """Build a GET request for ``url`` that reuses the caller's authentication"""
+    path, _, query = url.partition('?')
+    environ = {
+        key: value for key, value in request.META.items()
+        if key not in _DROPPED_META
+    }
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_LENGTH': '0',
+        'wsgi.input': io.BytesIO(b''),
+    })
+    environ.setdefault('wsgi.url_scheme', request.scheme)
+    sub_request = WSGIRequest(environ)
+    
+    if request.user.is_authenticated:
+        # Picked up by DRF's Request in place of the authentication classes
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+    # Plain Django views run without the middleware that would check the
+    # caller, so they only ever see an anonymous user
+    sub_request.user = AnonymousUser()
+    return sub_request
+
+
+def _dispatch(request, item):
+    """Run one sub-request and return its entry of the combined response"""
+    entry = {'id': item['id']}
+    sub_request = _sub_request(request, item['url'])
+    try:
+        match = resolve(sub_request.path_info)
+    except Resolver404:
+        match = None
+    if match is None or not sub_request.path_info.startswith('/api/'):
+        entry.update(status=404, body={'error': 'Not found.'})
+        return entry
+    if match.func is batch_view:
+        entry.update(status=400, body={'error': 'Batch requests cannot be nested.'})
+        return entry
+    
+    sub_request.resolver_match = match
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    try:
+        response = view(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'data'):
+            body = response.data
+        else:
+            if hasattr(response, 'render'):
+                response.render()
+            if response.get('Content-Type', '').startswith('application/json'):
+                body = json.loads(response.content or b'null')
+            else:
+                body = response.content.decode(response.charset)
+    except Http404:
+        entry.update(status=404, body={'error': 'Not found.'})
+        return entry
+    except Exception:
+        logger.exception("Batch sub-request %s failed", item['url'])
+        entry.update(status=500, body={'error': 'Internal server error.'})
+        return entry
+    
+    entry.update(status=response.status_code, body=body)
+    return entry
+
+
+def _dispatch_in_thread(request, item):
+    with released_connections():
+        return _dispatch(request, item)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def batch_view(request):
+    """
+    Run several GET requests in one round trip.
+
+    The body is ``{"requests": [{"id": "...", "url": "/api/..."}]}``. Every
+    sub-request is authenticated as the caller, and the response lists each
+    one's ``status`` and ``body`` in request order.
+    """
+    items = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'requests must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 10)
+    if len(items) > max_requests:
+        return Response(
+            {'error': f'At most {max_requests} requests can be batched'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('url'), str) or not item['url'].startswith('/'):
+            return Response(
+                {'error': f'requests[{index}] must have a url starting with /'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if item.get('method', 'GET').upper() != 'GET':
+            return Response(
+                {'error': f'requests[{index}]: only GET requests can be batched'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        item.setdefault('id', index)
+    
+    # Sub-requests inside an open transaction must share its connection to
+    # see the same data, so they only run on worker threads outside one.
+    max_workers = min(getattr(settings, 'BATCH_MAX_WORKERS', 4), len(items))
+    if max_workers <= 1 or connection.in_atomic_block:
+        responses = [_dispatch(request, item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(lambda item: _dispatch_in_thread(request, item), items))
+    
+    return Response({'responses': responses})
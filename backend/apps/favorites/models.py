@@ -27,6 +27,10 @@ class Favorite(models.Model):
     class Meta:
         unique_together = ('user', 'restaurant')
         ordering = ['-created_at']
+        indexes = [
+            # A user's favorites list, newest first
+            models.Index(fields=['user', 'created_at'], name='favorite_user_created_idx'),
+        ]
         verbose_name = 'Favorite'
         verbose_name_plural = 'Favorites'
 
@@ -0,0 +1,16 @@
+# apps/favorites/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core.cache import invalidate_tags_on_commit
+from apps.core.routers import pin_to_primary_on_commit
+from .models import Favorite
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+def invalidate_favorite_cache(sender, instance, **kwargs):
+    """
+    Drop the user's cached listings, which carry is_favorited flags, and
+    read them from the primary until replicas catch up
+    """
+    invalidate_tags_on_commit(f'user:{instance.user_id}')
+    pin_to_primary_on_commit(instance.user_id)
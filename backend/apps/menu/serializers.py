@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from apps.core.serializers import CompiledListSerializer
 from .models import MenuItem, MenuCategory
 
 class MenuCategorySerializer(serializers.ModelSerializer):
@@ -99,3 +100,7 @@ class RestaurantMenuSerializer(serializers.ModelSerializer):
             'is_featured',
             'display_order'
         ]
+
+class CompiledRestaurantMenuSerializer(CompiledListSerializer):
+    """RestaurantMenuSerializer output built from values() rows"""
+    serializer_class = RestaurantMenuSerializer
@@ -0,0 +1,21 @@
+# apps/menu/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core.cache import invalidate_tags_on_commit
+from .models import MenuCategory, MenuItem
+
+
+@receiver([post_save, post_delete], sender=MenuCategory)
+def invalidate_menu_category_cache(sender, instance, **kwargs):
+    """
+    Drop cached category listings
+    """
+    invalidate_tags_on_commit('menu_categories')
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def invalidate_menu_item_cache(sender, instance, **kwargs):
+    """
+    Drop the cached menu of the item's restaurant
+    """
+    invalidate_tags_on_commit(f'menu:{instance.restaurant_id}')
@@ -1,3 +1,70 @@
+from datetime import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.restaurant.models import Restaurant
+from .models import MenuCategory, MenuItem
+
+
+class MenuConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        self.category = MenuCategory.objects.create(name='Mains')
+        self.item = MenuItem.objects.create(
+            restaurant=self.restaurant,
+            category=self.category,
+            name='Dal',
+            description='Lentils',
+            price=Decimal('120.00'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='diner', email='diner@example.com', password=None
+        ))
+        self.url = f'/api/menu/restaurant/{self.restaurant.id}/'
+
+    def test_unchanged_menu_returns_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_item_change_invalidates_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.item.price = Decimal('150.00')
+        self.item.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_restaurant_rename_invalidates_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.name = 'Renamed Kitchen'
+            self.restaurant.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['restaurant_name'], 'Renamed Kitchen')
@@ -6,14 +6,20 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Prefetch, Count
 from collections import defaultdict
 
+from apps.core.cache import CachedListMixin
+from apps.core.conditional import ConditionalGetMixin
+from apps.core.renderers import FAST_RENDERER_CLASSES
+from apps.core.routers import ReplicaReadMixin
 from apps.restaurant.models import Restaurant
 from apps.staff.models import RestaurantAdmin
 from .models import MenuItem, MenuCategory
-from .serializers import MenuItemSerializer, RestaurantMenuSerializer, MenuCategorySerializer, AdminMenuItemSerializer
+from .serializers import MenuItemSerializer, RestaurantMenuSerializer, MenuCategorySerializer, AdminMenuItemSerializer, CompiledRestaurantMenuSerializer
 
-class RestaurantMenuListView(generics.ListAPIView):
+class RestaurantMenuListView(ReplicaReadMixin, ConditionalGetMixin, generics.ListAPIView):
     """Get all menu items for a specific restaurant, organized by category"""
     serializer_class = RestaurantMenuSerializer
+    renderer_classes = FAST_RENDERER_CLASSES
+    conditional_tags = ('restaurant:{restaurant_id}', 'menu_categories')
     
     def get_queryset(self):
         restaurant_id = self.kwargs['restaurant_id']
@@ -34,7 +40,7 @@ class RestaurantMenuListView(generics.ListAPIView):
         
         # Get menu items
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = CompiledRestaurantMenuSerializer(queryset, context=self.get_serializer_context())
         
         # Organize by category
         categorized_menu = defaultdict(list)
@@ -59,15 +65,19 @@ class RestaurantMenuListView(generics.ListAPIView):
             'categories_info': categories_info
         })
 
-class MenuItemDetailView(generics.RetrieveAPIView):
+class MenuItemDetailView(ReplicaReadMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     """Get details of a specific menu item"""
     queryset = MenuItem.objects.select_related('category', 'restaurant')
     serializer_class = MenuItemSerializer
+    conditional_tags = ('menu_categories',)
     
-class MenuCategoriesListView(generics.ListAPIView):
+class MenuCategoriesListView(ReplicaReadMixin, ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
     """Get all available menu categories"""
     queryset = MenuCategory.objects.filter(is_active=True)
     serializer_class = MenuCategorySerializer
+    cache_namespace = 'menu'
+    cache_tags = ('menu_categories',)
+    conditional_tags = ('menu_categories',)
 
 @api_view(['GET'])
 def restaurant_menu_summary(request, restaurant_id):
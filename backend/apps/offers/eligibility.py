@@ -0,0 +1,101 @@
+# apps/offers/eligibility.py
+"""
+Offer eligibility rules, expressed as SQL filters.
+
+An offer is eligible for a user at a moment in time when it is active, the
+moment falls inside its validity window and on one of its valid days, the
+global ``max_uses`` cap has room, and the user is below ``max_uses_per_user``.
+Every rule is pushed into the database so a whole set of offers is checked
+in one query.
+"""
+from collections import defaultdict
+
+from django.db.models import Q, F, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Offer, OfferActivation, OfferUsage
+
+# Bitmask values that include each weekday (index 0 = Monday). Filtering with
+# ``valid_days_mask__in`` keeps the weekday check a plain indexed lookup.
+WEEKDAY_MASKS = [
+    tuple(mask for mask in range(1 << 7) if mask & (1 << weekday))
+    for weekday in range(7)
+]
+
+
+def eligible_offer_q(at=None, prefix=''):
+    """
+    Q object for offers usable by anyone at ``at``.
+
+    ``prefix`` allows the same rules to be applied across a relation,
+    e.g. ``eligible_offer_q(now, prefix='offers__')`` on restaurants.
+    """
+    at = at or timezone.now()
+    weekday = timezone.localtime(at).weekday()
+    return Q(**{
+        f'{prefix}is_active': True,
+        f'{prefix}valid_from__lte': at,
+        f'{prefix}valid_until__gte': at,
+        f'{prefix}valid_days_mask__in': WEEKDAY_MASKS[weekday],
+    }) & (
+        Q(**{f'{prefix}max_uses__isnull': True}) |
+        Q(**{f'{prefix}current_uses__lt': F(f'{prefix}max_uses')})
+    )
+
+
+def user_usage_count(user, at=None):
+    """
+    Subquery counting the user's uses (used and expired) of the outer offer.
+
+    Activations that lapsed before ``at`` count too, so the per-user limit
+    holds before the queued sweep records them as expired usage.
+    """
+    at = at or timezone.now()
+    usages = Coalesce(Subquery(
+        OfferUsage.objects.filter(
+            offer=OuterRef('pk'),
+            user=user
+        ).order_by().values('offer').annotate(total=Count('id')).values('total')
+    ), 0)
+    lapsed = Coalesce(Subquery(
+        OfferActivation.objects.filter(
+            offer=OuterRef('pk'),
+            user=user,
+            status='pending',
+            expires_at__lte=at
+        ).order_by().values('offer').annotate(total=Count('id')).values('total')
+    ), 0)
+    return usages + lapsed
+
+
+def eligible_offers(user=None, at=None, restaurants=None, queryset=None):
+    """
+    Offers the user can use at ``at``, optionally limited to ``restaurants``.
+
+    Anonymous users (or ``user=None``) skip the per-user limit.
+    """
+    at = at or timezone.now()
+    if queryset is None:
+        queryset = Offer.objects.all()
+    
+    queryset = queryset.filter(eligible_offer_q(at))
+    if restaurants is not None:
+        queryset = queryset.filter(restaurant__in=restaurants)
+    if user is not None and user.is_authenticated:
+        queryset = queryset.filter(max_uses_per_user__gt=user_usage_count(user, at))
+    return queryset
+
+
+def eligible_offers_by_restaurant(restaurants, user=None, at=None):
+    """Map each restaurant id to its eligible offers, fetched in one query"""
+    offers_by_restaurant = defaultdict(list)
+    offers = eligible_offers(user=user, at=at, restaurants=restaurants).order_by('-is_featured', '-created_at')
+    for offer in offers:
+        offers_by_restaurant[offer.restaurant_id].append(offer)
+    return offers_by_restaurant
+
+
+def is_eligible(offer, user=None, at=None):
+    """Check a single offer against the same rules"""
+    return eligible_offers(user=user, at=at, queryset=Offer.objects.filter(pk=offer.pk)).exists()
@@ -0,0 +1,17 @@
+# apps/offers/events.py
+from apps.core.cache import invalidate_tags_on_commit
+from apps.core.outbox import handler
+from .models import Offer
+
+
+@handler('offer.redeemed', 'offer.expired')
+def refresh_offer_listings(event):
+    """
+    Redemptions bump ``current_uses`` with a bulk update, which sends no
+    ``post_save``; drop the listings that show remaining uses
+    """
+    restaurant_id = Offer.objects.filter(pk=event.payload['offer_id']).values_list('restaurant_id', flat=True).first()
+    tags = ['offers', f"user:{event.payload['user_id']}"]
+    if restaurant_id is not None:
+        tags += ['restaurants', f'offers:{restaurant_id}']
+    invalidate_tags_on_commit(*tags)
@@ -1,14 +1,13 @@
 # apps/offers/middleware.py
 from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
-from .models import OfferActivation
+from .tasks import expire_offer_activations
 import threading
-import time
 
 
 class OfferExpirationMiddleware(MiddlewareMixin):
     """
-    Middleware to periodically update expired offer activations
+    Middleware to periodically queue a sweep of expired offer activations
     """
     _last_check = None
     _check_interval = 300  # Check every 5 minutes
@@ -16,7 +15,7 @@ class OfferExpirationMiddleware(MiddlewareMixin):
     
     def process_request(self, request):
         """
-        Check and update expired activations periodically
+        Queue the expiry sweep periodically; a task worker runs it
         """
         now = timezone.now()
         
@@ -25,18 +24,8 @@ class OfferExpirationMiddleware(MiddlewareMixin):
             if (self._last_check is None or 
                 (now - self._last_check).total_seconds() > self._check_interval):
                 
-                # Update expired activations in background thread to avoid blocking requests
-                def update_expired():
-                    try:
-                        expired_count = OfferActivation.update_expired_activations()
-                        if expired_count > 0:
-                            print(f"Updated {expired_count} expired activations")
-                    except Exception as e:
-                        print(f"Error updating expired activations: {e}")
-                
-                # Start background thread
-                thread = threading.Thread(target=update_expired, daemon=True)
-                thread.start()
+                # Unique and rate limited, so many workers queue at most one sweep
+                expire_offer_activations.delay()
                 
                 self._last_check = now
         
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def populate_valid_days_mask(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    restricted = []
+    for offer in Offer.objects.only('id', 'valid_days').iterator():
+        if not offer.valid_days:
+            continue
+        mask = 0
+        for day in offer.valid_days:
+            if str(day).lower() in DAY_NAMES:
+                mask |= 1 << DAY_NAMES.index(str(day).lower())
+        offer.valid_days_mask = mask
+        restricted.append(offer)
+    Offer.objects.bulk_update(restricted, ['valid_days_mask'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('offers', '0009_remove_offer_valid_from_time_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='valid_days_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=127, editable=False, help_text='Bitmask of valid_days (bit 0 = Monday), kept in sync on save'),
+        ),
+        migrations.RunPython(populate_valid_days_mask, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,40 @@
 # apps/offers/models.py
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.conf import settings
 from apps.restaurant.models import Restaurant
+from apps.core.metrics import OFFER_EXPIRY_SWEEPS, OFFER_EXPIRY_ROWS
+from apps.core.outbox import TransactionalSaveMixin, emit, emit_many
 import string
 import random
 
 
+class OfferQuerySet(models.QuerySet):
+    """
+    Keeps ``valid_days_mask`` in step with ``valid_days`` on the bulk
+    writes that bypass ``Offer.save()``
+    """
+    def update(self, **kwargs):
+        if 'valid_days' in kwargs and 'valid_days_mask' not in kwargs:
+            kwargs['valid_days_mask'] = Offer.days_to_mask(kwargs['valid_days'])
+        return super().update(**kwargs)
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for offer in objs:
+            offer.valid_days_mask = offer.days_to_mask(offer.valid_days)
+        return super().bulk_create(objs, *args, **kwargs)
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'valid_days' in fields:
+            objs = list(objs)
+            for offer in objs:
+                offer.valid_days_mask = offer.days_to_mask(offer.valid_days)
+            fields = {*fields, 'valid_days_mask'}
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Offer(models.Model):
     OFFER_TYPES = [
         ('percentage', 'Percentage Discount'),
@@ -64,6 +91,12 @@ class Offer(models.Model):
         blank=True,
         help_text="Days when offer is valid (e.g., ['monday', 'tuesday'])"
     )
+    valid_days_mask = models.PositiveSmallIntegerField(
+        default=0b1111111,
+        db_index=True,
+        editable=False,
+        help_text="Bitmask of valid_days (bit 0 = Monday), kept in sync on save"
+    )
     
     # Conditions
     minimum_order_amount = models.DecimalField(
@@ -105,6 +138,8 @@ class Offer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OfferQuerySet.as_manager()
+
     class Meta:
         ordering = ['-is_featured', '-created_at']
         indexes = [
@@ -117,6 +152,25 @@ class Offer(models.Model):
     def __str__(self):
         return f"{self.title} - {self.restaurant.name}"
 
+    def save(self, *args, **kwargs):
+        self.valid_days_mask = self.days_to_mask(self.valid_days)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'valid_days' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'valid_days_mask'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def days_to_mask(cls, days):
+        """Convert a valid_days list into a weekday bitmask (no days means every day)"""
+        if not days:
+            return 0b1111111
+        day_names = [day for day, label in cls.DAY_CHOICES]
+        mask = 0
+        for day in days:
+            if str(day).lower() in day_names:
+                mask |= 1 << day_names.index(str(day).lower())
+        return mask
+
     @property
     def is_valid(self):
         """Check if offer is currently valid"""
@@ -130,11 +184,8 @@ class Offer(models.Model):
     @property
     def is_day_valid(self):
         """Check if offer is valid for current day"""
-        if not self.valid_days:
-            return True
-        
-        current_day = timezone.now().strftime('%A').lower()
-        return current_day in self.valid_days
+        weekday = timezone.localtime().weekday()
+        return bool(self.days_to_mask(self.valid_days) & (1 << weekday))
 
     @property
     def discount_text(self):
@@ -159,21 +210,57 @@ class Offer(models.Model):
 
     def can_be_used_by_user(self, user):
         """Check if offer can be used by specific user"""
-        if not self.is_valid:
-            return False
+        from .eligibility import is_eligible
         
-        # Check if user has exceeded usage limit (including expired activations)
-        total_usage_count = OfferUsage.objects.filter(
-            offer=self,
-            user=user
-        ).count()  # This includes both 'used' and 'expired' status
-        
-        return total_usage_count < self.max_uses_per_user
+        # The usage limit counts both 'used' and 'expired' status
+        return is_eligible(self, user=user)
 
-    def use_offer(self):
-        """Increment usage counter"""
+    def use_offer(self, user_id, order_amount=0, discount_applied=0, activation=None, at=None):
+        """
+        Record one use of the offer by ``user_id`` in a single transaction.
+        
+        The counter is incremented with an F-expression guarded by the
+        eligibility rules and the global and per-user caps, and the usage
+        row is inserted in the same transaction. Raises ValueError when the
+        offer is not usable at ``at`` or the user has reached their limit.
+        
+        The offer row is locked before the per-user count. A subquery inside
+        the guarded UPDATE would read a snapshot taken before a concurrent
+        use by the same user committed (PostgreSQL re-checks only the offer
+        row itself under READ COMMITTED), letting both pass the cap.
+        """
+        from .eligibility import eligible_offer_q, is_eligible, user_usage_count
+        
+        at = at or timezone.now()
+        
+        with transaction.atomic():
+            # Uses of this offer queue here, so the count below sees every
+            # usage row committed before the lock was granted
+            list(Offer.objects.select_for_update().filter(pk=self.pk).values_list('pk', flat=True))
+            
+            # Uses so far by this user include expired activations
+            incremented = Offer.objects.filter(
+                eligible_offer_q(at),
+                pk=self.pk,
+                max_uses_per_user__gt=user_usage_count(user_id, at)
+            ).update(current_uses=models.F('current_uses') + 1)
+            if not incremented:
+                if not is_eligible(self, at=at):
+                    raise ValueError("Offer is not valid")
+                raise ValueError("User has exceeded maximum usage limit for this offer")
+            
+            usage = OfferUsage.objects.create(
+                offer_id=self.pk,
+                user_id=user_id,
+                used_at=at,
+                order_amount=order_amount,
+                discount_applied=discount_applied,
+                status='used',  # Mark as actually used
+                activation=activation
+            )
+        
         self.current_uses += 1
-        self.save(update_fields=['current_uses'])
+        return usage
 
 
 class OfferUsage(models.Model):
@@ -215,7 +302,7 @@ class OfferUsage(models.Model):
         return f"{self.user.username} used {self.offer.title} on {self.used_at}"
 
 
-class OfferActivation(models.Model):
+class OfferActivation(TransactionalSaveMixin, models.Model):
     """Track offer activation codes for redemption"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -273,40 +360,39 @@ class OfferActivation(models.Model):
         )
     
     def redeem(self, admin_user):
-        """Redeem the activation code"""
-        if not self.is_valid:
-            raise ValueError("Activation code is not valid for redemption")
+        """
+        Redeem the activation code in a single transaction.
+        
+        The activation is claimed with a conditional UPDATE and the use is
+        then recorded through ``Offer.use_offer``. Concurrent redemptions
+        cannot lose increments or push an offer past ``max_uses`` or the
+        user past ``max_uses_per_user``.
+        """
+        now = timezone.now()
         
-        # Check if user can still use this offer
-        if not self.offer.can_be_used_by_user(self.user):
-            raise ValueError("User has exceeded maximum usage limit for this offer")
+        with transaction.atomic():
+            # Claim the code; only one caller can move it out of pending
+            claimed = OfferActivation.objects.filter(
+                pk=self.pk,
+                status='pending',
+                expires_at__gt=now
+            ).update(status='redeemed', redeemed_at=now, redeemed_by_admin=admin_user)
+            if not claimed:
+                raise ValueError("Activation code is not valid for redemption")
+            
+            # Rolls back the claim above on failure
+            # In a real application, the amounts would come from actual order data
+            self.offer.use_offer(self.user_id, activation=self, at=now)
+            emit('offer.redeemed', self.pk, offer_id=self.offer_id, user_id=self.user_id)
         
         self.status = 'redeemed'
-        self.redeemed_at = timezone.now()
+        self.redeemed_at = now
         self.redeemed_by_admin = admin_user
-        self.save()
-        
-        # Create usage record with placeholder values
-        # In a real application, these would be calculated from actual order data
-        OfferUsage.objects.create(
-            offer=self.offer,
-            user=self.user,
-            used_at=timezone.now(),  # Set current time for actual usage
-            order_amount=0,  # Will be updated when connected to actual order system
-            discount_applied=0,  # Will be calculated based on offer type and order amount
-            status='used'  # Mark as actually used
-        )
-        
-        # Increment offer usage counter
-        self.offer.use_offer()
-        
         return True
     
     @classmethod
     def update_expired_activations(cls):
         """Update all expired pending activations to expired status and create usage records"""
-        from django.db import transaction
-        
         now = timezone.now()
         
         with transaction.atomic():
@@ -347,9 +433,15 @@ class OfferActivation(models.Model):
             # Update only the activations we processed to expired status
             if activation_ids_to_update:
                 expired_count = cls.objects.filter(id__in=activation_ids_to_update).update(status='expired')
+                emit_many('offer.expired', [
+                    (record.activation_id, {'offer_id': record.offer_id, 'user_id': record.user_id})
+                    for record in usage_records
+                ])
             else:
                 expired_count = 0
         
+        OFFER_EXPIRY_SWEEPS.inc()
+        OFFER_EXPIRY_ROWS.inc(expired_count)
         return expired_count
     
     def check_and_update_expiration(self):
@@ -373,7 +465,9 @@ class OfferActivation(models.Model):
             # Update status if it was pending
             if self.status == 'pending':
                 self.status = 'expired'
-                self.save(update_fields=['status'])
+                with transaction.atomic():
+                    self.save(update_fields=['status'])
+                    emit('offer.expired', self.pk, offer_id=self.offer_id, user_id=self.user_id)
             
             return True
         return False
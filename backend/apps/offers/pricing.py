@@ -0,0 +1,74 @@
+# apps/offers/pricing.py
+"""
+Decimal pricing for offers applied to bookings and orders.
+
+All arithmetic stays in ``Decimal`` and is rounded to paise/cents with
+ROUND_HALF_UP, so quotes match what is stored in the DecimalFields.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+# Base booking fee charged per guest when no order amount is known
+BOOKING_FEE_PER_PERSON = Decimal('50.00')
+
+CENT = Decimal('0.01')
+
+Quote = namedtuple('Quote', [
+    'offer', 'party_size', 'original_amount', 'discount_amount', 'final_amount', 'is_applicable', 'reason'
+])
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def booking_amount(party_size):
+    """Amount charged for a booking before any discount"""
+    return _money(BOOKING_FEE_PER_PERSON * party_size)
+
+
+def quote_offer(offer, party_size, order_amount=None):
+    """
+    Price a single (offer, party_size, order_amount) input.
+
+    ``order_amount`` defaults to the booking fee for the party. The discount
+    honours ``minimum_order_amount`` and ``maximum_discount_amount`` and never
+    exceeds the amount itself.
+    """
+    original = _money(order_amount) if order_amount is not None else booking_amount(party_size)
+    
+    if offer is None:
+        return Quote(None, party_size, original, _money(0), original, False, 'No offer applied')
+    
+    if offer.minimum_order_amount and original < offer.minimum_order_amount:
+        return Quote(
+            offer, party_size, original, _money(0), original, False,
+            f"Minimum order amount is {_money(offer.minimum_order_amount)}"
+        )
+    
+    if offer.offer_type == 'percentage':
+        discount = _money(original * Decimal(offer.discount_percentage or 0) / 100)
+    elif offer.offer_type == 'fixed':
+        discount = _money(offer.discount_amount)
+    else:
+        # BOGO, combo and special offers are settled at the table
+        discount = _money(0)
+    
+    if offer.maximum_discount_amount is not None:
+        discount = min(discount, _money(offer.maximum_discount_amount))
+    discount = min(discount, original)
+    
+    return Quote(offer, party_size, original, discount, original - discount, True, '')
+
+
+def quote_offers(requests):
+    """Price a batch of (offer, party_size, order_amount) inputs"""
+    return [quote_offer(offer, party_size, order_amount) for offer, party_size, order_amount in requests]
+
+
+def best_quote(quotes):
+    """Return the quote with the largest discount, or None if no offer applies"""
+    applicable = [quote for quote in quotes if quote.is_applicable and quote.discount_amount > 0]
+    if not applicable:
+        return None
+    return max(applicable, key=lambda quote: quote.discount_amount)
@@ -1,11 +1,13 @@
 # apps/offers/serializers.py
 from rest_framework import serializers
+from django.db.models import Count
 from django.utils import timezone
+from apps.core.serializers import CompiledListSerializer, SparseFieldsSerializerMixin
 from .models import Offer, OfferUsage, OfferActivation
-from apps.restaurant.serializers import RestaurantListSerializer
+from apps.restaurant.serializers import RestaurantListSerializer, CompiledRestaurantListSerializer
 
 
-class OfferSerializer(serializers.ModelSerializer):
+class OfferSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     restaurant = RestaurantListSerializer(read_only=True)
     discount_text = serializers.ReadOnlyField()
     savings_text = serializers.ReadOnlyField()
@@ -18,6 +20,14 @@ class OfferSerializer(serializers.ModelSerializer):
     restaurant_address = serializers.CharField(source='restaurant.address', read_only=True)
     user_activation = serializers.SerializerMethodField()
     
+    field_dependencies = {
+        'discount_text': ['offer_type', 'discount_percentage', 'discount_amount'],
+        'savings_text': ['minimum_order_amount'],
+        'is_valid': ['is_active', 'valid_from', 'valid_until', 'max_uses', 'current_uses'],
+        'is_day_valid': ['valid_days'],
+        'user_activation': [],
+    }
+    
     class Meta:
         model = Offer
         fields = [
@@ -57,7 +67,7 @@ class OfferSerializer(serializers.ModelSerializer):
         return None
 
 
-class OfferListSerializer(serializers.ModelSerializer):
+class OfferListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Lightweight serializer for offer listings"""
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     restaurant_cuisine = serializers.CharField(source='restaurant.cuisine', read_only=True)
@@ -69,6 +79,15 @@ class OfferListSerializer(serializers.ModelSerializer):
     user_activation = serializers.SerializerMethodField()
     remaining_uses = serializers.SerializerMethodField()
     
+    field_dependencies = {
+        'discount_text': ['offer_type', 'discount_percentage', 'discount_amount'],
+        'savings_text': ['minimum_order_amount'],
+        'is_valid': ['is_active', 'valid_from', 'valid_until', 'max_uses', 'current_uses'],
+        'user_activation': ['is_active', 'valid_from', 'valid_until', 'max_uses', 'current_uses'],
+        'remaining_uses': ['max_uses_per_user'],
+    }
+    expandable_fields = {'restaurant': RestaurantListSerializer}
+    
     class Meta:
         model = Offer
         fields = [
@@ -122,6 +141,60 @@ class OfferListSerializer(serializers.ModelSerializer):
         return None
 
 
+class CompiledOfferListSerializer(CompiledListSerializer):
+    """
+    OfferListSerializer output built from values() rows, with the user's
+    usage counts and pending activations fetched in one query each
+    """
+    serializer_class = OfferListSerializer
+    expandable_fields = {'restaurant': CompiledRestaurantListSerializer}
+
+    def prepare(self, rows):
+        self.usage_counts = {}
+        self.activations = {}
+        request = self.context.get('request')
+        self.user = request.user if request and request.user.is_authenticated else None
+        if self.user is None:
+            return
+        
+        offer_ids = [row['id'] for row in rows]
+        if self.wants('remaining_uses'):
+            self.usage_counts = dict(
+                OfferUsage.objects.filter(
+                    offer__in=offer_ids,
+                    user=self.user
+                ).order_by().values('offer').annotate(count=Count('id')).values_list('offer', 'count')
+            )
+        if self.wants('user_activation'):
+            # Newest pending activation per offer, as .first() picks it
+            activations = OfferActivation.objects.filter(
+                offer__in=offer_ids,
+                user=self.user,
+                status='pending'
+            ).order_by('-created_at').values('offer_id', 'activation_code', 'expires_at', 'created_at')
+            for activation in activations:
+                self.activations.setdefault(activation['offer_id'], activation)
+
+    def get_remaining_uses(self, row):
+        if self.user is None:
+            return None
+        return max(0, row['max_uses_per_user'] - self.usage_counts.get(row['id'], 0))
+
+    def get_user_activation(self, row):
+        activation = self.activations.get(row['id'])
+        if activation is None:
+            return None
+        
+        # Mirrors OfferActivation.is_valid for a pending activation
+        if timezone.now() > activation['expires_at'] or not Offer.is_valid.fget(row):
+            return None
+        return {
+            'activation_code': activation['activation_code'],
+            'expires_at': activation['expires_at'],
+            'created_at': activation['created_at']
+        }
+
+
 class RestaurantOfferSerializer(serializers.ModelSerializer):
     """Serializer for offers shown on restaurant detail page"""
     discount_text = serializers.ReadOnlyField()
@@ -175,6 +248,7 @@ class OfferActivationSerializer(serializers.ModelSerializer):
     restaurant_name = serializers.CharField(source='offer.restaurant.name', read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
     user_name = serializers.CharField(source='user.first_name', read_only=True)
+    status = serializers.SerializerMethodField()
     time_remaining = serializers.SerializerMethodField()
     is_expired = serializers.ReadOnlyField()
     is_valid = serializers.ReadOnlyField()
@@ -189,6 +263,12 @@ class OfferActivationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['activation_code', 'status', 'created_at', 'expires_at', 'redeemed_at']
     
+    def get_status(self, obj):
+        # Lapsed activations read as expired before the sweep marks them
+        if obj.status == 'pending' and obj.is_expired:
+            return 'expired'
+        return obj.status
+    
     def get_time_remaining(self, obj):
         if obj.status != 'pending':
             return None
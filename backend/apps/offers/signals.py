@@ -1,8 +1,10 @@
 # apps/offers/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import OfferActivation
+from apps.core.cache import invalidate_tags_on_commit
+from apps.core.outbox import emit
+from .models import Offer, OfferActivation, OfferUsage
 
 
 @receiver(post_save, sender=OfferActivation)
@@ -14,3 +16,28 @@ def check_activation_expiry(sender, instance, created, **kwargs):
         if instance.is_expired:
             # Update status to expired
             OfferActivation.objects.filter(id=instance.id).update(status='expired')
+            emit('offer.expired', instance.pk, offer_id=instance.offer_id, user_id=instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Offer)
+def invalidate_offer_cache(sender, instance, **kwargs):
+    """
+    Drop cached offer listings and restaurant listings showing offer counts
+    """
+    invalidate_tags_on_commit('offers', 'restaurants', f'offers:{instance.restaurant_id}')
+
+
+@receiver([post_save, post_delete], sender=OfferActivation)
+def invalidate_offer_activation_cache(sender, instance, **kwargs):
+    """
+    Offer listings show the user's pending activation
+    """
+    invalidate_tags_on_commit(f'user:{instance.user_id}')
+
+
+@receiver([post_save, post_delete], sender=OfferUsage)
+def invalidate_offer_usage_cache(sender, instance, **kwargs):
+    """
+    A usage bumps the offer's use count and the user's remaining uses
+    """
+    invalidate_tags_on_commit('offers', f'user:{instance.user_id}')
@@ -0,0 +1,16 @@
+# apps/offers/tasks.py
+import logging
+
+from apps.core.taskqueue import task
+from .models import OfferActivation
+
+logger = logging.getLogger(__name__)
+
+
+@task(unique=True, rate_limit='1/m')
+def expire_offer_activations():
+    """Mark pending activations past their expiry as expired"""
+    expired_count = OfferActivation.update_expired_activations()
+    if expired_count > 0:
+        logger.info("Updated %s expired activations", expired_count)
+    return expired_count
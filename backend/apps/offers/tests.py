@@ -1,3 +1,551 @@
-from django.test import TestCase
+import threading
+from datetime import time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection, OperationalError
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import OutboxEvent
+from apps.restaurant.models import Restaurant
+from .models import Offer, OfferUsage, OfferActivation
+
+User = get_user_model()
+
+
+def create_restaurant():
+    return Restaurant.objects.create(
+        name='Test Kitchen',
+        cuisine='Indian',
+        address='1 Test Street',
+        phone='1234567890',
+        email='kitchen@example.com',
+        image='https://example.com/kitchen.jpg',
+        opening_time=time(9, 0),
+        closing_time=time(23, 0),
+    )
+
+
+def create_offer(restaurant, **kwargs):
+    now = timezone.now()
+    defaults = {
+        'title': 'Ten percent off',
+        'description': 'Test offer',
+        'offer_type': 'percentage',
+        'discount_percentage': 10,
+        'valid_from': now - timedelta(days=1),
+        'valid_until': now + timedelta(days=1),
+    }
+    defaults.update(kwargs)
+    return Offer.objects.create(restaurant=restaurant, **defaults)
+
+
+def create_user(index):
+    return User.objects.create_user(
+        username=f'user{index}',
+        email=f'user{index}@example.com',
+        password=None
+    )
+
+
+class OfferRedemptionTest(TestCase):
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        self.admin = create_user('admin')
+        self.user = create_user('customer')
+
+    def test_redeem_records_usage_and_increments_counter(self):
+        offer = create_offer(self.restaurant, max_uses=3)
+        activation = OfferActivation.objects.create(offer=offer, user=self.user)
+
+        activation.redeem(self.admin)
+
+        offer.refresh_from_db()
+        activation.refresh_from_db()
+        self.assertEqual(offer.current_uses, 1)
+        self.assertEqual(activation.status, 'redeemed')
+        self.assertEqual(activation.redeemed_by_admin, self.admin)
+        self.assertTrue(OfferUsage.objects.filter(activation=activation, status='used').exists())
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('topic', 'key')),
+            [('offer.redeemed', str(activation.pk))]
+        )
+
+    def test_redeem_rejects_expired_code(self):
+        offer = create_offer(self.restaurant)
+        activation = OfferActivation.objects.create(
+            offer=offer,
+            user=self.user,
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        with self.assertRaises(ValueError):
+            activation.redeem(self.admin)
+
+        activation.refresh_from_db()
+        self.assertEqual(activation.status, 'pending')
+        self.assertEqual(OfferUsage.objects.count(), 0)
+
+    def test_redeem_rolls_back_when_offer_is_capped(self):
+        offer = create_offer(self.restaurant, max_uses=1, current_uses=1)
+        activation = OfferActivation.objects.create(offer=offer, user=self.user)
+
+        with self.assertRaises(ValueError):
+            activation.redeem(self.admin)
+
+        offer.refresh_from_db()
+        activation.refresh_from_db()
+        self.assertEqual(offer.current_uses, 1)
+        self.assertEqual(activation.status, 'pending')
+        self.assertEqual(OfferUsage.objects.count(), 0)
+
+    def test_redeem_respects_per_user_limit(self):
+        offer = create_offer(self.restaurant, max_uses_per_user=1)
+        first = OfferActivation.objects.create(offer=offer, user=self.user)
+        second = OfferActivation.objects.create(offer=offer, user=self.user)
+        first.redeem(self.admin)
+
+        with self.assertRaisesMessage(ValueError, 'maximum usage limit'):
+            second.redeem(self.admin)
+
+        offer.refresh_from_db()
+        self.assertEqual(offer.current_uses, 1)
+
+
+class ParallelOfferRedemptionTest(TransactionTestCase):
+    """Hammer the redemption path from many threads at once"""
+    workers = 16
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        self.admin = create_user('admin')
+
+    def _in_parallel(self, action, items):
+        """Run ``action(item)`` for every item at once; count the calls that returned True"""
+        barrier = threading.Barrier(len(items))
+        outcomes = []
+
+        def worker(item):
+            try:
+                barrier.wait()
+                outcomes.append('redeemed' if action(item) else 'rejected')
+            except (ValueError, OperationalError):
+                # OperationalError covers SQLite refusing a concurrent writer
+                outcomes.append('rejected')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(item,)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes.count('redeemed')
+
+    def _redeem_in_parallel(self, activations):
+        return self._in_parallel(lambda activation: activation.redeem(self.admin), activations)
+
+    def test_capped_offer_is_never_over_redeemed(self):
+        offer = create_offer(self.restaurant, max_uses=5)
+        activations = [
+            OfferActivation.objects.create(offer=offer, user=create_user(index))
+            for index in range(self.workers)
+        ]
+
+        redeemed = self._redeem_in_parallel(activations)
+
+        offer.refresh_from_db()
+        self.assertGreaterEqual(redeemed, 1)
+        self.assertLessEqual(redeemed, 5)
+        self.assertEqual(offer.current_uses, redeemed)
+        self.assertEqual(OfferUsage.objects.filter(offer=offer, status='used').count(), redeemed)
+        self.assertEqual(OfferActivation.objects.filter(offer=offer, status='redeemed').count(), redeemed)
+
+    def test_uncapped_offer_loses_no_increments(self):
+        offer = create_offer(self.restaurant)
+        activations = [
+            OfferActivation.objects.create(offer=offer, user=create_user(index))
+            for index in range(self.workers)
+        ]
+
+        redeemed = self._redeem_in_parallel(activations)
+
+        offer.refresh_from_db()
+        self.assertEqual(offer.current_uses, redeemed)
+        self.assertEqual(OfferUsage.objects.filter(offer=offer, status='used').count(), redeemed)
+
+    def test_per_user_cap_holds_across_parallel_codes(self):
+        offer = create_offer(self.restaurant, max_uses_per_user=2)
+        user = create_user('customer')
+        activations = [OfferActivation.objects.create(offer=offer, user=user) for _ in range(self.workers)]
+
+        redeemed = self._redeem_in_parallel(activations)
+
+        self.assertGreaterEqual(redeemed, 1)
+        self.assertLessEqual(redeemed, 2)
+        self.assertEqual(OfferUsage.objects.filter(offer=offer, user=user).count(), redeemed)
+
+    def test_use_offer_view_holds_the_per_user_cap_in_parallel(self):
+        offer = create_offer(self.restaurant, max_uses_per_user=2)
+        user = create_user('customer')
+
+        def use(_):
+            client = APIClient()
+            client.force_authenticate(user)
+            client.post(f'/api/offers/{offer.pk}/use/', {'order_amount': '100'})
+
+        self._in_parallel(use, range(self.workers))
+
+        # SQLite's shared-cache table locks can fail requests after the use
+        # committed, so the outcome is read from the database
+        offer.refresh_from_db()
+        used = OfferUsage.objects.filter(offer=offer, user=user).count()
+        self.assertLessEqual(used, 2)
+        self.assertEqual(offer.current_uses, used)
+
+    def test_offer_row_is_locked_before_the_user_is_counted(self):
+        offer = create_offer(self.restaurant, max_uses_per_user=1)
+        activation = OfferActivation.objects.create(offer=offer, user=create_user('customer'))
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=QuerySet.select_for_update) as lock:
+            activation.redeem(self.admin)
+        self.assertIn(Offer, [call.args[0].model for call in lock.call_args_list])
+
+    def test_same_code_is_redeemed_once(self):
+        offer = create_offer(self.restaurant)
+        activation = OfferActivation.objects.create(offer=offer, user=create_user('customer'))
+        copies = [OfferActivation.objects.get(pk=activation.pk) for _ in range(self.workers)]
+
+        redeemed = self._redeem_in_parallel(copies)
+
+        offer.refresh_from_db()
+        self.assertEqual(redeemed, 1)
+        self.assertEqual(offer.current_uses, 1)
+        self.assertEqual(OfferUsage.objects.filter(activation=activation).count(), 1)
+
+
+class OfferEligibilityTest(TestCase):
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        self.user = create_user('customer')
+
+    def test_valid_days_are_stored_as_bitmask(self):
+        offer = create_offer(self.restaurant, valid_days=['monday', 'Sunday'])
+        self.assertEqual(offer.valid_days_mask, 0b1000001)
+        offer.valid_days = []
+        offer.save(update_fields=['valid_days'])
+        offer.refresh_from_db()
+        self.assertEqual(offer.valid_days_mask, 0b1111111)
+
+    def test_bulk_writes_keep_the_bitmask_in_sync(self):
+        offer = create_offer(self.restaurant)
+        Offer.objects.filter(pk=offer.pk).update(valid_days=['tuesday'])
+        offer.refresh_from_db()
+        self.assertEqual(offer.valid_days_mask, 0b0000010)
+
+        offer.valid_days = ['wednesday', 'friday']
+        Offer.objects.bulk_update([offer], ['valid_days'])
+        offer.refresh_from_db()
+        self.assertEqual(offer.valid_days_mask, 0b0010100)
+
+        now = timezone.now()
+        [created] = Offer.objects.bulk_create([Offer(
+            restaurant=self.restaurant, title='Weekend', description='Test offer', offer_type='special',
+            valid_from=now, valid_until=now + timedelta(days=1), valid_days=['saturday', 'sunday'],
+        )])
+        self.assertEqual(Offer.objects.get(pk=created.pk).valid_days_mask, 0b1100000)
+
+    def test_valid_today_filter_applies_the_eligibility_rules(self):
+        now = timezone.now()
+        today = Offer.DAY_CHOICES[timezone.localtime(now).weekday()][0]
+        tomorrow = Offer.DAY_CHOICES[(timezone.localtime(now).weekday() + 1) % 7][0]
+        eligible = create_offer(self.restaurant, valid_days=[today])
+        create_offer(self.restaurant, valid_days=[tomorrow])
+        create_offer(self.restaurant, max_uses=1, current_uses=1)
+
+        from .views import OfferFilter
+
+        offers = OfferFilter({'valid_today': 'true'}, queryset=Offer.objects.all()).qs
+        self.assertEqual(list(offers), [eligible])
+
+    def test_weekday_window_and_caps_are_applied(self):
+        from .eligibility import eligible_offers
+
+        now = timezone.now()
+        today = Offer.DAY_CHOICES[timezone.localtime(now).weekday()][0]
+        tomorrow = Offer.DAY_CHOICES[(timezone.localtime(now).weekday() + 1) % 7][0]
+        eligible = create_offer(self.restaurant, valid_days=[today])
+        create_offer(self.restaurant, valid_days=[tomorrow])
+        create_offer(self.restaurant, is_active=False)
+        create_offer(self.restaurant, max_uses=2, current_uses=2)
+        create_offer(self.restaurant, valid_from=now + timedelta(hours=1))
+        used_up = create_offer(self.restaurant, max_uses_per_user=1)
+        OfferUsage.objects.create(
+            offer=used_up, user=self.user, used_at=now, order_amount=0, discount_applied=0, status='expired'
+        )
+
+        with self.assertNumQueries(1):
+            offers = list(eligible_offers(user=self.user, at=now, restaurants=[self.restaurant]))
+        self.assertEqual(offers, [eligible])
+        self.assertCountEqual(
+            eligible_offers(at=now, restaurants=[self.restaurant]),
+            [eligible, used_up]
+        )
+
+
+class OfferPricingTest(TestCase):
+    def setUp(self):
+        self.restaurant = create_restaurant()
+
+    def test_percentage_discount_is_capped(self):
+        from .pricing import quote_offer
+
+        offer = create_offer(self.restaurant, discount_percentage=Decimal('15'), maximum_discount_amount=Decimal('40'))
+        quote = quote_offer(offer, party_size=4)
+        self.assertEqual(quote.original_amount, Decimal('200.00'))
+        self.assertEqual(quote.discount_amount, Decimal('30.00'))
+
+        quote = quote_offer(offer, party_size=6)
+        self.assertEqual(quote.discount_amount, Decimal('40.00'))
+        self.assertEqual(quote.final_amount, Decimal('260.00'))
+
+    def test_minimum_order_amount_and_fixed_discount(self):
+        from .pricing import quote_offer
+
+        offer = create_offer(
+            self.restaurant,
+            offer_type='fixed',
+            discount_percentage=None,
+            discount_amount=Decimal('75'),
+            minimum_order_amount=Decimal('100')
+        )
+        self.assertFalse(quote_offer(offer, party_size=1).is_applicable)
+        quote = quote_offer(offer, party_size=1, order_amount=Decimal('60.50'))
+        self.assertFalse(quote.is_applicable)
+        quote = quote_offer(offer, party_size=1, order_amount=Decimal('100.10'))
+        self.assertEqual(quote.discount_amount, Decimal('75.00'))
+        self.assertEqual(quote.final_amount, Decimal('25.10'))
+
+    def test_best_quote_picks_largest_discount(self):
+        from .pricing import best_quote, quote_offers
+
+        small = create_offer(self.restaurant, discount_percentage=Decimal('5'))
+        large = create_offer(self.restaurant, discount_percentage=Decimal('20'))
+        quotes = quote_offers([(small, 2, None), (large, 2, None)])
+        self.assertEqual(best_quote(quotes).offer, large)
+
+
+    def test_invalid_order_amounts_are_rejected(self):
+        offer = create_offer(self.restaurant)
+        client = APIClient()
+        client.force_authenticate(create_user(1))
+        for amount in ['NaN', 'Infinity', '-Infinity', '1e400', '-500', 'abc']:
+            response = client.get(
+                f'/api/offers/restaurant/{self.restaurant.id}/best-offer/',
+                {'party_size': 2, 'order_amount': amount}
+            )
+            self.assertEqual(response.status_code, 400, amount)
+            response = client.post(f'/api/offers/{offer.id}/use/', {'order_amount': amount}, format='json')
+            self.assertEqual(response.data, {'error': 'Invalid order amount'}, amount)
+        
+        response = client.get(
+            f'/api/offers/restaurant/{self.restaurant.id}/best-offer/',
+            {'party_size': 2, 'order_amount': '250.50'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class CompiledOfferListSerializerTest(TestCase):
+    def test_matches_offer_list_serializer(self):
+        from types import SimpleNamespace
+        from .serializers import CompiledOfferListSerializer, OfferListSerializer
+
+        restaurant = create_restaurant()
+        user = create_user('customer')
+        used = create_offer(restaurant, max_uses_per_user=3)
+        activated = create_offer(restaurant, offer_type='fixed', discount_percentage=None, discount_amount=Decimal('50'))
+        create_offer(restaurant, minimum_order_amount=Decimal('500'))
+        OfferUsage.objects.create(offer=used, user=user, used_at=timezone.now(), order_amount=100, discount_applied=10)
+        OfferActivation.objects.create(offer=activated, user=user)
+
+        queryset = Offer.objects.select_related('restaurant')
+        for context_user in (user, SimpleNamespace(is_authenticated=False)):
+            context = {'request': SimpleNamespace(user=context_user)}
+            expected = OfferListSerializer(queryset, many=True, context=context).data
+            with self.assertNumQueries(3 if context_user is user else 1):
+                compiled = CompiledOfferListSerializer(queryset, context=context).data
+            self.assertEqual(compiled, [dict(item) for item in expected])
+
+
+class OfferExpandTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.restaurant = create_restaurant()
+        self.offer = create_offer(self.restaurant)
+        self.client = APIClient()
+        self.client.force_authenticate(create_user('expand'))
+
+    def test_expand_restaurant_matches_across_serializers(self):
+        from types import SimpleNamespace
+        from .serializers import CompiledOfferListSerializer, OfferListSerializer
+
+        context = {
+            'request': SimpleNamespace(user=SimpleNamespace(is_authenticated=False)),
+            'fields': ['id', 'title', 'restaurant'],
+            'expand': ['restaurant'],
+        }
+        queryset = Offer.objects.select_related('restaurant')
+        expected = OfferListSerializer(queryset, many=True, context=context).data
+        with self.assertNumQueries(3):
+            compiled = CompiledOfferListSerializer(queryset, context=context).data
+        self.assertEqual(compiled, [dict(item) for item in expected])
+        self.assertEqual(compiled[0]['restaurant']['name'], 'Test Kitchen')
+
+    def test_expand_through_api(self):
+        response = self.client.get('/api/offers/', {'fields': 'id,restaurant', 'expand': 'restaurant'})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        item = results[0]
+        self.assertEqual(set(item), {'id', 'restaurant'})
+        self.assertEqual(item['restaurant']['id'], str(self.restaurant.id))
+
+    def test_unknown_expansion_is_rejected(self):
+        response = self.client.get('/api/offers/', {'expand': 'usages'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.data)
+
+
+class RedeemedOffersTest(TestCase):
+    def setUp(self):
+        from .middleware import OfferExpirationMiddleware
+
+        # Keep the expiry sweep from queueing during the counted requests
+        patcher = mock.patch.object(OfferExpirationMiddleware, '_last_check', timezone.now())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.restaurant = create_restaurant()
+        self.user = create_user('customer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def use(self, offer, days_ago, status='used'):
+        OfferUsage.objects.create(
+            offer=offer, user=self.user, used_at=timezone.now() - timedelta(days=days_ago),
+            order_amount=100, discount_applied=10, status=status
+        )
+
+    def test_counts_are_grouped_per_offer_in_two_queries(self):
+        offers = [create_offer(self.restaurant, title=f'Offer {index}') for index in range(5)]
+        for index, offer in enumerate(offers):
+            self.use(offer, days_ago=index)
+            self.use(offer, days_ago=index + 10)
+        self.use(offers[0], days_ago=20, status='expired')
+        self.use(offers[1], days_ago=30, status='expired')
+        expired_only = create_offer(self.restaurant, title='Never used')
+        self.use(expired_only, days_ago=40, status='expired')
+        # A lapsed activation is left to the queued sweep
+        OfferActivation.objects.create(offer=offers[2], user=self.user, expires_at=timezone.now() - timedelta(minutes=1))
+
+        with self.assertNumQueries(2):
+            first = self.client.get('/api/offers/redeemed/', {'page_size': 4})
+        with self.assertNumQueries(2):
+            second = self.client.get('/api/offers/redeemed/', {'page_size': 4, 'page': 2})
+
+        self.assertEqual(first.data['count'], 6)
+        results = first.data['results'] + second.data['results']
+        self.assertEqual([item['title'] for item in results], [
+            'Offer 0', 'Offer 1', 'Offer 2', 'Offer 3', 'Offer 4', 'Never used',
+        ])
+        self.assertEqual((results[0]['usage_count'], results[0]['expired_count']), (2, 1))
+        self.assertEqual(results[2]['expired_count'], 0)
+        self.assertEqual((results[5]['status'], results[5]['expired_count']), ('expired', 1))
+        self.assertEqual(OfferActivation.objects.get().status, 'pending')
+
+
+class ActivationExpiryTest(TestCase):
+    def setUp(self):
+        from .middleware import OfferExpirationMiddleware
+
+        patcher = mock.patch.object(OfferExpirationMiddleware, '_last_check', timezone.now())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.offer = create_offer(create_restaurant(), max_uses_per_user=1)
+        self.user = create_user('customer')
+        self.activation = OfferActivation.objects.create(
+            offer=self.offer,
+            user=self.user,
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def results(self, response):
+        return response.data['results'] if isinstance(response.data, dict) else response.data
+
+    def test_reads_show_lapsed_activations_as_expired_without_writing(self):
+        staff = User.objects.create_user(username='staff', password=None, is_staff=True)
+        admin_client = APIClient()
+        admin_client.force_authenticate(staff)
+
+        mine = self.client.get('/api/offers/activations/')
+        expired = admin_client.get('/api/offers/admin/activations/', {'status': 'expired'})
+        pending = admin_client.get('/api/offers/admin/activations/', {'status': 'pending'})
+        self.client.get('/api/offers/')
+
+        self.assertEqual(mine.data[0]['status'], 'expired')
+        self.assertEqual([row['id'] for row in expired.data], [self.activation.pk])
+        self.assertEqual(pending.data, [])
+        self.activation.refresh_from_db()
+        self.assertEqual(self.activation.status, 'pending')
+        self.assertFalse(OfferUsage.objects.exists())
+
+    def test_lapsed_activation_counts_toward_the_user_limit(self):
+        listed = self.results(self.client.get('/api/offers/'))
+        self.assertNotIn(self.offer.pk, [offer['id'] for offer in listed])
+        self.assertEqual(self.client.post(f'/api/offers/{self.offer.pk}/activate/').status_code, 400)
+
+        OfferActivation.update_expired_activations()
+        self.assertEqual(OfferUsage.objects.get().status, 'expired')
+        self.assertEqual(self.client.post(f'/api/offers/{self.offer.pk}/activate/').status_code, 400)
+
+
+class OfferStatsTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .middleware import OfferExpirationMiddleware
+
+        cache.clear()
+        patcher = mock.patch.object(OfferExpirationMiddleware, '_last_check', timezone.now())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        restaurant = create_restaurant()
+        create_offer(restaurant, is_featured=True)
+        create_offer(restaurant, offer_type='fixed', discount_percentage=None, discount_amount=Decimal('50'))
+        create_offer(create_restaurant(), valid_until=timezone.now() - timedelta(hours=1))
+
+    def test_stats_take_one_query_then_come_from_the_cache(self):
+        with self.assertNumQueries(1):
+            first = APIClient().get('/api/offers/stats/')
+        with self.assertNumQueries(0):
+            second = APIClient().get('/api/offers/stats/')
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.data['total_offers'], 3)
+        self.assertEqual(first.data['active_offers'], 2)
+        self.assertEqual(first.data['featured_offers'], 1)
+        self.assertEqual(first.data['restaurants_with_offers'], 1)
+
+    def test_new_offers_invalidate_the_cached_stats(self):
+        APIClient().get('/api/offers/stats/')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_offer(Restaurant.objects.first())
+        self.assertEqual(APIClient().get('/api/offers/stats/').data['total_offers'], 4)
@@ -16,6 +16,7 @@ urlpatterns = [
     
     # Restaurant offers
     path('restaurant/<uuid:restaurant_id>/', views.RestaurantOffersView.as_view(), name='restaurant-offers'),
+    path('restaurant/<uuid:restaurant_id>/best-offer/', views.best_offer_for_booking, name='best-offer-for-booking'),
     
     # User interactions
     path('usage/', views.user_offer_usage, name='user-offer-usage'),
@@ -1,20 +1,30 @@
 # apps/offers/views.py
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, F, Prefetch
+from django.db.models import Q, F, Count, Max, Min, Prefetch
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 import django_filters
 
 from .models import Offer, OfferUsage, OfferActivation
+from .eligibility import eligible_offer_q, eligible_offers, is_eligible
+from .pricing import best_quote, booking_amount, quote_offer, quote_offers
 from .serializers import (
-    OfferSerializer, OfferListSerializer, 
+    OfferSerializer, OfferListSerializer, CompiledOfferListSerializer, 
     RestaurantOfferSerializer, OfferUsageSerializer,
     OfferActivationSerializer, RedeemOfferSerializer
 )
-from apps.restaurant.models import Restaurant
+from apps.core.cache import CachedListMixin, get_or_build
+from apps.core.conditional import ConditionalGetMixin
+from apps.core.renderers import FAST_RENDERER_CLASSES
+from apps.core.routers import replica_view
+from apps.core.serializers import CompiledListMixin, SparseFieldsMixin
 
 
 class OfferFilter(django_filters.FilterSet):
@@ -33,12 +43,8 @@ class OfferFilter(django_filters.FilterSet):
 
     def filter_valid_today(self, queryset, name, value):
         if value:
-            now = timezone.now()
-            return queryset.filter(
-                is_active=True,
-                valid_from__lte=now,
-                valid_until__gte=now
-            )
+            # Same rules as booking-time eligibility, weekday included
+            return queryset.filter(eligible_offer_q(timezone.now()))
         return queryset
 
     def filter_min_discount(self, queryset, name, value):
@@ -52,90 +58,48 @@ class OfferFilter(django_filters.FilterSet):
         )
 
 
-class OfferListView(generics.ListAPIView):
+class OfferListView(SparseFieldsMixin, ConditionalGetMixin, CompiledListMixin, generics.ListAPIView):
     """List all active offers with filtering and search"""
     serializer_class = OfferListSerializer
+    compiled_serializer_class = CompiledOfferListSerializer
     permission_classes = [AllowAny]
+    renderer_classes = FAST_RENDERER_CLASSES
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = OfferFilter
     search_fields = ['title', 'description', 'restaurant__name', 'restaurant__cuisine']
     ordering_fields = ['created_at', 'valid_until', 'discount_percentage', 'discount_amount']
     ordering = ['-is_featured', '-created_at']
+    conditional_tags = ('offers',)
+    conditional_time_window = True  # validity windows and activation expiry
 
     def get_queryset(self):
-        now = timezone.now()
-        
-        # Update expired activations first
-        OfferActivation.update_expired_activations()
-        
-        queryset = Offer.objects.filter(
-            is_active=True,
-            valid_from__lte=now,
-            valid_until__gte=now
-        ).filter(
-            Q(max_uses__isnull=True) | Q(current_uses__lt=F('max_uses'))
-        ).select_related('restaurant')
-        
-        # If user is authenticated, filter out offers they've already used up to their limit
-        # and offers that have expired activations
-        if self.request.user.is_authenticated:
-            user = self.request.user
-            
-            # Get offers where user has reached their personal usage limit
-            # (counting both actual usage and expired activations)
-            used_up_offers = []
-            
-            for offer in queryset:
-                total_usage_count = OfferUsage.objects.filter(
-                    offer=offer,
-                    user=user
-                ).count()  # This includes both 'used' and 'expired' status
-                
-                if total_usage_count >= offer.max_uses_per_user:
-                    used_up_offers.append(offer.id)
-            
-            # Exclude offers the user has used up (including expired activations)
-            queryset = queryset.exclude(id__in=used_up_offers)
+        # For authenticated users this also drops offers they've used up to their
+        # limit (counting both actual usage and expired activations)
+        queryset = eligible_offers(user=self.request.user).select_related('restaurant')
         
         return queryset.distinct()
 
 
-class FeaturedOffersView(generics.ListAPIView):
+class FeaturedOffersView(SparseFieldsMixin, ConditionalGetMixin, CachedListMixin, CompiledListMixin, generics.ListAPIView):
     """List featured offers"""
     serializer_class = OfferListSerializer
+    compiled_serializer_class = CompiledOfferListSerializer
     permission_classes = [AllowAny]
+    cache_namespace = 'offers'
+    cache_tags = ('offers',)
+    conditional_tags = ('offers',)
+    conditional_time_window = True
 
     def get_queryset(self):
-        now = timezone.now()
-        queryset = Offer.objects.filter(
-            is_active=True,
-            is_featured=True,
-            valid_from__lte=now,
-            valid_until__gte=now
-        ).filter(
-            Q(max_uses__isnull=True) | Q(current_uses__lt=F('max_uses'))
+        queryset = eligible_offers(
+            user=self.request.user,
+            queryset=Offer.objects.filter(is_featured=True)
         ).select_related('restaurant')
         
-        # If user is authenticated, filter out offers they've already used up to their limit
-        if self.request.user.is_authenticated:
-            user = self.request.user
-            # Get offers where user has reached their personal usage limit
-            used_up_offers = []
-            for offer in queryset:
-                user_usage_count = OfferUsage.objects.filter(
-                    offer=offer,
-                    user=user
-                ).count()
-                if user_usage_count >= offer.max_uses_per_user:
-                    used_up_offers.append(offer.id)
-            
-            # Exclude offers the user has used up
-            queryset = queryset.exclude(id__in=used_up_offers)
-        
         return queryset[:6]
 
 
-class OfferDetailView(generics.RetrieveAPIView):
+class OfferDetailView(SparseFieldsMixin, generics.RetrieveAPIView):
     """Get detailed offer information"""
     serializer_class = OfferSerializer
     lookup_field = 'id'
@@ -148,101 +112,78 @@ class OfferDetailView(generics.RetrieveAPIView):
         ).select_related('restaurant')
 
 
-class RestaurantOffersView(generics.ListAPIView):
+class RestaurantOffersView(ConditionalGetMixin, generics.ListAPIView):
     """Get all offers for a specific restaurant"""
     serializer_class = RestaurantOfferSerializer
     permission_classes = [AllowAny]
+    conditional_tags = ('offers:{restaurant_id}',)
+    conditional_time_window = True  # time_remaining counts down
 
     def get_queryset(self):
         restaurant_id = self.kwargs['restaurant_id']
-        now = timezone.now()
-        queryset = Offer.objects.filter(
-            restaurant_id=restaurant_id,
-            is_active=True,
-            valid_from__lte=now,
-            valid_until__gte=now
-        ).filter(
-            Q(max_uses__isnull=True) | Q(current_uses__lt=F('max_uses'))
-        )
-        
-        # If user is authenticated, filter out offers they've already used up to their limit
-        if self.request.user.is_authenticated:
-            user = self.request.user
-            # Get offers where user has reached their personal usage limit
-            used_up_offers = []
-            for offer in queryset:
-                user_usage_count = OfferUsage.objects.filter(
-                    offer=offer,
-                    user=user
-                ).count()
-                if user_usage_count >= offer.max_uses_per_user:
-                    used_up_offers.append(offer.id)
-            
-            # Exclude offers the user has used up
-            queryset = queryset.exclude(id__in=used_up_offers)
+        queryset = eligible_offers(user=self.request.user, restaurants=[restaurant_id])
         
         return queryset.order_by('-is_featured', '-created_at')
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_view
 def offer_stats(request):
     """Get offer statistics"""
+    payload = get_or_build(
+        'offers:stats',
+        _build_offer_stats,
+        getattr(settings, 'STATS_CACHE_TIMEOUT', 60),
+        tags=('offers',)
+    )
+    return Response(payload)
+
+
+def _build_offer_stats():
+    """Compute every offer statistic in a single conditional aggregate"""
     now = timezone.now()
+    in_window = Q(is_active=True, valid_from__lte=now, valid_until__gte=now)
+    active = eligible_offer_q(now)
     
-    total_offers = Offer.objects.filter(is_active=True).count()
-    active_offers = Offer.objects.filter(
-        is_active=True,
-        valid_from__lte=now,
-        valid_until__gte=now
-    ).filter(
-        Q(max_uses__isnull=True) | Q(current_uses__lt=F('max_uses'))
-    ).count()
-    featured_offers = Offer.objects.filter(
-        is_active=True,
-        is_featured=True,
-        valid_from__lte=now,
-        valid_until__gte=now
-    ).filter(
-        Q(max_uses__isnull=True) | Q(current_uses__lt=F('max_uses'))
-    ).count()
+    aggregates = {
+        'total_offers': Count('id', filter=Q(is_active=True)),
+        'active_offers': Count('id', filter=active),
+        'featured_offers': Count('id', filter=active & Q(is_featured=True)),
+        # Unique restaurants with offers
+        'restaurants_with_offers': Count('restaurant', filter=active, distinct=True),
+    }
+    # Offer types distribution
+    for offer_type, label in Offer.OFFER_TYPES:
+        aggregates[f'type_{offer_type}'] = Count('id', filter=in_window & Q(offer_type=offer_type))
     
-    # Get unique restaurants with offers
-    restaurants_with_offers = Restaurant.objects.filter(
-        offers__is_active=True,
-        offers__valid_from__lte=now,
-        offers__valid_until__gte=now
-    ).filter(
-        Q(offers__max_uses__isnull=True) | Q(offers__current_uses__lt=F('offers__max_uses'))
-    ).distinct().count()
+    counts = Offer.objects.aggregate(**aggregates)
     
-    # Get offer types distribution
     offer_types = {}
     for offer_type, label in Offer.OFFER_TYPES:
-        count = Offer.objects.filter(
-            is_active=True,
-            offer_type=offer_type,
-            valid_from__lte=now,
-            valid_until__gte=now
-        ).count()
+        count = counts.pop(f'type_{offer_type}')
         if count > 0:
             offer_types[offer_type] = {
                 'label': label,
                 'count': count
             }
     
-    return Response({
-        'total_offers': total_offers,
-        'active_offers': active_offers,
-        'featured_offers': featured_offers,
-        'restaurants_with_offers': restaurants_with_offers,
-        'offer_types': offer_types
-    })
+    return {**counts, 'offer_types': offer_types}
 
 
 @api_view(['GET'])
 def trending_offers(request):
     """Get trending offers based on usage"""
+    data = get_or_build(
+        'offers:trending',
+        _build_trending_offers,
+        getattr(settings, 'APP_CACHE_TIMEOUT', 60),
+        tags=('offers',)
+    )
+    return Response(data)
+
+
+def _build_trending_offers():
     now = timezone.now()
     
     trending = Offer.objects.filter(
@@ -252,8 +193,90 @@ def trending_offers(request):
         current_uses__gt=0
     ).select_related('restaurant').order_by('-current_uses', '-created_at')[:10]
     
-    serializer = OfferListSerializer(trending, many=True)
-    return Response(serializer.data)
+    return CompiledOfferListSerializer(trending).data
+
+
+# Order amounts are stored in DecimalField(max_digits=10, decimal_places=2)
+MAX_ORDER_AMOUNT = Decimal('99999999.99')
+
+
+def _parse_amount(value):
+    """A non-negative, finite order amount that fits the money columns; InvalidOperation otherwise"""
+    amount = Decimal(str(value))
+    if not amount.is_finite() or not 0 <= amount <= MAX_ORDER_AMOUNT:
+        raise InvalidOperation(value)
+    return amount
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def best_offer_for_booking(request, restaurant_id):
+    """Quote every eligible offer of a restaurant for a booking and pick the best one"""
+    try:
+        party_size = int(request.query_params.get('party_size', ''))
+    except ValueError:
+        return Response(
+            {'error': 'party_size parameter is required'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not 1 <= party_size <= 20:
+        return Response(
+            {'error': 'Party size must be between 1 and 20'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    order_amount = request.query_params.get('order_amount')
+    try:
+        order_amount = _parse_amount(order_amount) if order_amount else None
+    except InvalidOperation:
+        return Response(
+            {'error': 'Invalid order amount'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Evaluate offers at the booked time when given (YYYY-MM-DD and HH:MM)
+    at = timezone.now()
+    date_str = request.query_params.get('date')
+    if date_str:
+        try:
+            booking_time = datetime.strptime(
+                f"{date_str} {request.query_params.get('time', '00:00')}", '%Y-%m-%d %H:%M'
+            )
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date or time format. Use YYYY-MM-DD and HH:MM'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        at = timezone.make_aware(booking_time)
+    
+    offers = eligible_offers(
+        user=request.user,
+        at=at,
+        restaurants=[restaurant_id]
+    ).order_by('-is_featured', '-created_at')
+    quotes = quote_offers((offer, party_size, order_amount) for offer in offers)
+    best = best_quote(quotes)
+    
+    def quote_data(quote):
+        return {
+            'offer_id': quote.offer.id,
+            'title': quote.offer.title,
+            'offer_type': quote.offer.offer_type,
+            'discount_text': quote.offer.discount_text,
+            'original_amount': quote.original_amount,
+            'discount_amount': quote.discount_amount,
+            'final_amount': quote.final_amount,
+            'is_applicable': quote.is_applicable,
+            'reason': quote.reason,
+        }
+    
+    return Response({
+        'restaurant_id': str(restaurant_id),
+        'party_size': party_size,
+        'original_amount': order_amount if order_amount is not None else booking_amount(party_size),
+        'best_offer': quote_data(best) if best else None,
+        'quotes': [quote_data(quote) for quote in quotes],
+    })
 
 
 @api_view(['GET'])
@@ -275,39 +298,36 @@ def use_offer(request, offer_id):
     try:
         offer = Offer.objects.get(id=offer_id, is_active=True)
         
-        if not offer.is_valid:
+        try:
+            order_amount = _parse_amount(request.data.get('order_amount', 0))
+        except InvalidOperation:
             return Response(
-                {'error': 'Offer is not valid'}, 
+                {'error': 'Invalid order amount'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        if not offer.can_be_used_by_user(request.user):
+        quote = quote_offer(offer, party_size=1, order_amount=order_amount)
+        if not quote.is_applicable:
             return Response(
-                {'error': 'You have exceeded the usage limit for this offer'}, 
+                {'error': quote.reason}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create usage record
-        order_amount = request.data.get('order_amount', 0)
-        discount_applied = min(
-            float(order_amount) * (float(offer.discount_percentage or 0) / 100) if offer.offer_type == 'percentage' else float(offer.discount_amount or 0),
-            float(offer.maximum_discount_amount or float('inf'))
-        )
-        
-        OfferUsage.objects.create(
-            offer=offer,
-            user=request.user,
-            used_at=timezone.now(),  # Set current time for actual usage
-            order_amount=order_amount,
-            discount_applied=discount_applied,
-            status='used'  # Mark as actually used
-        )
-        
-        offer.use_offer()
+        # Validity and both usage caps are checked under the offer's row lock
+        try:
+            offer.use_offer(
+                request.user.pk,
+                order_amount=quote.original_amount,
+                discount_applied=quote.discount_amount
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         return Response({
             'message': 'Offer used successfully',
-            'discount_applied': discount_applied
+            'discount_applied': float(quote.discount_amount)
         })
         
     except Offer.DoesNotExist:
@@ -322,12 +342,9 @@ def use_offer(request, offer_id):
 def activate_offer(request, offer_id):
     """Activate an offer and generate activation code"""
     try:
-        # Update expired activations first
-        OfferActivation.update_expired_activations()
-        
         offer = Offer.objects.get(id=offer_id)
         
-        if not offer.is_valid:
+        if not is_eligible(offer):
             return Response(
                 {'error': 'Offer is not currently valid'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -348,25 +365,22 @@ def activate_offer(request, offer_id):
                 }
             )
         
-        if not offer.can_be_used_by_user(user):
+        if not is_eligible(offer, user=user):
             return Response(
                 {'error': 'You have already used this offer or exceeded usage limit'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if user already has a pending activation for this offer
+        # Check if user already has an unexpired activation for this offer;
+        # lapsed ones are left to the queued expiry sweep
         existing_activation = OfferActivation.objects.filter(
             offer=offer,
             user=user,
-            status='pending'
+            status='pending',
+            expires_at__gt=timezone.now()
         ).first()
         
         if existing_activation:
-            # Check if it's expired and update if needed
-            existing_activation.check_and_update_expiration()
-            # Refresh from database
-            existing_activation.refresh_from_db()
-            
             if existing_activation.is_valid:
                 serializer = OfferActivationSerializer(existing_activation)
                 return Response({
@@ -397,9 +411,6 @@ def activate_offer(request, offer_id):
 @permission_classes([IsAuthenticated])
 def user_activations(request):
     """Get user's offer activations"""
-    # Update expired activations first
-    OfferActivation.update_expired_activations()
-    
     activations = OfferActivation.objects.filter(
         user=request.user
     ).select_related('offer', 'offer__restaurant').order_by('-created_at')[:20]
@@ -408,92 +419,86 @@ def user_activations(request):
     return Response(serializer.data)
 
 
+class RedeemedOffersPagination(PageNumberPagination):
+    """Page through a user's redemption history"""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_redeemed_offers(request):
-    """Get user's redeemed offers (offers they have actually used) and expired activations"""
-    print(f"DEBUG: user_redeemed_offers called by user: {request.user}")
-    
-    # Update expired activations first
-    OfferActivation.update_expired_activations()
-    
-    # Get all offer usage records for this user (both used and expired)
-    usage_records = OfferUsage.objects.filter(
+    """
+    Get user's redeemed offers (offers they have actually used) and expired
+    activations. Lapsed activations are marked expired by the queued
+    ``expire_offer_activations`` sweep, not on this read.
+    """
+    # One grouped query: usage counts and dates per (offer, status)
+    usage_groups = OfferUsage.objects.filter(
         user=request.user
-    ).select_related('offer', 'offer__restaurant').order_by('-used_at')
+    ).values('offer', 'status').annotate(
+        count=Count('id'),
+        first_used=Min('used_at'),
+        last_used=Max('used_at')
+    ).order_by()
     
-    print(f"DEBUG: Found {usage_records.count()} usage records for user {request.user}")
+    # Fold the per-status rows into one summary per offer
+    summaries = {}
+    for group in usage_groups:
+        summary = summaries.setdefault(group['offer'], {
+            'usage_count': 0,
+            'expired_count': 0,
+            'first_used': group['first_used'],
+            'last_used': group['last_used'],
+        })
+        if group['status'] == 'expired':
+            summary['expired_count'] += group['count']
+            summary['expired_at'] = group['last_used']
+        else:
+            summary['usage_count'] += group['count']
+        summary['first_used'] = min(summary['first_used'], group['first_used'])
+        summary['last_used'] = max(summary['last_used'], group['last_used'])
     
-    # Group by offer to show unique offers with usage info
-    offers_data = []
-    seen_offers = set()
+    # Sort by most recent activity (used_at)
+    offer_ids = sorted(summaries, key=lambda offer_id: summaries[offer_id]['last_used'], reverse=True)
     
-    for usage in usage_records:
-        if usage.offer.id not in seen_offers:
-            # Get total usage count for this offer by this user (only actual usage, not expired)
-            actual_usage_count = OfferUsage.objects.filter(
-                user=request.user,
-                offer=usage.offer,
-                status='used'
-            ).count()
-            
-            # Get expired count
-            expired_count = OfferUsage.objects.filter(
-                user=request.user,
-                offer=usage.offer,
-                status='expired'
-            ).count()
-            
-            # Get the latest usage date (any status)
-            latest_usage = OfferUsage.objects.filter(
-                user=request.user,
-                offer=usage.offer
-            ).order_by('-used_at').first()
-            
-            # Determine primary status (used takes precedence over expired)
-            primary_status = 'used' if actual_usage_count > 0 else 'expired'
-            
-            offer_data = {
-                'id': usage.offer.id,
-                'title': usage.offer.title,
-                'description': usage.offer.description,
-                'offer_type': usage.offer.offer_type,
-                'discount_percentage': usage.offer.discount_percentage,
-                'discount_amount': usage.offer.discount_amount,
-                'max_uses_per_user': usage.offer.max_uses_per_user,
-                'restaurant': {
-                    'id': str(usage.offer.restaurant.id),
-                    'name': usage.offer.restaurant.name,
-                    'cuisine': usage.offer.restaurant.cuisine,
-                } if usage.offer.restaurant else None,
-                'usage_count': actual_usage_count,
-                'expired_count': expired_count,
-                'last_used': latest_usage.used_at if latest_usage else None,
-                'first_used': usage.used_at,
-                'status': primary_status
-            }
-            
-            # Add expiration details if applicable
-            if expired_count > 0:
-                latest_expired = OfferUsage.objects.filter(
-                    user=request.user,
-                    offer=usage.offer,
-                    status='expired'
-                ).order_by('-used_at').first()
-                if latest_expired:
-                    offer_data['expired_at'] = latest_expired.used_at
-            
-            offers_data.append(offer_data)
-            seen_offers.add(usage.offer.id)
+    paginator = RedeemedOffersPagination()
+    page_ids = paginator.paginate_queryset(offer_ids, request)
+    offers = Offer.objects.select_related('restaurant').in_bulk(page_ids)
     
-    # Sort by most recent activity (used_at)
-    offers_data.sort(key=lambda x: x['last_used'] or x['first_used'], reverse=True)
+    offers_data = []
+    for offer_id in page_ids:
+        offer = offers[offer_id]
+        summary = summaries[offer_id]
+        offer_data = {
+            'id': offer.id,
+            'title': offer.title,
+            'description': offer.description,
+            'offer_type': offer.offer_type,
+            'discount_percentage': offer.discount_percentage,
+            'discount_amount': offer.discount_amount,
+            'max_uses_per_user': offer.max_uses_per_user,
+            'restaurant': {
+                'id': str(offer.restaurant.id),
+                'name': offer.restaurant.name,
+                'cuisine': offer.restaurant.cuisine,
+            } if offer.restaurant else None,
+            'usage_count': summary['usage_count'],
+            'expired_count': summary['expired_count'],
+            'last_used': summary['last_used'],
+            'first_used': summary['first_used'],
+            # Primary status (used takes precedence over expired)
+            'status': 'used' if summary['usage_count'] > 0 else 'expired'
+        }
+        
+        # Add expiration details if applicable
+        if summary['expired_count'] > 0:
+            offer_data['expired_at'] = summary['expired_at']
+        
+        offers_data.append(offer_data)
     
-    print(f"DEBUG: Returning {len(offers_data)} unique offers with usage records")
-    return Response({
-        'count': len(offers_data),
-        'results': offers_data
-    })
+    return paginator.get_paginated_response(offers_data)
 
 
 @api_view(['POST'])
@@ -507,18 +512,13 @@ def redeem_offer_code(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Update expired activations first
-    OfferActivation.update_expired_activations()
-    
     serializer = RedeemOfferSerializer(data=request.data)
     if serializer.is_valid():
         try:
             activation_code = serializer.validated_data['activation_code']
-            activation = OfferActivation.objects.get(activation_code=activation_code)
-            
-            # Double-check expiration status
-            activation.check_and_update_expiration()
-            activation.refresh_from_db()
+            activation = OfferActivation.objects.select_related(
+                'offer', 'offer__restaurant', 'user'
+            ).get(activation_code=activation_code)
             
             # Redeem the code
             activation.redeem(request.user)
@@ -554,9 +554,6 @@ def admin_activations(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Update expired activations first
-    OfferActivation.update_expired_activations()
-    
     # If user has a restaurant, filter by that restaurant
     restaurant = None
     if hasattr(request.user, 'restaurant_admin'):
@@ -572,7 +569,14 @@ def admin_activations(request):
     # Filter by status if provided
     status_filter = request.query_params.get('status')
     if status_filter:
-        activations = activations.filter(status=status_filter)
+        # Lapsed activations read as expired before the sweep marks them
+        now = timezone.now()
+        if status_filter == 'pending':
+            activations = activations.filter(status='pending', expires_at__gt=now)
+        elif status_filter == 'expired':
+            activations = activations.filter(Q(status='expired') | Q(status='pending', expires_at__lte=now))
+        else:
+            activations = activations.filter(status=status_filter)
     
     # Paginate if needed
     activations = activations[:50]  # Limit to 50 recent activations
@@ -1,8 +1,11 @@
 # apps/restaurant/serializers.py
+from django.db.models import Count
+from django.utils import timezone
 from rest_framework import serializers
+from apps.core.serializers import CompiledListSerializer, SparseFieldsSerializerMixin
 from .models import Restaurant
 
-class RestaurantListSerializer(serializers.ModelSerializer):
+class RestaurantListSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Serializer for listing restaurants with essential information"""
     
     average_rating = serializers.ReadOnlyField()
@@ -11,6 +14,14 @@ class RestaurantListSerializer(serializers.ModelSerializer):
     has_offers = serializers.SerializerMethodField()
     active_offers_count = serializers.SerializerMethodField()
     
+    field_dependencies = {
+        'average_rating': ['rating'],
+        'is_open': ['opening_time', 'closing_time'],
+        'is_favorited': [],
+        'has_offers': [],
+        'active_offers_count': [],
+    }
+    
     class Meta:
         model = Restaurant
         fields = [
@@ -57,7 +68,51 @@ class RestaurantListSerializer(serializers.ModelSerializer):
             valid_until__gte=now
         ).count()
 
-class RestaurantDetailSerializer(serializers.ModelSerializer):
+
+class CompiledRestaurantListSerializer(CompiledListSerializer):
+    """
+    RestaurantListSerializer output built from values() rows, with the
+    favorite flags and offer counts fetched in one query each
+    """
+    serializer_class = RestaurantListSerializer
+
+    def prepare(self, rows):
+        from apps.favorites.models import Favorite
+        from apps.offers.models import Offer
+        
+        restaurant_ids = [row['id'] for row in rows]
+        now = timezone.now()
+        self.offer_counts = {}
+        if self.wants('has_offers') or self.wants('active_offers_count'):
+            self.offer_counts = dict(
+                Offer.objects.filter(
+                    restaurant__in=restaurant_ids,
+                    is_active=True,
+                    valid_from__lte=now,
+                    valid_until__gte=now
+                ).order_by().values('restaurant').annotate(count=Count('id')).values_list('restaurant', 'count')
+            )
+        
+        self.favorites = set()
+        request = self.context.get('request')
+        if self.wants('is_favorited') and request and request.user.is_authenticated:
+            self.favorites = set(
+                Favorite.objects.filter(
+                    user=request.user,
+                    restaurant__in=restaurant_ids
+                ).values_list('restaurant_id', flat=True)
+            )
+
+    def get_is_favorited(self, row):
+        return row['id'] in self.favorites
+
+    def get_has_offers(self, row):
+        return row['id'] in self.offer_counts
+
+    def get_active_offers_count(self, row):
+        return self.offer_counts.get(row['id'], 0)
+
+class RestaurantDetailSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Serializer for detailed restaurant information"""
     
     average_rating = serializers.ReadOnlyField()
@@ -65,6 +120,13 @@ class RestaurantDetailSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     active_offers = serializers.SerializerMethodField()
     
+    field_dependencies = {
+        'average_rating': ['rating'],
+        'is_open': ['opening_time', 'closing_time'],
+        'is_favorited': [],
+        'active_offers': [],
+    }
+    
     class Meta:
         model = Restaurant
         fields = [
@@ -122,13 +184,19 @@ class RestaurantDetailSerializer(serializers.ModelSerializer):
             })
         return offer_data
 
-class FeaturedRestaurantSerializer(serializers.ModelSerializer):
+class FeaturedRestaurantSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     """Serializer for featured restaurants"""
     
     average_rating = serializers.ReadOnlyField()
     is_open = serializers.ReadOnlyField()
     is_favorited = serializers.SerializerMethodField()
     
+    field_dependencies = {
+        'average_rating': ['rating'],
+        'is_open': ['opening_time', 'closing_time'],
+        'is_favorited': [],
+    }
+    
     class Meta:
         model = Restaurant
         fields = [
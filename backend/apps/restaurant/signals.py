@@ -0,0 +1,13 @@
+# apps/restaurant/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core.cache import invalidate_tags_on_commit
+from .models import Restaurant
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_restaurant_cache(sender, instance, **kwargs):
+    """
+    Drop cached restaurant listings (offer listings embed restaurant details)
+    """
+    invalidate_tags_on_commit('restaurants', 'offers', f'restaurant:{instance.pk}')
@@ -1,3 +1,140 @@
-from django.test import TestCase
+from datetime import time, timedelta
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APIClient
+from django.utils import timezone
+
+from apps.favorites.models import Favorite
+from apps.offers.models import Offer
+from .models import Restaurant
+from .serializers import CompiledRestaurantListSerializer, RestaurantListSerializer
+
+
+class CompiledRestaurantListSerializerTest(TestCase):
+    def test_matches_restaurant_list_serializer(self):
+        restaurants = [
+            Restaurant.objects.create(
+                name=f'Kitchen {index}',
+                cuisine='Indian',
+                address='1 Test Street',
+                phone='1234567890',
+                email='kitchen@example.com',
+                image='https://example.com/kitchen.jpg',
+                opening_time=time(9, 0),
+                closing_time=time(23, 0),
+            )
+            for index in range(3)
+        ]
+        now = timezone.now()
+        for restaurant in restaurants[:2]:
+            Offer.objects.create(
+                restaurant=restaurant,
+                title='Ten percent off',
+                description='Test offer',
+                offer_type='percentage',
+                discount_percentage=10,
+                valid_from=now - timedelta(days=1),
+                valid_until=now + timedelta(days=1),
+            )
+        user = get_user_model().objects.create_user(username='diner', email='diner@example.com', password=None)
+        Favorite.objects.create(user=user, restaurant=restaurants[1])
+
+        context = {'request': SimpleNamespace(user=user)}
+        expected = RestaurantListSerializer(Restaurant.objects.all(), many=True, context=context).data
+        with self.assertNumQueries(3):
+            compiled = CompiledRestaurantListSerializer(Restaurant.objects.all(), context=context).data
+        self.assertEqual(compiled, [dict(item) for item in expected])
+
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name='Sparse Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='sparse', email='sparse@example.com', password=None
+        ))
+
+    def test_fields_limit_response_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/restaurants/', {'fields': 'id,name,image'})
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(
+            results,
+            [{'id': str(self.restaurant.id), 'name': 'Sparse Kitchen', 'image': 'https://example.com/kitchen.jpg'}]
+        )
+        # No offer-count or favorites batch, and the listing selects no other columns
+        listing = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT "restaurant_restaurant"."id"')
+        ]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn('"description"', listing[0])
+        self.assertFalse(any('offers_offer' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(any('favorites_favorite' in query['sql'] for query in queries.captured_queries))
+
+    def test_detail_fields(self):
+        response = self.client.get(f'/api/restaurants/{self.restaurant.id}/', {'fields': 'name,is_open'})
+        self.assertEqual(set(response.data), {'name', 'is_open'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/restaurants/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+
+@override_settings(ASYNC_DB_THREADS=0)
+class AsyncPublicViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        Restaurant.objects.create(
+            name='Async Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+            rating=4.8,
+            is_featured=True,
+        )
+
+    async def test_restaurant_stats(self):
+        response = await self.async_client.get('/api/restaurants/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(
+            response.json(),
+            {'total_restaurants': 1, 'featured_restaurants': 1, 'top_rated_restaurants': 1}
+        )
+
+    def test_restaurant_stats_take_one_query_then_come_from_the_cache(self):
+        from unittest import mock
+        from apps.offers.middleware import OfferExpirationMiddleware
+
+        with mock.patch.object(OfferExpirationMiddleware, '_last_check', timezone.now()):
+            with self.assertNumQueries(1):
+                first = self.client.get('/api/restaurants/stats/')
+            with self.assertNumQueries(0):
+                second = self.client.get('/api/restaurants/stats/')
+        self.assertEqual(first.json(), second.json())
+
+    async def test_only_get_is_allowed(self):
+        response = await self.async_client.post('/api/restaurants/stats/')
+        self.assertEqual(response.status_code, 405)
@@ -1,22 +1,31 @@
 # apps/restaurant/views.py
-from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.response import Response
+from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Q, Count
+from django.views.decorators.http import require_GET
+from apps.core.aio import json_response, run_sync
+from apps.core.cache import CachedListMixin, get_or_build
+from apps.core.conditional import ConditionalGetMixin
+from apps.core.routers import ReplicaReadMixin, replica_view
+from apps.core.serializers import CompiledListMixin, SparseFieldsMixin
 from .models import Restaurant
 from .serializers import (
     RestaurantListSerializer, 
     RestaurantDetailSerializer, 
-    FeaturedRestaurantSerializer
+    FeaturedRestaurantSerializer,
+    CompiledRestaurantListSerializer
 )
 
-class RestaurantListView(generics.ListAPIView):
+class RestaurantListView(ReplicaReadMixin, SparseFieldsMixin, ConditionalGetMixin, CompiledListMixin, generics.ListAPIView):
     """
     API view to retrieve list of restaurants
     """
     serializer_class = RestaurantListSerializer
+    compiled_serializer_class = CompiledRestaurantListSerializer
     permission_classes = [AllowAny]  # Allow public access to restaurant listings
+    conditional_tags = ('restaurants', 'offers')
+    conditional_time_window = True  # is_open and offer counts follow the clock
     
     def get_queryset(self):
         queryset = Restaurant.objects.filter(is_active=True)
@@ -42,20 +51,26 @@ class RestaurantListView(generics.ListAPIView):
             
         return queryset
 
-class RestaurantDetailView(generics.RetrieveAPIView):
+class RestaurantDetailView(ReplicaReadMixin, SparseFieldsMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     """
     API view to retrieve a single restaurant
     """
     queryset = Restaurant.objects.filter(is_active=True)
     serializer_class = RestaurantDetailSerializer
     permission_classes = [AllowAny]  # Allow public access to restaurant details
+    conditional_tags = ('restaurant:{pk}', 'offers:{pk}')
+    conditional_time_window = True
 
-class FeaturedRestaurantsView(generics.ListAPIView):
+class FeaturedRestaurantsView(ReplicaReadMixin, SparseFieldsMixin, ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
     """
     API view to retrieve featured restaurants
     """
     serializer_class = FeaturedRestaurantSerializer
     permission_classes = [AllowAny]  # Allow public access to featured restaurants
+    cache_namespace = 'restaurants'
+    cache_tags = ('restaurants',)
+    conditional_tags = ('restaurants',)
+    conditional_time_window = True
     
     def get_queryset(self):
         return Restaurant.objects.filter(
@@ -63,12 +78,17 @@ class FeaturedRestaurantsView(generics.ListAPIView):
             is_featured=True
         ).order_by('-rating')[:6]
 
-class RecommendedRestaurantsView(generics.ListAPIView):
+class RecommendedRestaurantsView(ReplicaReadMixin, SparseFieldsMixin, ConditionalGetMixin, CachedListMixin, CompiledListMixin, generics.ListAPIView):
     """
     API view to retrieve recommended restaurants based on rating
     """
     serializer_class = RestaurantListSerializer
+    compiled_serializer_class = CompiledRestaurantListSerializer
     permission_classes = [AllowAny]  # Allow public access to recommended restaurants
+    cache_namespace = 'restaurants'
+    cache_tags = ('restaurants',)
+    conditional_tags = ('restaurants',)
+    conditional_time_window = True
     
     def get_queryset(self):
         return Restaurant.objects.filter(
@@ -76,26 +96,27 @@ class RecommendedRestaurantsView(generics.ListAPIView):
             rating__gte=4.0
         ).order_by('-rating', '-total_reviews')[:10]
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def restaurant_stats(request):
+@require_GET
+@replica_view
+async def restaurant_stats(request):
     """
     API view to get restaurant statistics for dashboard
     """
-    total_restaurants = Restaurant.objects.filter(is_active=True).count()
-    featured_restaurants = Restaurant.objects.filter(
-        is_active=True, 
-        is_featured=True
-    ).count()
-    top_rated = Restaurant.objects.filter(
-        is_active=True, 
-        rating__gte=4.5
-    ).count()
-    
-    stats = {
-        'total_restaurants': total_restaurants,
-        'featured_restaurants': featured_restaurants,
-        'top_rated_restaurants': top_rated,
-    }
-    
-    return Response(stats, status=status.HTTP_200_OK)
\ No newline at end of file
+    stats = await run_sync(
+        get_or_build,
+        'restaurants:stats',
+        _build_restaurant_stats,
+        getattr(settings, 'STATS_CACHE_TIMEOUT', 60),
+        tags=('restaurants',)
+    )
+    return json_response(stats)
+
+def _build_restaurant_stats():
+    """
+    Count active, featured and top rated restaurants in one query
+    """
+    return Restaurant.objects.filter(is_active=True).aggregate(
+        total_restaurants=Count('id'),
+        featured_restaurants=Count('id', filter=Q(is_featured=True)),
+        top_rated_restaurants=Count('id', filter=Q(rating__gte=4.5)),
+    )
\ No newline at end of file
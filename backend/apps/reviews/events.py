@@ -0,0 +1,21 @@
+# apps/reviews/events.py
+from django.db.models import Avg, Count
+
+from apps.core.outbox import handler
+from apps.restaurant.models import Restaurant
+
+
+@handler('review.saved', 'review.deleted')
+def update_restaurant_rating(event):
+    """Recompute the restaurant's average rating and review count"""
+    restaurant = Restaurant.objects.filter(pk=event.payload['restaurant_id']).first()
+    if restaurant is None:
+        return
+    review_stats = restaurant.reviews.aggregate(
+        total_reviews=Count('id'),
+        average_rating=Avg('rating')
+    )
+    
+    restaurant.total_reviews = review_stats['total_reviews'] or 0
+    restaurant.rating = round(review_stats['average_rating'] or 0, 2)
+    restaurant.save(update_fields=['total_reviews', 'rating'])
@@ -2,10 +2,11 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 from apps.restaurant.models import Restaurant
+from apps.core.outbox import TransactionalSaveMixin
 
 User = get_user_model()
 
-class Review(models.Model):
+class Review(TransactionalSaveMixin, models.Model):
     """Review model for restaurant reviews"""
     restaurant = models.ForeignKey(
         Restaurant, 
@@ -33,6 +34,10 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['restaurant', 'user']  # One review per user per restaurant
+        indexes = [
+            # Restaurant review lists and staff dashboards, newest first
+            models.Index(fields=['restaurant', 'created_at'], name='review_rest_created_idx'),
+        ]
         
     def __str__(self):
         return f"{self.user.first_name} - {self.restaurant.name} ({self.rating}/5)"
@@ -0,0 +1,27 @@
+# apps/reviews/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core.outbox import emit
+from apps.core.routers import pin_to_primary_on_commit
+from .models import Review
+
+
+@receiver([post_save, post_delete], sender=Review)
+def pin_review_author(sender, instance, **kwargs):
+    """
+    Keep the author reading from the primary until replicas catch up
+    """
+    pin_to_primary_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=Review)
+def record_review_saved(sender, instance, **kwargs):
+    """
+    The restaurant's rating is rebuilt from the outbox, in the saving transaction
+    """
+    emit('review.saved', instance.pk, restaurant_id=instance.restaurant_id, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Review)
+def record_review_deleted(sender, instance, **kwargs):
+    emit('review.deleted', instance.pk, restaurant_id=instance.restaurant_id, user_id=instance.user_id)
@@ -1,3 +1,40 @@
+from datetime import time
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from apps.core import outbox
+from apps.restaurant.models import Restaurant
+from .models import Review
+
+
+class RestaurantRatingTest(TestCase):
+    def test_rating_follows_review_changes_once_events_are_dispatched(self):
+        restaurant = Restaurant.objects.create(
+            name='Test Kitchen',
+            cuisine='Indian',
+            address='1 Test Street',
+            phone='1234567890',
+            email='kitchen@example.com',
+            image='https://example.com/kitchen.jpg',
+            opening_time=time(9, 0),
+            closing_time=time(23, 0),
+        )
+        users = [
+            get_user_model().objects.create_user(username=f'diner{index}', email=f'diner{index}@example.com', password=None)
+            for index in range(2)
+        ]
+        first = Review.objects.create(restaurant=restaurant, user=users[0], rating=5, comment='Great')
+        Review.objects.create(restaurant=restaurant, user=users[1], rating=2, comment='Slow')
+
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.total_reviews, 0)
+
+        outbox.dispatch_pending()
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.total_reviews, float(restaurant.rating)), (2, 3.5))
+
+        first.delete()
+        outbox.dispatch_pending()
+        restaurant.refresh_from_db()
+        self.assertEqual((restaurant.total_reviews, float(restaurant.rating)), (1, 2.0))
@@ -5,14 +5,16 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Avg, Count
 from django.db import transaction
 
+from apps.core.conditional import ConditionalGetMixin
 from apps.restaurant.models import Restaurant
 from .models import Review
 from .serializers import ReviewSerializer, ReviewCreateSerializer, ReviewUpdateSerializer
 
-class RestaurantReviewsListView(generics.ListAPIView):
+class RestaurantReviewsListView(ConditionalGetMixin, generics.ListAPIView):
     """Get all reviews for a specific restaurant"""
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    conditional_tags = ('restaurant:{restaurant_id}',)
     
     def get_queryset(self):
         restaurant_id = self.kwargs['restaurant_id']
@@ -95,8 +97,6 @@ class ReviewCreateView(generics.CreateAPIView):
                 with transaction.atomic():
                     # Save review with restaurant and user
                     review = serializer.save(restaurant=restaurant, user=request.user)
-                    # Update restaurant rating
-                    self.update_restaurant_rating(restaurant)
                     
                 return Response(
                     ReviewSerializer(review, context={'request': request}).data,
@@ -108,22 +108,12 @@ class ReviewCreateView(generics.CreateAPIView):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def update_restaurant_rating(self, restaurant):
-        """Update restaurant's average rating"""
-        review_stats = restaurant.reviews.aggregate(
-            total_reviews=Count('id'),
-            average_rating=Avg('rating')
-        )
-        
-        restaurant.total_reviews = review_stats['total_reviews'] or 0
-        restaurant.rating = round(review_stats['average_rating'] or 0, 2)
-        restaurant.save(update_fields=['total_reviews', 'rating'])
 
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a specific review"""
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_last_modified = True
     
     def get_queryset(self):
         return Review.objects.select_related('user', 'restaurant')
@@ -142,28 +132,6 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
                 raise PermissionDenied("You can only modify your own reviews.")
         return review
     
-    def perform_update(self, serializer):
-        review = serializer.save()
-        # Update restaurant rating after review update
-        self.update_restaurant_rating(review.restaurant)
-    
-    def perform_destroy(self, instance):
-        restaurant = instance.restaurant
-        instance.delete()
-        # Update restaurant rating after review deletion
-        self.update_restaurant_rating(restaurant)
-    
-    def update_restaurant_rating(self, restaurant):
-        """Update restaurant's average rating"""
-        review_stats = restaurant.reviews.aggregate(
-            total_reviews=Count('id'),
-            average_rating=Avg('rating')
-        )
-        
-        restaurant.total_reviews = review_stats['total_reviews'] or 0
-        restaurant.rating = round(review_stats['average_rating'] or 0, 2)
-        restaurant.save(update_fields=['total_reviews', 'rating'])
-
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_reviews(request):
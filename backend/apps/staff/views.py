@@ -1,11 +1,15 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.db.models import Count, Avg, Q
 from datetime import datetime, timedelta
+import logging
 
+from apps.core.renderers import FAST_RENDERER_CLASSES
+from apps.core.routers import replica_view
 from apps.staff.models import RestaurantAdmin
 from apps.staff.serializers import (
 	RestaurantAdminProfileSerializer,
@@ -13,14 +17,20 @@ from apps.staff.serializers import (
 	RestaurantSummarySerializer,
 )
 from apps.staff.permissions import IsRestaurantAdmin
-from apps.bookings.models import Booking, BookingHistory
-from apps.bookings.serializers import BookingListSerializer
+from apps.bookings.archive import ARCHIVABLE_STATUSES, archive_needed, count_bookings, start_of_day
+from apps.bookings.models import ArchivedBooking, Booking, BookingHistory
+from apps.bookings.tasks import record_booking_history
+from apps.bookings.serializers import (
+	BookingListSerializer, CompiledArchivedBookingListSerializer, CompiledBookingListSerializer
+)
 from apps.reviews.models import Review
 from apps.reviews.serializers import ReviewSerializer
 from apps.offers.models import Offer
 from apps.offers.serializers import OfferSerializer
 from apps.restaurant.models import Restaurant
 
+logger = logging.getLogger(__name__)
+
 
 def _get_admin_restaurant(user):
 	admin_profile = get_object_or_404(RestaurantAdmin, user=user)
@@ -36,6 +46,7 @@ def admin_me(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsRestaurantAdmin])
+@replica_view
 def admin_overview(request):
 	restaurant = _get_admin_restaurant(request.user)
 	now = timezone.now()
@@ -46,54 +57,25 @@ def admin_overview(request):
 	last_week_start = current_week_start - timedelta(days=7)
 	last_week_end = current_week_start - timedelta(days=1)
 	current_month_start = today.replace(day=1)
-	if current_month_start.month == 1:
-		last_month_start = current_month_start.replace(year=current_month_start.year - 1, month=12)
-	else:
-		last_month_start = current_month_start.replace(month=current_month_start.month - 1)
-	last_month_end = current_month_start - timedelta(days=1)
 
-	# Current period stats
+	# Current period stats; counts include archived bookings when the period reaches back that far
+	statuses = ('pending', 'confirmed', 'completed', 'cancelled')
 	bookings = Booking.objects.filter(restaurant=restaurant)
-	current_stats = {
-		'total_bookings': bookings.count(),
-		'pending': bookings.filter(status='pending').count(),
-		'confirmed': bookings.filter(status='confirmed').count(),
-		'completed': bookings.filter(status='completed').count(),
-		'cancelled': bookings.filter(status='cancelled').count(),
-	}
+	all_time = count_bookings(statuses, restaurant=restaurant)
+	current_stats = {'total_bookings': all_time['total']}
+	current_stats.update({status_name: all_time[status_name] for status_name in statuses})
 
 	# Previous period stats for trends
-	last_week_bookings = bookings.filter(
-		created_at__date__gte=last_week_start,
-		created_at__date__lte=last_week_end
-	)
-	current_week_bookings = bookings.filter(created_at__date__gte=current_week_start)
-	
-	last_month_bookings = bookings.filter(
-		created_at__date__gte=last_month_start,
-		created_at__date__lte=last_month_end
-	)
-	current_month_bookings = bookings.filter(created_at__date__gte=current_month_start)
+	last_week = count_bookings(statuses, since=last_week_start, until=last_week_end, restaurant=restaurant)
+	current_week = count_bookings(statuses, since=current_week_start, restaurant=restaurant)
+	current_month_bookings = bookings.filter(created_at__gte=start_of_day(current_month_start))
 
 	# Calculate trends
 	trends = {
-		'total_bookings': {
-			'current': current_week_bookings.count(),
-			'previous': last_week_bookings.count(),
-		},
-		'confirmed': {
-			'current': current_week_bookings.filter(status='confirmed').count(),
-			'previous': last_week_bookings.filter(status='confirmed').count(),
-		},
-		'completed': {
-			'current': current_week_bookings.filter(status='completed').count(),
-			'previous': last_week_bookings.filter(status='completed').count(),
-		},
-		'cancelled': {
-			'current': current_week_bookings.filter(status='cancelled').count(),
-			'previous': last_week_bookings.filter(status='cancelled').count(),
-		}
+		'total_bookings': {'current': current_week['total'], 'previous': last_week['total']},
 	}
+	for status_name in ('confirmed', 'completed', 'cancelled'):
+		trends[status_name] = {'current': current_week[status_name], 'previous': last_week[status_name]}
 
 	# Reviews stats
 	reviews = Review.objects.filter(restaurant=restaurant)
@@ -101,10 +83,10 @@ def admin_overview(request):
 	current_stats['avg_rating'] = restaurant.average_rating or 0
 
 	# Review trends
-	current_week_reviews = reviews.filter(created_at__date__gte=current_week_start)
+	current_week_reviews = reviews.filter(created_at__gte=start_of_day(current_week_start))
 	last_week_reviews = reviews.filter(
-		created_at__date__gte=last_week_start,
-		created_at__date__lte=last_week_end
+		created_at__gte=start_of_day(last_week_start),
+		created_at__lt=start_of_day(current_week_start)
 	)
 	
 	trends['reviews_count'] = {
@@ -181,8 +163,9 @@ def admin_overview(request):
 	insights = {}
 	
 	# Booking completion rate insight (based on completed bookings)
-	total_this_month = current_month_bookings.count()
-	completed_this_month = current_month_bookings.filter(status='completed').count()
+	this_month = count_bookings(('completed',), since=current_month_start, restaurant=restaurant)
+	total_this_month = this_month['total']
+	completed_this_month = this_month['completed']
 	if total_this_month > 0:
 		completion_rate = round((completed_this_month / total_this_month) * 100, 1)
 		insights['booking_rate'] = f"{completion_rate}% booking completion rate this month"
@@ -229,6 +212,8 @@ def admin_overview(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsRestaurantAdmin])
+@renderer_classes(FAST_RENDERER_CLASSES)
+@replica_view
 def admin_bookings(request):
 	restaurant = _get_admin_restaurant(request.user)
 	status_filter = request.GET.get('status')
@@ -236,14 +221,25 @@ def admin_bookings(request):
 	if status_filter:
 		qs = qs.filter(status=status_filter)
 	qs = qs.order_by('-created_at')
-	return Response(BookingListSerializer(qs, many=True).data)
+	data = CompiledBookingListSerializer(qs).data
+	# Finished bookings may have moved to the archive; the others never do
+	if status_filter in ARCHIVABLE_STATUSES and archive_needed():
+		archived = ArchivedBooking.objects.filter(restaurant=restaurant, status=status_filter)
+		data = sorted(
+			data + CompiledArchivedBookingListSerializer(archived).data,
+			key=lambda item: parse_datetime(item['created_at']), reverse=True
+		)
+	return Response(data)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated, IsRestaurantAdmin])
 def admin_update_booking_status(request, booking_id):
 	restaurant = _get_admin_restaurant(request.user)
-	booking = get_object_or_404(Booking, id=booking_id, restaurant=restaurant)
+	booking = get_object_or_404(
+		Booking.objects.select_related('restaurant', 'time_slot', 'applied_offer'),
+		id=booking_id, restaurant=restaurant
+	)
 
 	serializer = BookingStatusUpdateSerializer(data=request.data)
 	serializer.is_valid(raise_exception=True)
@@ -260,12 +256,9 @@ def admin_update_booking_status(request, booking_id):
 	else:
 		return Response({'error': 'Invalid status transition'}, status=status.HTTP_400_BAD_REQUEST)
 
-	BookingHistory.objects.create(
-		booking=booking,
-		status_from=prev_status,
-		status_to=new_status,
-		changed_by=request.user,
-		notes=notes or f"Admin changed status to {new_status}"
+	record_booking_history.delay(
+		booking.pk, prev_status, new_status, request.user.pk,
+		notes or f"Admin changed status to {new_status}", timezone.now()
 	)
 
 	return Response({'message': 'Status updated', 'booking': BookingListSerializer(booking).data})
@@ -324,11 +317,7 @@ def admin_offers_list_create(request):
 			image=ser.validated_data.get('image'),
 		)
 		return Response(OfferSerializer(offer).data, status=status.HTTP_201_CREATED)
-	else:
-		# Debug: Print validation errors
-		print("Offer creation validation errors:", ser.errors)
-		print("Request data received:", request.data)
-		print("Data being validated:", data)
+	logger.info("Offer creation rejected for restaurant %s: %s", restaurant.id, ser.errors)
 	return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -381,7 +370,7 @@ def admin_redeem_offer_code(request):
 	if serializer.is_valid():
 		try:
 			activation_code = serializer.validated_data['activation_code']
-			activation = OfferActivation.objects.select_related('offer', 'user').get(
+			activation = OfferActivation.objects.select_related('offer', 'offer__restaurant', 'user').get(
 				activation_code=activation_code,
 				offer__restaurant=restaurant  # Ensure the offer belongs to this restaurant
 			)